@@ -0,0 +1,231 @@
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import dataset  # noqa: E402
+from backtest import batch_holt_predictions, holt_forecast  # noqa: E402
+from changepoints import changepoint_table  # noqa: E402
+from daily import ingest, season_table  # noqa: E402
+from dataset import iter_stations, load_clean, parse_clean  # noqa: E402
+from downsample import LEVELS, lttb  # noqa: E402
+from forecast_all_variables import VARIABLES, fit_and_forecast, one_step_backtest  # noqa: E402
+from intervals import model_spec, simulate_intervals  # noqa: E402
+from model_zoo import successive_halving  # noqa: E402
+from neighbours import NeighbourIndex, station_series  # noqa: E402
+from resampling import block_trend_tests  # noqa: E402
+from serve import Service  # noqa: E402
+from synthetic import daily_table, make_daily, yearly_table  # noqa: E402
+from trend_state import TrendState  # noqa: E402
+from trends import batch_trends  # noqa: E402
+from validate_claims import trend_stats  # noqa: E402
+
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+THRESHOLD = 0.25
+# Differences below these are timer and allocator noise, whatever the ratio.
+MIN_WALL_S = 0.005
+MIN_PEAK_MB = 1.0
+
+
+def series_units(df: pd.DataFrame, limit: int) -> list[tuple[np.ndarray, np.ndarray]]:
+    units = []
+    for _, station_df in iter_stations(df):
+        years = station_df["leto"].to_numpy(dtype=float)
+        for col in station_df.columns:
+            if col in ("leto", dataset.STATION_COLUMN):
+                continue
+            units.append((years, station_df[col].to_numpy(dtype=float)))
+    return units[:limit]
+
+
+def trend_to_date(years: np.ndarray, values: np.ndarray) -> list[dict]:
+    # Streamed year by year, reading the trend figures after every year.
+    state = TrendState([str(j) for j in range(values.shape[1])])
+    out = []
+    for year, row in zip(years, values):
+        state.append(year, row)
+        out.append(state.figures(sen=False))
+    return out
+
+
+def hot_paths(workdir: Path, args) -> dict:
+    daily = make_daily(args.years, args.stations, seed=args.seed)
+    yearly = yearly_table(daily, max(args.variables - 9, 0), seed=args.seed)
+    keep = [c for c in yearly.columns if c in ("leto", dataset.STATION_COLUMN)]
+    yearly = yearly[keep + [c for c in yearly.columns if c not in keep][: args.variables]]
+    csv_path = workdir / "clean_synthetic.csv"
+    yearly.to_csv(csv_path, index=False)
+
+    df = parse_clean(csv_path)
+    units = series_units(df, args.max_series)
+    years = df["leto"].drop_duplicates().to_numpy(dtype=float)
+    values = np.stack([v for _, v in series_units(df, len(df.columns) * args.stations)], axis=1)
+    holt_fits = [(y, v, holt_forecast(v, 10, "numpy")) for y, v in units]
+
+    paths = {
+        "parse_csv": lambda: parse_clean(csv_path),
+        "load_cached": lambda: load_clean(csv_path),
+        "batch_trends": lambda: batch_trends(years, values),
+        "block_bootstrap_10k": lambda: block_trend_tests(years, values),
+        "trend_stats": lambda: [trend_stats(y, v) for y, v in units],
+        "trend_state_to_date": lambda: trend_to_date(years, values),
+        "one_step_backtest": lambda: [one_step_backtest(v, y) for y, v in units],
+        "one_step_backtest_exact": lambda: [one_step_backtest(v, y, exact=True) for y, v in units],
+        "one_step_backtest_warm": lambda: [one_step_backtest(v, y, warm_start=True) for y, v in units],
+        "fit_and_forecast_holt": lambda: [fit_and_forecast("holt", v, y) for y, v in units],
+        "fit_and_forecast_linear": lambda: [fit_and_forecast("linear", v, y) for y, v in units],
+        "fit_and_forecast_holt_numpy": lambda: [fit_and_forecast("holt", v, y, backend="numpy") for y, v in units],
+        "holt_backtest_batch_numpy": lambda: batch_holt_predictions([v for _, v in units]),
+        "model_zoo_halving": lambda: [successive_halving(v, y) for y, v in units],
+        "changepoints": lambda: changepoint_table(df),
+        "simulate_intervals": lambda: simulate_intervals(
+            [model_spec("holt", v, y, fit.forecast, -np.inf, fit) for y, v, fit in holt_fits]
+        ),
+    }
+    keys = [key for key, col in VARIABLES.items() if col in df.columns]
+    series = station_series(df, keys)
+    index_path = workdir / "neighbours.npz"
+    # All stations but the last, which each timed run adds back.
+    grown = NeighbourIndex(keys)
+    grown.sync(dict(list(series.items())[:-1]))
+    grown.save(index_path)
+    paths["neighbour_index"] = lambda: NeighbourIndex(keys).sync(series)
+    paths["neighbour_add_station"] = lambda: NeighbourIndex.load(index_path, keys).sync(series)
+    service = Service(csv_path, forecast=workdir / "none.csv", summary=workdir / "none.csv")
+    stations = list(service.snapshot.stations)
+
+    def serve_trends():
+        # Every station once from a cold cache, then once more from the cache.
+        service.cache.clear()
+        for _ in range(2):
+            for station in stations:
+                service.respond("GET", f"/trends?station={station}")
+
+    paths["serve_trends"] = serve_trends
+    if args.daily:
+        daily_path = workdir / "daily_synthetic.csv"
+        daily_table(daily).to_csv(daily_path, index=False)
+        paths["parse_daily_csv"] = lambda: pd.read_csv(daily_path)
+        store = workdir / "daily_store"
+
+        def ingest_daily():
+            shutil.rmtree(store, ignore_errors=True)
+            ingest([daily_path], store)
+
+        paths["ingest_daily"] = ingest_daily
+        paths["daily_season_table"] = lambda: season_table(store)
+        tmean = daily["tmean"][0].ravel()
+        days = np.arange(len(tmean), dtype=float)
+        paths["lttb_daily"] = lambda: [lttb(days, tmean, points) for points in LEVELS]
+        ingest([daily_path], store)
+    load_clean(csv_path)  # build the column cache before it is timed
+    return paths
+
+
+def measure(func, repeat: int) -> dict:
+    walls = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        walls.append(time.perf_counter() - start)
+    # A separate traced run: tracemalloc slows allocation-heavy code down.
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"wall_s": min(walls), "peak_mb": peak / 2**20}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    if baseline["config"] != results["config"]:
+        print(f"\nBaseline config {baseline['config']} differs from this run; not comparing.")
+        return []
+    regressions = []
+    print(f"\n{'path':<30}{'wall_s':>10}{'base':>10}{'ratio':>8}{'peak_mb':>10}{'base':>10}{'ratio':>8}")
+    for name, now in results["paths"].items():
+        base = baseline["paths"].get(name)
+        if base is None:
+            print(f"{name:<30}{now['wall_s']:>10.4f}{'-':>10}{'':>8}{now['peak_mb']:>10.1f}")
+            continue
+        wall_ratio = now["wall_s"] / base["wall_s"] if base["wall_s"] else np.inf
+        peak_ratio = now["peak_mb"] / base["peak_mb"] if base["peak_mb"] else 1.0
+        flag = ""
+        slower = wall_ratio > 1 + threshold and now["wall_s"] - base["wall_s"] > MIN_WALL_S
+        larger = peak_ratio > 1 + threshold and now["peak_mb"] - base["peak_mb"] > MIN_PEAK_MB
+        if slower or larger:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<30}{now['wall_s']:>10.4f}{base['wall_s']:>10.4f}{wall_ratio:>8.2f}"
+            f"{now['peak_mb']:>10.1f}{base['peak_mb']:>10.1f}{peak_ratio:>8.2f}{flag}"
+        )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time the analysis hot paths on synthetic Rateče-like data.")
+    parser.add_argument("--years", type=int, default=77)
+    parser.add_argument("--stations", type=int, default=1)
+    parser.add_argument("--variables", type=int, default=9, help="yearly columns; above 9 adds random walks")
+    parser.add_argument("--daily", action="store_true", help="also time parsing the daily table")
+    parser.add_argument("--max-series", type=int, default=20, help="series fed to the per-series paths")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", help="run only these paths")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write results as JSON (e.g. to refresh the baseline)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    config = {
+        key: getattr(args, key)
+        for key in ("years", "stations", "variables", "daily", "max_series", "seed")
+    }
+    results = {
+        "config": config,
+        "env": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+        },
+        "paths": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        dataset.CACHE_DIR = workdir / "cache"
+        paths = hot_paths(workdir, args)
+        for name, func in paths.items():
+            if args.only and name not in args.only:
+                continue
+            results["paths"][name] = measure(func, args.repeat)
+            r = results["paths"][name]
+            print(f"{name:<30}{r['wall_s']:>10.4f} s{r['peak_mb']:>10.1f} MB")
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=1) + "\n", encoding="utf-8")
+        print(f"Wrote {args.output}")
+
+    if args.baseline.exists() and args.baseline != args.output:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nSlower or larger than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
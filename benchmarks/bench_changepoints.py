@@ -0,0 +1,89 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from changepoints import MIN_SEGMENT, PENALTY, noise_variance, pelt, pettitt  # noqa: E402
+
+
+# 77 winters, then daily series of one station up to ~270 years.
+SIZES = [77, 1_000, 4_000, 28_000, 100_000]
+# The quadratic scans below take minutes past this.
+NAIVE_MAX_N = 28_000
+
+
+def synthetic_series(n: int, rng: np.random.Generator) -> np.ndarray:
+    # Daily anomalies whose level shifts from one year to the next, so the
+    # number of change points grows with the length as PELT assumes.
+    shifts = np.repeat(rng.normal(0.0, 2.0, n // 365 + 1), 365)[:n]
+    return np.round(shifts + rng.normal(0.0, 3.0, n), 1)
+
+
+def naive_pettitt(x: np.ndarray) -> tuple[int, float]:
+    # U_t = sum over i <= t < j of sign(x_i - x_j), one O(n) row per t.
+    u, best, k = 0.0, 0, -1.0
+    for t in range(len(x) - 1):
+        u += np.sign(x[t] - x[t + 1 :]).sum() - np.sign(x[:t] - x[t]).sum()
+        if abs(u) > k:
+            best, k = t + 1, abs(u)
+    return best, k
+
+
+def optimal_partitioning(x: np.ndarray, penalty: float, min_segment: int) -> list[int]:
+    # PELT without pruning: every earlier split is scanned for every t.
+    n = len(x)
+    beta = penalty * noise_variance([x])[0] * np.log(n)
+    s1 = np.concatenate([[0.0], np.cumsum(x)])
+    s2 = np.concatenate([[0.0], np.cumsum(x * x)])
+    f = np.full(n + 1, np.inf)
+    f[0] = -beta
+    last = np.zeros(n + 1, dtype=np.int64)
+    for t in range(min_segment, n + 1):
+        s = np.arange(0, t - min_segment + 1)
+        seg = s1[t] - s1[s]
+        total = f[s] + s2[t] - s2[s] - seg * seg / (t - s)
+        best = int(np.argmin(total))
+        f[t], last[t] = total[best] + beta, s[best]
+    points, t = [], n
+    while t > 0:
+        t = int(last[t])
+        if t > 0:
+            points.append(t)
+    return points[::-1]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    out = func(*args)
+    return out, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PELT and rank Pettitt vs quadratic segment scans.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--series", type=int, default=1, help="series per batched call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print("n,series,pettitt_naive_s,pettitt_s,op_naive_s,pelt_s,changepoints,same")
+    for n in args.sizes:
+        batch = [synthetic_series(n, rng) for _ in range(args.series)]
+        pt, t_pt = timed(pettitt, batch)
+        segments, t_pelt = timed(pelt, batch, PENALTY, MIN_SEGMENT)
+        found = sum(len(s) for s in segments)
+        if n <= NAIVE_MAX_N:
+            (index, k), t_np = timed(naive_pettitt, batch[0])
+            ref, t_op = timed(optimal_partitioning, batch[0], PENALTY, MIN_SEGMENT)
+            same = ref == segments[0] and index == pt["index"][0] and k == pt["k"][0]
+            print(f"{n},{args.series},{t_np:.4f},{t_pt:.4f},{t_op:.4f},{t_pelt:.4f},{found},{same}")
+        else:
+            print(f"{n},{args.series},,{t_pt:.4f},,{t_pelt:.4f},{found},")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy import stats
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from nonparametric import mann_kendall, theil_sen  # noqa: E402
+
+
+SIZES = [77, 1_000, 4_000, 20_000, 100_000]
+# scipy.stats.theilslopes holds several n x n float arrays; past this it needs
+# gigabytes of memory.
+SCIPY_MAX_N = 5_000
+
+
+def synthetic_series(n: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    # Daily-like series: slow warming trend, seasonal cycle, rounded to 0.1 °C.
+    t = np.arange(n, dtype=float)
+    y = 0.00008 * t + 8.0 * np.sin(2 * np.pi * t / 365.25) + rng.normal(0.0, 3.0, n)
+    return t, np.round(y, 1)
+
+
+def near_tie_series(n: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    # Integer steps plus a small trend: many pairwise slopes equal up to
+    # rounding, where a rounded y - t * x miscounts the bracket. Mostly-zero x
+    # and y tie so heavily that the variance of the bracket goes negative.
+    x = np.arange(n, dtype=float)
+    kind = rng.integers(4)
+    if kind == 0:
+        y = np.round(3 * rng.normal(size=n)) + 0.02 * x
+    elif kind == 1:
+        x = rng.integers(0, n // 2 + 1, n).astype(float)
+        y = rng.integers(0, 5, n).astype(float)
+    elif kind == 2:
+        y = 1e6 + np.round(rng.normal(size=n), 2) + 0.01 / 3 * x
+    else:
+        x = (rng.random(n) < 0.1).astype(float)
+        y = (rng.random(n) < 0.1).astype(float)
+    return x, y
+
+
+def fuzz(trials: int, rng: np.random.Generator) -> int:
+    """Series whose Theil-Sen estimate or bounds differ from scipy's."""
+    failed = 0
+    for _ in range(trials):
+        x, y = near_tie_series(int(rng.integers(3, 300)), rng)
+        ref = stats.theilslopes(y, x, 0.95)
+        ts = theil_sen(y, x)
+        expected = (ref.slope, ref.intercept, ref.low_slope, ref.high_slope)
+        if not np.allclose(ts, expected, rtol=1e-12, atol=1e-14, equal_nan=True):
+            failed += 1
+            print(f"mismatch n={len(x)}: {tuple(ts)} vs scipy {expected}")
+    return failed
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    out = func(*args)
+    return out, time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fast Kendall/Theil-Sen vs scipy.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fuzz", type=int, metavar="N", help="instead compare Theil-Sen with scipy on N near-tie series")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.fuzz:
+        failed = fuzz(args.fuzz, rng)
+        print(f"{args.fuzz - failed}/{args.fuzz} series match scipy.stats.theilslopes")
+        return 1 if failed else 0
+    print("n,kendall_scipy_s,kendall_fast_s,theilsen_scipy_s,theilsen_fast_s,max_abs_diff")
+    for n in args.sizes:
+        x, y = synthetic_series(n, rng)
+        mk, t_mk = timed(mann_kendall, x, y)
+        ts, t_ts = timed(theil_sen, y, x)
+
+        if n <= SCIPY_MAX_N:
+            (tau, p), t_tau = timed(stats.kendalltau, x, y)
+            ref, t_ref = timed(stats.theilslopes, y, x, 0.95)
+            diff = max(
+                abs(tau - mk["tau"]),
+                abs(p - mk["p"]),
+                *(abs(a - b) for a, b in zip(ref, ts)),
+            )
+            print(f"{n},{t_tau:.4f},{t_mk:.4f},{t_ref:.4f},{t_ts:.4f},{diff:.3g}")
+        else:
+            print(f"{n},,{t_mk:.4f},,{t_ts:.4f},")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,55 @@
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from dataset import DATA_PATH, iter_stations, load_clean  # noqa: E402
+from forecast_all_variables import VARIABLES, forecast_unit  # noqa: E402
+from model_cache import ModelCache  # noqa: E402
+
+
+def rows(station, key, years, series, warm_start: bool, models: ModelCache | None) -> tuple[list, list]:
+    model_rows, forecast_rows, _ = forecast_unit(station, key, years, series, False, "statsmodels", warm_start, None, models)
+    return model_rows, forecast_rows
+
+
+def check(df, warm_start: bool, drop: int) -> list[str]:
+    """Variables whose forecast output with a cache warmed on the series
+    without its last ``drop`` winters differs from an uncached run."""
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp:
+        models = ModelCache(Path(tmp))
+        for station, station_df in iter_stations(df):
+            years = station_df["leto"].to_numpy(dtype=float)
+            for key, col in VARIABLES.items():
+                if col not in station_df.columns:
+                    continue
+                series = station_df[col].to_numpy(dtype=float)
+                for cut in range(drop, 0, -1):
+                    rows(station, key, years[:-cut], series[:-cut], warm_start, models)
+                cached = rows(station, key, years, series, warm_start, models)
+                if cached != rows(station, key, years, series, warm_start, None):
+                    failed.append(key if station is None else f"{station}/{key}")
+    return failed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check that --model-cache runs reproduce uncached forecasts.")
+    parser.add_argument("--data", type=Path, default=DATA_PATH)
+    parser.add_argument("--drop", type=int, default=1, help="winters appended one by one after warming the cache")
+    args = parser.parse_args()
+
+    df = load_clean(args.data)
+    status = 0
+    for warm_start in (False, True):
+        failed = check(df, warm_start, args.drop)
+        mode = "warm-start" if warm_start else "default"
+        print(f"{mode:<11} {'differs: ' + ', '.join(failed) if failed else 'cached == uncached'}")
+        status |= bool(failed)
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+
+DAYS = 365
+
+
+def make_daily(years: int, stations: int = 1, first_year: int = 1949, seed: int = 0) -> dict:
+    """Rateče-like daily weather as arrays of shape ``(stations, years, 365)``.
+
+    Mean temperature carries a warming trend, a seasonal cycle and autocorrelated
+    noise; snow falls on cold wet days and melts on warm ones. Leap days are
+    left out so every year has the same length.
+    """
+    rng = np.random.default_rng(seed)
+    shape = (stations, years, DAYS)
+    year = np.arange(years)[None, :, None]
+    day = np.arange(DAYS)[None, None, :]
+
+    offset = rng.normal(0.0, 1.5, (stations, 1, 1))
+    noise = rng.normal(0.0, 2.5, shape)
+    # Smear the noise over a few days so cold and warm spells persist.
+    for lag, weight in enumerate((0.6, 0.36, 0.22), start=1):
+        noise[..., lag:] += weight * noise[..., :-lag]
+    tmean = 6.0 + offset + 0.025 * year - 9.5 * np.cos(2 * np.pi * (day - 15) / DAYS) + noise
+    spread = np.abs(rng.normal(4.5, 1.5, shape))
+    tmin = np.round(tmean - spread, 1)
+    tmax = np.round(tmean + spread, 1)
+
+    wet = rng.random(shape) < 0.35
+    precip = np.where(wet, rng.gamma(0.8, 8.0, shape), 0.0)
+    snowfall = np.round(np.where(tmean < 1.0, precip, 0.0), 1)
+
+    depth = np.zeros(shape)
+    melt = np.clip(tmax, 0.0, None) * 1.5
+    current = np.zeros((stations, years))
+    for d in range(DAYS):
+        current = np.clip(current + snowfall[..., d] - melt[..., d], 0.0, None)
+        depth[..., d] = current
+    return {
+        "first_year": first_year,
+        "tmin": tmin,
+        "tmax": tmax,
+        "tmean": np.round(tmean, 1),
+        "snowfall_mm": snowfall,
+        "snow_depth_cm": np.round(depth),
+    }
+
+
+def yearly_table(daily: dict, extra_variables: int = 0, seed: int = 0) -> pd.DataFrame:
+    """Aggregate ``make_daily`` output to the clean yearly table layout.
+
+    More than one station adds a ``station`` column; ``extra_variables``
+    appends random-walk columns to widen the table.
+    """
+    stations, years, _ = daily["tmin"].shape
+    first = daily["first_year"]
+    columns = {
+        "povp. T [°C]": daily["tmean"].mean(axis=2).round(1),
+        "povp. min T [°C]": daily["tmin"].mean(axis=2).round(1),
+        "abs. min T [°C]": daily["tmin"].min(axis=2),
+        "max višina snega [cm]": daily["snow_depth_cm"].max(axis=2),
+        "št. mrzlih dni": (daily["tmin"] < -10).sum(axis=2),
+        "št. ledenih dni": (daily["tmax"] < 0).sum(axis=2),
+        "št. hladnih dni": (daily["tmin"] < 0).sum(axis=2),
+        "št. dni s snegom >0.1 mm": (daily["snowfall_mm"] > 0.1).sum(axis=2),
+        "št. dni s snežno odejo": (daily["snow_depth_cm"] >= 1).sum(axis=2),
+    }
+    rng = np.random.default_rng(seed + 1)
+    for i in range(extra_variables):
+        columns[f"var_{i}"] = np.round(rng.normal(0.0, 1.0, (stations, years)).cumsum(axis=1), 2)
+
+    df = pd.DataFrame({col: values.astype(float).ravel() for col, values in columns.items()})
+    df.insert(0, "leto", np.tile(np.arange(first, first + years), stations))
+    if stations > 1:
+        df.insert(0, "station", np.repeat([f"S{s:04d}" for s in range(stations)], years))
+    return df
+
+
+def daily_table(daily: dict) -> pd.DataFrame:
+    stations, years, _ = daily["tmin"].shape
+    dates = pd.to_datetime(
+        [f"{y}-01-01" for y in range(daily["first_year"], daily["first_year"] + years)]
+    ).to_numpy()[:, None] + np.arange(DAYS).astype("timedelta64[D]")
+    df = pd.DataFrame(
+        {
+            "date": np.tile(dates.ravel(), stations),
+            **{key: daily[key].ravel() for key in ("tmin", "tmax", "tmean", "snowfall_mm", "snow_depth_cm")},
+        }
+    )
+    if stations > 1:
+        df.insert(0, "station", np.repeat([f"S{s:04d}" for s in range(stations)], years * DAYS))
+    return df
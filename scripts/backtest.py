@@ -0,0 +1,288 @@
+import hashlib
+from typing import NamedTuple
+
+import numpy as np
+
+from holt import HoltFit, fit_holt_batch
+from instrument import holt_convergence, stage
+from model_cache import Shard, prefix_keys
+
+
+MODELS = ("naive", "linear", "holt")
+HOLT_BACKENDS = ("statsmodels", "numpy")
+# In-sample errors of a Holt fit left out of its intervals: the first ones
+# mostly reflect the estimated initial state.
+HOLT_BURN_IN = 2
+
+
+def mae_rmse(y_true: np.ndarray, y_pred: np.ndarray) -> tuple[float, float]:
+    err = y_true - y_pred
+    mae = float(np.mean(np.abs(err)))
+    rmse = float(np.sqrt(np.mean(err**2)))
+    return mae, rmse
+
+
+class RecursiveLinear:
+    """Least-squares line kept up to date from running sums.
+
+    Years are shifted by the first observed year so the cross-products stay
+    small and the normal equations do not lose precision.
+    """
+
+    def __init__(self, x0: float = 0.0) -> None:
+        self.x0 = float(x0)
+        self.n = 0
+        self.sx = 0.0
+        self.sy = 0.0
+        self.sxx = 0.0
+        self.sxy = 0.0
+
+    def update(self, x: np.ndarray, y: np.ndarray) -> None:
+        x = np.atleast_1d(np.asarray(x, dtype=float)) - self.x0
+        y = np.atleast_1d(np.asarray(y, dtype=float))
+        self.n += len(x)
+        self.sx += float(x.sum())
+        self.sy += float(y.sum())
+        self.sxx += float(x @ x)
+        self.sxy += float(x @ y)
+
+    def coefficients(self) -> tuple[float, float]:
+        # Slope and intercept on the original (unshifted) year scale.
+        denom = self.n * self.sxx - self.sx**2
+        slope = (self.n * self.sxy - self.sx * self.sy) / denom
+        intercept = (self.sy - slope * self.sx) / self.n
+        return slope, intercept - slope * self.x0
+
+    def predict(self, x: float) -> float:
+        slope, intercept = self.coefficients()
+        return float(slope * x + intercept)
+
+
+def fit_holt(series: np.ndarray, start_params: np.ndarray | None = None):
+    # statsmodels takes about a second to import; the NumPy backend never needs it.
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    with stage("holt_fit", model="holt"):
+        fit = ExponentialSmoothing(
+            series,
+            trend="add",
+            seasonal=None,
+            initialization_method="estimated",
+        ).fit(optimized=True, start_params=start_params)
+    holt_convergence(fit)
+    return fit
+
+
+def holt_params(fit) -> np.ndarray:
+    # Order expected by ExponentialSmoothing.fit(start_params=...).
+    p = fit.params
+    return np.array(
+        [p["smoothing_level"], p["smoothing_trend"], p["initial_level"], p["initial_trend"]],
+        dtype=float,
+    )
+
+
+def holt_cache_model(warm_start: bool, backend: str) -> str:
+    # Warm-started fits depend on the previous origin, so they are cached
+    # apart from cold fits of the same prefix.
+    if backend == "numpy":
+        return "holt/numpy"
+    return "holt/statsmodels/" + ("warm" if warm_start else "exact")
+
+
+class HoltForecast(NamedTuple):
+    """A Holt point forecast with the fit it came from: the smoothing
+    parameters (``beta`` as statsmodels' smoothing_trend) and the in-sample
+    one-step errors."""
+
+    forecast: np.ndarray
+    alpha: float
+    beta: float
+    residuals: np.ndarray
+
+    def entry(self) -> dict:
+        return {
+            "forecast": self.forecast.tolist(),
+            "alpha": self.alpha,
+            "beta": self.beta,
+            "residuals": self.residuals.tolist(),
+        }
+
+    @classmethod
+    def from_entry(cls, hit: dict) -> "HoltForecast":
+        residuals = np.array(hit["residuals"], dtype=float)
+        return cls(np.array(hit["forecast"], dtype=float), hit["alpha"], hit["beta"], residuals)
+
+
+def holt_forecast_key(horizon: int, years: np.ndarray, series: np.ndarray) -> str:
+    return f"fit{horizon}:" + prefix_keys(years, series, [len(series)])[0]
+
+
+def batch_holt_forecast(fit: HoltFit, row: int, series: np.ndarray, horizon: int) -> HoltForecast:
+    # Row ``row`` of a fit_holt_batch result, fitted to ``series``.
+    residuals = series - fit.fitted[row, : len(series)]
+    return HoltForecast(fit.forecast(horizon)[row], float(fit.alpha[row]), float(fit.beta[row]), residuals)
+
+
+def holt_forecast(
+    series: np.ndarray,
+    horizon: int,
+    backend: str = "statsmodels",
+    years: np.ndarray | None = None,
+    cache: Shard | None = None,
+) -> HoltForecast:
+    key = None
+    if cache is not None:
+        key = holt_forecast_key(horizon, years, series)
+        hit = cache.get(key)
+        if hit is not None:
+            return HoltForecast.from_entry(hit)
+    if backend == "numpy":
+        out = batch_holt_forecast(fit_holt_batch(series), 0, series, horizon)
+    else:
+        fit = fit_holt(series)
+        out = HoltForecast(
+            np.array(fit.forecast(horizon), dtype=float),
+            float(fit.params["smoothing_level"]),
+            float(fit.params["smoothing_trend"]),
+            np.asarray(fit.resid, dtype=float),
+        )
+    if cache is not None:
+        cache.put(key, out.entry())
+    return out
+
+
+def batch_holt_predictions(
+    series_list: list[np.ndarray],
+    n_test: int = 15,
+    years_list: list[np.ndarray] | None = None,
+    caches: list[Shard] | None = None,
+) -> list[list[float]]:
+    """One-step Holt predictions for the last ``n_test`` origins of every
+    series, from a single ``fit_holt_batch`` call: each origin's training
+    prefix is one row of a padded batch. With ``caches`` (one shard per
+    series, plus ``years_list``) only origins missing from the cache are fitted."""
+    width = max(len(s) for s in series_list)
+    out, rows, lengths, slots = [], [], [], []
+    for j, series in enumerate(series_list):
+        origins = range(len(series) - n_test, len(series))
+        cache = caches[j] if caches else None
+        keys = prefix_keys(years_list[j], series, origins) if cache else [None] * n_test
+        preds = []
+        for slot, (i, key) in enumerate(zip(origins, keys)):
+            hit = cache.get(key) if cache else None
+            preds.append(None if hit is None else hit["pred"])
+            if hit is None:
+                row = np.zeros(width)
+                row[:i] = series[:i]
+                rows.append(row)
+                lengths.append(i)
+                slots.append((j, slot, key))
+        out.append(preds)
+    if rows:
+        pred = fit_holt_batch(np.array(rows), np.array(lengths)).forecast(1)[:, 0]
+        for (j, slot, key), value in zip(slots, pred):
+            out[j][slot] = float(value)
+            if caches:
+                caches[j].put(key, {"pred": float(value)})
+    return out
+
+
+def _holt_predictions(
+    series: np.ndarray, years: np.ndarray, start: int, warm_start: bool, cache: Shard | None
+) -> list[float]:
+    keys = prefix_keys(years, series, range(start, len(series))) if cache else [None] * (len(series) - start)
+    preds = []
+    start_params = None
+    for i, key in zip(range(start, len(series)), keys):
+        if cache and warm_start and start_params is not None:
+            # A warm fit also depends on where it started: the same prefix
+            # reached from another chain of origins is a different entry.
+            key += ":" + hashlib.sha256(start_params.tobytes()).hexdigest()[:16]
+        hit = cache.get(key) if cache else None
+        if hit is None:
+            # With warm starts the previous origin's optimum is the starting
+            # point for one more year of data, which skips the brute-force grid
+            # search inside statsmodels but can settle in another local optimum.
+            fit = fit_holt(series[:i], start_params=start_params if warm_start else None)
+            hit = {"pred": float(fit.forecast(1)[0]), "params": holt_params(fit).tolist()}
+            if cache:
+                cache.put(key, hit)
+        preds.append(hit["pred"])
+        start_params = np.array(hit["params"])
+    return preds
+
+
+def _exact_predictions(series: np.ndarray, years: np.ndarray, start: int) -> dict:
+    preds = {"naive": [], "linear": []}
+    for i in range(start, len(series)):
+        train = series[:i]
+        preds["naive"].append(float(train[-1]))
+        coeff = np.polyfit(years[:i], train, 1)
+        preds["linear"].append(float(coeff[0] * years[i] + coeff[1]))
+    return preds
+
+
+def _incremental_predictions(series: np.ndarray, years: np.ndarray, start: int) -> dict:
+    preds = {"naive": [], "linear": []}
+    linear = RecursiveLinear(years[0])
+    linear.update(years[:start], series[:start])
+    for i in range(start, len(series)):
+        preds["naive"].append(float(series[i - 1]))
+        preds["linear"].append(linear.predict(years[i]))
+        linear.update(years[i], series[i])
+    return preds
+
+
+def rolling_backtest(
+    series: np.ndarray,
+    years: np.ndarray,
+    n_test: int = 15,
+    exact: bool = False,
+    backend: str = "statsmodels",
+    holt_predictions: list[float] | None = None,
+    cache: Shard | None = None,
+    warm_start: bool = False,
+) -> dict:
+    """One-step rolling-origin backtest of the naive, linear and Holt models.
+
+    Naive and linear predictions are updated incrementally; with
+    ``exact=True`` they are refitted from scratch with ``np.polyfit``, which
+    is the reference the incremental engine is checked against. Holt is
+    fitted cold at every origin, so the table does not depend on how the
+    backtest is run; ``warm_start=True`` starts each origin from the previous
+    optimum instead, which is faster but not always the same optimum (ignored
+    with ``exact``). ``backend="numpy"`` fits the Holt
+    model for all origins in one ``holt.fit_holt_batch`` call instead, or
+    takes them from ``holt_predictions`` when they were batched across series
+    by ``batch_holt_predictions``.
+
+    ``cache`` is a ``model_cache.Shard`` for this series and
+    ``holt_cache_model(warm_start, backend)``; Holt fits of origins whose training
+    prefix is unchanged are read from it instead of being refitted.
+    """
+    if backend not in HOLT_BACKENDS:
+        raise ValueError(f"Unknown Holt backend: {backend}")
+    series = np.asarray(series, dtype=float)
+    years = np.asarray(years, dtype=float)
+    start = len(series) - n_test
+
+    with stage("backtest", exact=exact):
+        if exact:
+            preds = _exact_predictions(series, years, start)
+        else:
+            preds = _incremental_predictions(series, years, start)
+        if holt_predictions is not None:
+            preds["holt"] = holt_predictions
+        elif backend == "numpy":
+            caches = [cache] if cache else None
+            preds["holt"] = batch_holt_predictions([series], n_test, [years], caches)[0]
+        else:
+            preds["holt"] = _holt_predictions(series, years, start, warm_start and not exact, cache)
+
+    y_true = series[start:]
+    result = {"test_start_year": int(years[start]), "test_end_year": int(years[-1]), "metrics": {}}
+    for model_name, y_pred in preds.items():
+        mae, rmse = mae_rmse(y_true, np.array(y_pred, dtype=float))
+        result["metrics"][model_name] = {"mae": mae, "rmse": rmse}
+    return result
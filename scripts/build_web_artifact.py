@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from backtest import fit_holt
+from dataset import DATA_PATH, file_hash, load_clean
+from downsample import LEVELS_DIR, coarsen, write_levels
+
+
+ARTIFACT_PATH = Path("web/data/model_artifact.json")
+ARTIFACT_VERSION = 1
+HORIZON = 10
+DECIMALS = 4
+
+# Keys match the `data` object in web/script.js.
+WEB_SERIES = {
+    "avgTemp": "povp. T [°C]",
+    "avgMinTemp": "povp. min T [°C]",
+    "minTemp": "abs. min T [°C]",
+    "maxSnow": "max višina snega [cm]",
+    "frostDays": "št. mrzlih dni",
+    "iceDays": "št. ledenih dni",
+    "coldDays": "št. hladnih dni",
+    "snowfallDays": "št. dni s snegom >0.1 mm",
+    "snowDays": "št. dni s snežno odejo",
+}
+
+
+def compact(values) -> list:
+    return [None if np.isnan(v) else round(float(v), DECIMALS) for v in np.asarray(values, dtype=float)]
+
+
+def series_models(years: np.ndarray, values: np.ndarray) -> dict:
+    observed = ~np.isnan(values)
+    future_years = np.arange(int(years[-1]) + 1, int(years[-1]) + HORIZON + 1)
+
+    slope, intercept = np.polyfit(years[observed], values[observed], 1)
+    linear = {
+        # Coefficients stay at full precision: the page extends the line to
+        # contiguous years, where rounding the slope would shift it visibly.
+        "slope": float(slope),
+        "intercept": float(intercept),
+        "fitted": compact(slope * years + intercept),
+        "projection": compact(slope * future_years + intercept),
+    }
+
+    # Same statsmodels fit as forecast_all_variables.fit_and_forecast, so the
+    # page and analysis/ agree.
+    fit = fit_holt(values[observed])
+    fitted = np.full(len(values), np.nan)
+    fitted[observed] = fit.fittedvalues
+    holt = {
+        "alpha": round(float(fit.params["smoothing_level"]), 6),
+        "beta": round(float(fit.params["smoothing_trend"]), 6),
+        "level": round(float(fit.level[-1]), DECIMALS),
+        "trend": round(float(fit.trend[-1]), DECIMALS),
+        "fitted": compact(fitted),
+        "projection": compact(fit.forecast(HORIZON)),
+    }
+    return {"values": compact(values), "linear": linear, "holt": holt}
+
+
+def build_artifact() -> dict:
+    df = load_clean()
+    years = df["leto"].to_numpy(dtype=float)
+    return {
+        "version": ARTIFACT_VERSION,
+        "source": {"path": DATA_PATH.as_posix(), "sha256": file_hash(DATA_PATH)},
+        "years": [int(y) for y in years],
+        "projection_years": list(range(int(years[-1]) + 1, int(years[-1]) + HORIZON + 1)),
+        "series": {
+            key: series_models(years, df[col].to_numpy(dtype=float))
+            for key, col in WEB_SERIES.items()
+            if col in df.columns
+        },
+    }
+
+
+def main() -> None:
+    # Long histories ship a coarse level here and finer zoom levels per chart
+    # in web/data/levels/; 77 winters fit in the coarse level as they are.
+    artifact = build_artifact()
+    levels = write_levels(artifact)
+    artifact = coarsen(artifact)
+    if levels:
+        artifact["levels"] = {"path": LEVELS_DIR.relative_to("web").as_posix(), "charts": levels}
+    ARTIFACT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    ARTIFACT_PATH.write_text(
+        json.dumps(artifact, ensure_ascii=False, separators=(",", ":")) + "\n", encoding="utf-8"
+    )
+    print(f"Wrote {ARTIFACT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from dataset import YEAR_COLUMN, iter_stations, load_clean, load_stations
+from forecast_all_variables import VARIABLES
+from instrument import stage
+
+
+CHANGEPOINTS_PATH = Path("analysis/changepoints.csv")
+# PELT penalty per change point: PENALTY * sigma^2 * log(n), the BIC-like choice
+# for a shift in mean with the noise level estimated from first differences.
+PENALTY = 2.0
+MIN_SEGMENT = 5
+
+
+def _pad(series: list[np.ndarray], fill: float) -> tuple[np.ndarray, np.ndarray]:
+    lengths = np.array([len(s) for s in series])
+    out = np.full((lengths.max(), len(series)), fill)
+    for j, s in enumerate(series):
+        out[: len(s), j] = s
+    return out, lengths
+
+
+def pettitt(series: list[np.ndarray]) -> dict:
+    """Pettitt's rank test for one shift, for many series at once.
+
+    With ranks ``r`` the statistic is ``U_t = 2 * sum(r[:t]) - t * (n + 1)``,
+    one cumulative sum per series after the rank sort, instead of the
+    O(n^2) double sum over pairs. Returns per series ``index`` (first
+    position after the shift), ``k`` (max |U_t|) and the approximate
+    two-sided ``p``.
+    """
+    # Padding with +inf leaves the ranks of the real values unchanged.
+    x, n = _pad(series, np.inf)
+    ranks = stats.rankdata(x, axis=0)
+    t = np.arange(1, len(x) + 1)[:, None]
+    u = 2 * np.cumsum(ranks, axis=0) - t * (n + 1)
+    u = np.where(t < n, np.abs(u), -1.0)
+    last = np.argmax(u, axis=0)
+    k = u[last, np.arange(len(n))]
+    with np.errstate(over="ignore"):
+        p = np.minimum(1.0, 2 * np.exp(-6 * k**2 / (n.astype(float) ** 3 + n.astype(float) ** 2)))
+    return {"index": last + 1, "k": k, "p": p}
+
+
+def noise_variance(series: list[np.ndarray]) -> np.ndarray:
+    # Robust to the shifts being looked for: MAD of first differences.
+    out = []
+    for s in series:
+        d = np.diff(s)
+        mad = np.median(np.abs(d - np.median(d))) if len(d) else 0.0
+        out.append((mad / 0.6745) ** 2 / 2 if mad > 0 else np.var(s))
+    return np.array(out)
+
+
+def pelt(series: list[np.ndarray], penalty: float = PENALTY, min_segment: int = MIN_SEGMENT) -> list[list[int]]:
+    """Mean-shift change points by PELT (Killick et al. 2012), many series at once.
+
+    Segment cost is the residual sum of squares around the segment mean,
+    O(1) from prefix sums. The candidate last change points of all series
+    are kept side by side in one padded array and pruned together; pruning
+    keeps it short, so the run is close to linear in the series length
+    instead of the O(n^2) of optimal partitioning. Returns the start
+    positions of every segment after the first.
+    """
+    x, n = _pad(series, 0.0)
+    k = len(n)
+    beta = penalty * noise_variance(series) * np.log(n)
+    s1 = np.vstack([np.zeros(k), np.cumsum(x, axis=0)])
+    s2 = np.vstack([np.zeros(k), np.cumsum(x * x, axis=0)])
+    cols = np.arange(k)
+
+    f = np.full((len(x) + 1, k), np.inf)
+    f[0] = -beta
+    last = np.zeros((len(x) + 1, k), dtype=np.int64)
+    # Candidate last change points per series with their F, S1 and S2 side
+    # by side, columns [0, width) of buffers compacted when they fill up.
+    buf = np.zeros((4, k, 64))
+    valid = np.zeros((k, 64), dtype=bool)
+    width = 0
+    for t in range(min_segment, len(x) + 1):
+        if width == valid.shape[1]:
+            order = np.argsort(~valid, axis=1, kind="stable")
+            buf = np.take_along_axis(buf, order[None], axis=2)
+            valid = np.take_along_axis(valid, order, axis=1)
+            width = int(valid.sum(axis=1).max())
+            if width > valid.shape[1] // 2:
+                buf = np.concatenate([buf, np.zeros_like(buf)], axis=2)
+                valid = np.concatenate([valid, np.zeros_like(valid)], axis=1)
+        # s = t - min_segment becomes admissible now.
+        s = t - min_segment
+        buf[0, :, width] = s
+        buf[1:, :, width] = f[s], s1[s], s2[s]
+        valid[:, width] = True
+        width += 1
+        cand, fs, c1, c2 = buf[:, :, :width]
+        v = valid[:, :width]
+        seg = s1[t][:, None] - c1
+        total = fs + (s2[t][:, None] - c2) - seg * seg / (t - cand)
+        total[~v] = np.inf
+        best = np.argmin(total, axis=1)
+        f[t] = total[cols, best] + beta
+        last[t] = cand[cols, best].astype(np.int64)
+        # Prune candidates that can never be optimal again.
+        v &= total <= f[t][:, None]
+
+    out = []
+    for j in range(k):
+        points, t = [], int(n[j])
+        while t > 0:
+            t = int(last[t, j])
+            if t > 0:
+                points.append(t)
+        out.append(points[::-1])
+    return out
+
+
+def changepoint_table(
+    df: pd.DataFrame, penalty: float = PENALTY, min_segment: int = MIN_SEGMENT
+) -> pd.DataFrame:
+    """Pettitt and PELT change points of every VARIABLES series and station.
+
+    ``year`` is the first year of the new regime; ``before`` and ``after``
+    are the means of the segments on either side of it.
+    """
+    units = []
+    for station, station_df in iter_stations(df):
+        years = station_df[YEAR_COLUMN].to_numpy()
+        for key, col in VARIABLES.items():
+            if col not in station_df.columns:
+                continue
+            values = station_df[col].to_numpy(dtype=float)
+            observed = ~np.isnan(values)
+            if observed.sum() >= 2 * min_segment:
+                units.append((station, key, years[observed], values[observed]))
+
+    series = [u[3] for u in units]
+    with stage("pettitt", series=len(series)):
+        pt = pettitt(series)
+    with stage("pelt", series=len(series)):
+        segments = pelt(series, penalty, min_segment)
+
+    rows = []
+    for j, (station, key, years, values) in enumerate(units):
+        prefix = {} if station is None else {"station": station}
+        i = int(pt["index"][j])
+        rows.append(
+            {
+                **prefix,
+                "variable": key,
+                "method": "pettitt",
+                "year": int(years[i]),
+                "statistic": float(pt["k"][j]),
+                "p_value": float(pt["p"][j]),
+                "before": float(values[:i].mean()),
+                "after": float(values[i:].mean()),
+            }
+        )
+        bounds = [0, *segments[j], len(values)]
+        for a, b, c in zip(bounds, bounds[1:], bounds[2:]):
+            rows.append(
+                {
+                    **prefix,
+                    "variable": key,
+                    "method": "pelt",
+                    "year": int(years[b]),
+                    "statistic": np.nan,
+                    "p_value": np.nan,
+                    "before": float(values[a:b].mean()),
+                    "after": float(values[b:c].mean()),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Pettitt and PELT change points of all winter variables.")
+    parser.add_argument("--penalty", type=float, default=PENALTY, help="PELT penalty in units of sigma^2 log(n)")
+    parser.add_argument("--min-segment", type=int, default=MIN_SEGMENT, help="shortest regime in years")
+    parser.add_argument("--stations-dir", type=Path, help="station=<id> partitions instead of the single table")
+    parser.add_argument("--output", type=Path, default=CHANGEPOINTS_PATH)
+    args = parser.parse_args(argv)
+
+    df = load_stations(args.stations_dir) if args.stations_dir else load_clean()
+    table = changepoint_table(df, args.penalty, args.min_segment)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    table.round(4).to_csv(args.output, index=False)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset import YEAR_COLUMN, iter_stations
+from windows import WindowIndex
+
+
+CLAIMS_PATH = Path("data/claims.json")
+REPORT_PATH = Path("analysis/claims_report.json")
+
+KINDS = ("value", "change", "pct_change", "mean", "argmin", "argmax", "count")
+
+
+def load_claims(path: Path = CLAIMS_PATH) -> list[dict]:
+    claims = json.loads(Path(path).read_text(encoding="utf-8"))
+    for claim in claims:
+        if claim["kind"] not in KINDS:
+            raise ValueError(f"Unknown claim kind {claim['kind']!r} in {claim['id']}")
+    return claims
+
+
+class YearIndex:
+    """One station's table keyed by year, built once and shared by all claims.
+
+    Point lookups go through a year -> row dict, window means through per-column
+    prefix sums, and column digests and extremes are computed at most once per
+    column, so a claim costs O(1) however long the table is.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.years = df[YEAR_COLUMN].to_numpy(dtype=np.int64)
+        self.row = {int(y): i for i, y in enumerate(self.years)}
+        self._df = df
+        self._columns = {}
+        self._windows = {}
+        self._digests = {}
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            self._columns[name] = self._df[name].to_numpy(dtype=float)
+        return self._columns[name]
+
+    def value(self, name: str, year: int) -> float:
+        if year not in self.row:
+            raise KeyError(f"no data for {year}")
+        return float(self.column(name)[self.row[year]])
+
+    def window(self, start: int, end: int) -> tuple[int, int]:
+        return (
+            int(np.searchsorted(self.years, start, side="left")),
+            int(np.searchsorted(self.years, end, side="right")),
+        )
+
+    def mean(self, name: str, start: int, end: int) -> float:
+        if name not in self._windows:
+            self._windows[name] = WindowIndex(self.years, self.column(name))
+        index = self._windows[name]
+        if index.count(start, end) == 0:
+            raise KeyError(f"no data in {start}-{end}")
+        return float(index.mean(start, end))
+
+    def digest(self, name: str) -> str:
+        if name not in self._digests:
+            data = self.years if name == YEAR_COLUMN else self.column(name)
+            self._digests[name] = hashlib.sha256(np.ascontiguousarray(data).tobytes()).hexdigest()
+        return self._digests[name]
+
+
+def fingerprint(claim: dict, index: YearIndex) -> str:
+    # A claim's inputs are its own definition plus the year and variable
+    # columns of its station; any edit to those changes the fingerprint.
+    h = hashlib.sha256(json.dumps(claim, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    h.update(index.digest(YEAR_COLUMN).encode())
+    if "variable" in claim:
+        h.update(index.digest(claim["variable"]).encode())
+    return h.hexdigest()
+
+
+def claim_value(claim: dict, index: YearIndex) -> float:
+    kind = claim["kind"]
+    var = claim.get("variable")
+    if kind == "value":
+        return index.value(var, claim["year"])
+    if kind == "change":
+        return index.value(var, claim["end"]) - index.value(var, claim["start"])
+    if kind == "pct_change":
+        base = index.value(var, claim["start"])
+        return (index.value(var, claim["end"]) - base) / base * 100
+    if kind == "mean":
+        return index.mean(var, claim["start"], claim["end"])
+    if kind in ("argmin", "argmax"):
+        values = index.column(var)
+        pick = np.nanargmin if kind == "argmin" else np.nanargmax
+        return int(index.years[pick(values)])
+    lo, hi = index.window(claim.get("start", index.years[0]), claim.get("end", index.years[-1]))
+    return hi - lo
+
+
+def check(claim: dict, actual: float) -> bool:
+    if claim["kind"] in ("argmin", "argmax"):
+        return actual == claim["expected"]
+    diff = abs(actual - claim["expected"])
+    return diff == 0 or diff < claim.get("tolerance", 0)
+
+
+def evaluate(df: pd.DataFrame, claims: list[dict], previous: list[dict] | None = None) -> list[dict]:
+    """Evaluate every claim against ``df`` in one pass.
+
+    With ``previous`` results (from an earlier report), claims whose
+    fingerprint is unchanged reuse their stored result instead of being
+    re-checked; those come back with ``"checked": False``.
+    """
+    indexes = {station: YearIndex(station_df) for station, station_df in iter_stations(df)}
+    known = {(r.get("station"), r["id"]): r for r in previous or []}
+
+    results = []
+    for claim in claims:
+        station = claim.get("station")
+        result = {"id": claim["id"], "station": station, "expected": claim["expected"]}
+        index = indexes.get(station)
+        if index is None:
+            results.append({**result, "actual": None, "passed": False, "error": f"no station {station!r}"})
+            continue
+
+        key = fingerprint(claim, index)
+        stored = known.get((station, claim["id"]))
+        if stored is not None and stored.get("fingerprint") == key:
+            results.append({**stored, "checked": False})
+            continue
+
+        result["fingerprint"] = key
+        result["checked"] = True
+        try:
+            actual = claim_value(claim, index)
+        except KeyError as exc:
+            results.append({**result, "actual": None, "passed": False, "error": exc.args[0]})
+            continue
+        results.append({**result, "actual": actual, "passed": bool(check(claim, actual))})
+    return results
+
+
+def read_report(path: Path = REPORT_PATH) -> list[dict] | None:
+    if not Path(path).exists():
+        return None
+    return json.loads(Path(path).read_text(encoding="utf-8"))["claims"]
+
+
+def write_report(results: list[dict], path: Path = REPORT_PATH) -> None:
+    report = {
+        "passed": sum(r["passed"] for r in results),
+        "failed": sum(not r["passed"] for r in results),
+        "claims": results,
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(report, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
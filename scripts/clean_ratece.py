@@ -1,11 +1,26 @@
-import pandas as pd
+import argparse
+import glob
+import shutil
+from collections import defaultdict
 from pathlib import Path
 
+import pandas as pd
+
 SRC_PATH = Path("data/raw/1bs8xpBJ")
 OUT_PATH = Path("data/clean_ratece.csv")
 
+PARTITION_DIR = Path("data/clean")
+PARTITION_FILE = "clean_ratece.csv"
+STATIONS_INDEX = "stations.csv"
+CHUNK_ROWS = 100_000
 
-def main() -> None:
+YEAR = "leto"
+STATION_ID = "station id"
+STATION_NAME = "station name"
+TEXT_COLUMNS = {STATION_ID, STATION_NAME, "datum abs. min T", "datum max višine snega"}
+
+
+def clean_single() -> None:
     df = pd.read_csv(SRC_PATH)
     df = df.rename(columns=lambda c: c.strip())
 
@@ -26,5 +41,128 @@ def main() -> None:
     df.to_csv(OUT_PATH, index=False)
 
 
+def resolve_inputs(source: str) -> list[Path]:
+    path = Path(source)
+    if path.is_dir():
+        return sorted(p for p in path.iterdir() if p.is_file() and not p.name.startswith("."))
+    return sorted(Path(p) for p in glob.glob(source) if Path(p).is_file())
+
+
+def read_chunks(path: Path, chunksize: int):
+    # Fix dtypes up front: per-chunk inference would write the same column as
+    # "47" in one chunk and "47.0" in the next.
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {raw: ("str" if raw.strip() in TEXT_COLUMNS else "float64") for raw in header}
+    dtypes.update({raw: "int64" for raw in header if raw.strip() == "valid"})
+    if STATION_ID not in [c.strip() for c in header]:
+        raise ValueError(f"{path} has no '{STATION_ID}' column")
+    for chunk in pd.read_csv(path, dtype=dtypes, chunksize=chunksize):
+        yield chunk.rename(columns=lambda c: c.strip())
+
+
+def partition_path(out_dir: Path, station: str) -> Path:
+    return out_dir / f"station={station}" / PARTITION_FILE
+
+
+def new_years(out: pd.DataFrame, seen: dict, station: str) -> pd.Series:
+    """Mask of the rows in ``out`` whose year is not yet in ``seen`` (year ->
+    values, updated in place). Overlapping exports repeat years; a repeated
+    year must carry the same values."""
+    mask = []
+    for row in out.itertuples(index=False):
+        values = tuple(None if pd.isna(v) else v for v in row)
+        year = values[out.columns.get_loc(YEAR)]
+        if year not in seen:
+            seen[year] = values
+            mask.append(True)
+        elif seen[year] == values:
+            mask.append(False)
+        else:
+            raise ValueError(f"Station {station!r} has conflicting rows for {year}")
+    return pd.Series(mask, index=out.index, dtype=bool)
+
+
+def batch_clean(inputs: list[Path], out_dir: Path, chunksize: int = CHUNK_ROWS) -> list[Path]:
+    # Pass 1: which columns carry any value for each station, and station names.
+    observed = defaultdict(set)
+    names = {}
+    columns = []
+    for path in inputs:
+        for chunk in read_chunks(path, chunksize):
+            columns.extend(c for c in chunk.columns if c not in columns)
+            for station, group in chunk.groupby(STATION_ID, sort=False):
+                observed[station].update(group.columns[group.notna().any()])
+                names.setdefault(station, group[STATION_NAME].iloc[0] if STATION_NAME in group else "")
+
+    # Drop fully empty columns per station; the station id becomes the partition
+    # key and the constant station name goes to the stations index.
+    keep = {
+        station: [c for c in columns if c in cols and c not in (STATION_ID, STATION_NAME)]
+        for station, cols in observed.items()
+    }
+
+    # Pass 2: stream rows into their station partitions, each year once. They
+    # are written to a scratch directory, so a failed run leaves out_dir as it
+    # was and stations missing from the inputs do not keep old partitions.
+    tmp = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    written = {}
+    seen = defaultdict(dict)
+    for path in inputs:
+        for chunk in read_chunks(path, chunksize):
+            for station, group in chunk.groupby(STATION_ID, sort=False):
+                out = group.reindex(columns=keep[station]).rename(columns={"valid": YEAR})
+                if YEAR in out.columns:
+                    out = out[new_years(out, seen[station], station)]
+                target = partition_path(tmp, station)
+                first = station not in written
+                if first:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    written[station] = 0
+                out.to_csv(target, mode="w" if first else "a", header=first, index=False)
+                written[station] += len(out)
+
+    index = pd.DataFrame(
+        {
+            STATION_ID: list(written),
+            STATION_NAME: [names[s] for s in written],
+            "rows": list(written.values()),
+        }
+    ).sort_values(STATION_ID)
+    tmp.mkdir(parents=True, exist_ok=True)
+    index.to_csv(tmp / STATIONS_INDEX, index=False)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.glob("station=*"):
+        shutil.rmtree(old)
+    for new in tmp.iterdir():
+        new.replace(out_dir / new.name)
+    tmp.rmdir()
+    return [partition_path(out_dir, s) for s in sorted(written)]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Clean raw ARSO winter exports.")
+    parser.add_argument(
+        "source",
+        nargs="?",
+        help="directory or glob of raw exports for many stations; "
+        f"without it only {SRC_PATH} is cleaned into {OUT_PATH}",
+    )
+    parser.add_argument("--out-dir", type=Path, default=PARTITION_DIR)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    if args.source is None:
+        clean_single()
+        return
+
+    inputs = resolve_inputs(args.source)
+    if not inputs:
+        raise SystemExit(f"No raw exports match {args.source}")
+    for path in batch_clean(inputs, args.out_dir, args.chunksize):
+        print(f"Wrote {path}")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,289 @@
+import argparse
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from clean_ratece import STATION_ID, partition_path, resolve_inputs
+from dataset import YEAR_COLUMN, file_hash
+from instrument import stage
+
+
+STORE_DIR = Path("data/daily")
+OUT_PATH = Path("data/clean_daily.csv")
+PARTITION_DIR = Path("data/clean_daily")
+CHUNK_ROWS = 1_000_000
+# Daily values are stored as float32; rounding to this many decimals on read
+# gives back the exact decimal readings for thresholds and extremes.
+DECIMALS = 3
+
+DATE = "date"
+STATION = "station"
+VARIABLES = ("tmin", "tmax", "tmean", "snowfall_mm", "snow_depth_cm")
+# Header names of ARSO exports mapped to the store's names.
+ALIASES = {STATION_ID: STATION, "valid": DATE}
+
+# Winter-table columns derived from the daily series, in clean_ratece.csv order.
+MEANS = {"povp. T [°C]": "tmean", "povp. min T [°C]": "tmin"}
+EXTREMES = {
+    # column: (variable, reduction, date column)
+    "abs. min T [°C]": ("tmin", "min", "datum abs. min T"),
+    "max višina snega [cm]": ("snow_depth_cm", "max", "datum max višine snega"),
+}
+DAY_COUNTS = {
+    # column: (variable, comparison, threshold)
+    "št. mrzlih dni": ("tmin", "<", -10.0),
+    "št. ledenih dni": ("tmax", "<", 0.0),
+    "št. hladnih dni": ("tmin", "<", 0.0),
+    "št. dni s snegom >0.1 mm": ("snowfall_mm", ">", 0.1),
+    "št. dni s snežno odejo": ("snow_depth_cm", ">=", 1.0),
+}
+COMPARE = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}
+
+
+def _read_chunks(path: Path, chunksize: int):
+    header = [c.strip() for c in pd.read_csv(path, nrows=0).columns]
+    names = [ALIASES.get(c, c) for c in header]
+    missing = [c for c in (DATE, *VARIABLES) if c not in names]
+    if missing:
+        raise ValueError(f"{path} lacks daily columns {missing}")
+    dtypes = {c: "float32" for c in VARIABLES}
+    dtypes.update({DATE: "str", STATION: "str"})
+    usecols = [c for c in names if c in dtypes]
+    reader = pd.read_csv(path, header=0, names=names, usecols=usecols, dtype=dtypes, chunksize=chunksize)
+    for chunk in reader:
+        if STATION not in chunk:
+            chunk[STATION] = ""
+        chunk[DATE] = pd.to_datetime(chunk[DATE]).to_numpy().astype("datetime64[D]")
+        yield chunk
+
+
+def ingest(inputs: list[Path], store: Path = STORE_DIR, chunksize: int = CHUNK_ROWS) -> bool:
+    """Daily CSV exports into a store of one ``.npy`` array per series.
+
+    Rows are sorted by station and date; ``stations.json`` lists the station
+    of every code in ``station.npy``. Memory is bounded by the chunk size and
+    the largest single station. Returns False when the store is already built
+    from the same inputs (by SHA-256).
+    """
+    source = {str(p): file_hash(p) for p in inputs}
+    meta_path = store / "meta.json"
+    if meta_path.exists() and json.loads(meta_path.read_text(encoding="utf-8")).get("source") == source:
+        return False
+
+    tmp = store.with_name(store.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    spill = tmp / "spill"
+    spill.mkdir(parents=True)
+
+    # Pass 1: append every chunk's rows to per-station raw spill files.
+    codes = {}
+    counts = {}
+    for path in inputs:
+        with stage("read_daily", file=str(path)):
+            for chunk in _read_chunks(path, chunksize):
+                for station, group in chunk.groupby(STATION, sort=False):
+                    code = codes.setdefault(station, len(codes))
+                    counts[code] = counts.get(code, 0) + len(group)
+                    with open(spill / f"{code}.{DATE}", "ab") as fh:
+                        group[DATE].to_numpy().astype("datetime64[D]").tofile(fh)
+                    for var in VARIABLES:
+                        with open(spill / f"{code}.{var}", "ab") as fh:
+                            group[var].to_numpy(dtype=np.float32).tofile(fh)
+
+    # Pass 2: stations in sorted order, each sorted by date, into the final arrays.
+    stations = sorted(codes)
+    total = sum(counts.values())
+    out = {DATE: np.lib.format.open_memmap(tmp / f"{DATE}.npy", "w+", "datetime64[D]", (total,))}
+    out[STATION] = np.lib.format.open_memmap(tmp / f"{STATION}.npy", "w+", np.int32, (total,))
+    for var in VARIABLES:
+        out[var] = np.lib.format.open_memmap(tmp / f"{var}.npy", "w+", np.float32, (total,))
+    with stage("sort_daily"):
+        at = 0
+        for i, station in enumerate(stations):
+            code = codes[station]
+            dates = np.fromfile(spill / f"{code}.{DATE}", dtype="datetime64[D]")
+            order = np.argsort(dates, kind="stable")
+            if len(dates) > 1 and (np.diff(dates[order]) == np.timedelta64(0, "D")).any():
+                raise ValueError(f"Station {station!r} has duplicate dates")
+            end = at + len(dates)
+            out[DATE][at:end] = dates[order]
+            out[STATION][at:end] = i
+            for var in VARIABLES:
+                out[var][at:end] = np.fromfile(spill / f"{code}.{var}", dtype=np.float32)[order]
+            at = end
+    for array in out.values():
+        array.flush()
+    del out
+
+    shutil.rmtree(spill)
+    (tmp / "stations.json").write_text(json.dumps(stations, ensure_ascii=False), encoding="utf-8")
+    (tmp / "meta.json").write_text(json.dumps({"source": source, "rows": total}), encoding="utf-8")
+    shutil.rmtree(store, ignore_errors=True)
+    tmp.rename(store)
+    return True
+
+
+def open_store(store: Path = STORE_DIR) -> tuple[list[str], dict]:
+    """Station names and the store's arrays, memory-mapped read-only."""
+    stations = json.loads((store / "stations.json").read_text(encoding="utf-8"))
+    arrays = {name: np.load(store / f"{name}.npy", mmap_mode="r") for name in (DATE, STATION, *VARIABLES)}
+    return stations, arrays
+
+
+def season_of(dates: np.ndarray, start_month: int = 1) -> np.ndarray:
+    """Season label of each date: the calendar year the season ends in.
+
+    With ``start_month=1`` seasons are calendar years; with 10, October 1949
+    to September 1950 is season 1950.
+    """
+    year = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+    if start_month == 1:
+        return year
+    month = dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    return year + (month >= start_month)
+
+
+def _reduce(arrays: dict, lo: int, hi: int, start_month: int, day_counts: dict) -> dict:
+    # Rows lo:hi are whole (station, season) groups, contiguous because the
+    # store is sorted by station and date; every reduction is one reduceat.
+    dates = np.asarray(arrays[DATE][lo:hi])
+    station = np.asarray(arrays[STATION][lo:hi])
+    season = season_of(dates, start_month)
+    change = np.r_[True, (station[1:] != station[:-1]) | (season[1:] != season[:-1])]
+    starts = np.flatnonzero(change)
+    group = np.cumsum(change) - 1
+    out = {"station": station[starts], YEAR_COLUMN: season[starts]}
+
+    values = {var: np.round(np.asarray(arrays[var][lo:hi], dtype=np.float64), DECIMALS) for var in VARIABLES}
+    observed = {var: ~np.isnan(v) for var, v in values.items()}
+    days = {var: np.add.reduceat(m, starts) for var, m in observed.items()}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for column, var in MEANS.items():
+            total = np.add.reduceat(np.where(observed[var], values[var], 0.0), starts)
+            out[column] = np.round(total / days[var], 1)
+
+        for column, (var, how, date_column) in EXTREMES.items():
+            fill = np.inf if how == "min" else -np.inf
+            ufunc = np.minimum if how == "min" else np.maximum
+            extreme = ufunc.reduceat(np.where(observed[var], values[var], fill), starts)
+            # First day of each group that reaches the group's extreme.
+            hit = np.flatnonzero(observed[var] & (values[var] == extreme[group]))
+            first = hit[np.r_[True, group[hit][1:] != group[hit][:-1]]]
+            when = np.full(len(starts), "", dtype=object)
+            when[group[first]] = np.datetime_as_string(dates[first], unit="D")
+            out[column] = np.where(days[var] > 0, extreme, np.nan)
+            out[date_column] = when
+
+        for column, (var, op, threshold) in day_counts.items():
+            count = np.add.reduceat(COMPARE[op](values[var], threshold), starts).astype(float)
+            out[column] = np.where(days[var] > 0, count, np.nan)
+    return out
+
+
+def season_table(
+    store: Path = STORE_DIR,
+    start_month: int = 1,
+    day_counts: dict | None = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> pd.DataFrame:
+    """Winter-table columns of every (station, season) from the daily store.
+
+    ``day_counts`` overrides or extends ``DAY_COUNTS`` (column -> (variable,
+    comparison, threshold)) for other day definitions. Chunks of about
+    ``chunk_rows`` rows are read from the memory-mapped store, cut at group
+    boundaries. Means and extremes skip missing days; a season without any
+    observed day of a variable gets NaN for it.
+    """
+    stations, arrays = open_store(store)
+    counts = {**DAY_COUNTS, **(day_counts or {})}
+    n = len(arrays[DATE])
+    parts = []
+    with stage("season_table", rows=n):
+        lo = 0
+        while lo < n:
+            hi = min(lo + chunk_rows, n)
+            if hi < n:
+                # Move the cut back to the first day of hi's group.
+                key = (arrays[STATION][hi], season_of(arrays[DATE][hi : hi + 1], start_month)[0])
+                while hi > lo and (arrays[STATION][hi - 1], season_of(arrays[DATE][hi - 1 : hi], start_month)[0]) == key:
+                    hi -= 1
+                if hi == lo:
+                    raise ValueError(f"chunk_rows={chunk_rows} is smaller than one season")
+            parts.append(pd.DataFrame(_reduce(arrays, lo, hi, start_month, counts)))
+            lo = hi
+
+    df = pd.concat(parts, ignore_index=True)
+    df["station"] = np.asarray(stations, dtype=object)[df["station"].to_numpy()]
+    order = ["station", YEAR_COLUMN]
+    for column in ("povp. T [°C]", "povp. min T [°C]"):
+        order.append(column)
+    for column, (_, _, date_column) in EXTREMES.items():
+        order += [column, date_column]
+    order += list(counts)
+    return df[order]
+
+
+def write_tables(df: pd.DataFrame, out: Path, out_dir: Path) -> list[Path]:
+    # One station: a single table like data/clean_ratece.csv; several: the
+    # station=<id> partitions dataset.load_stations reads.
+    if df["station"].nunique() == 1:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        df.drop(columns=["station"]).to_csv(out, index=False)
+        return [out]
+    written = []
+    for station, group in df.groupby("station", sort=True):
+        target = partition_path(out_dir, station)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        group.drop(columns=["station"]).to_csv(target, index=False)
+        written.append(target)
+    return written
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Winter-season tables from daily observations.")
+    parser.add_argument(
+        "source",
+        help=f"file, directory or glob of daily CSV exports with {DATE}, optionally {STATION}, "
+        f"and {', '.join(VARIABLES)}",
+    )
+    parser.add_argument("--store", type=Path, default=STORE_DIR, help="memory-mapped daily store")
+    parser.add_argument("--start-month", type=int, default=1, choices=range(1, 13), help="first month of a season")
+    parser.add_argument(
+        "--day-count",
+        action="append",
+        default=[],
+        metavar="COLUMN=VARIABLE<THRESHOLD",
+        help="add or redefine a day count, e.g. 'št. mrzlih dni=tmin<-15'",
+    )
+    parser.add_argument("--out", type=Path, default=OUT_PATH, help="table of a single station")
+    parser.add_argument("--out-dir", type=Path, default=PARTITION_DIR, help="partitions of several stations")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    inputs = resolve_inputs(args.source)
+    if not inputs:
+        raise SystemExit(f"No daily exports match {args.source}")
+    if ingest(inputs, args.store, args.chunksize):
+        print(f"Built {args.store}")
+
+    day_counts = {}
+    for spec in args.day_count:
+        column, _, rule = spec.partition("=")
+        for op in ("<=", ">=", "<", ">"):
+            var, sep, threshold = rule.partition(op)
+            if sep:
+                break
+        if not sep or var not in VARIABLES:
+            raise SystemExit(f"Bad --day-count {spec!r}; expected COLUMN=VARIABLE<THRESHOLD")
+        day_counts[column] = (var, op, float(threshold))
+
+    df = season_table(args.store, args.start_month, day_counts, args.chunksize)
+    for path in write_tables(df, args.out, args.out_dir):
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import shutil
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrument import stage
+
+
+DATA_PATH = Path("data/clean_ratece.csv")
+PARTITION_DIR = Path("data/clean")
+CACHE_DIR = Path("data/.cache")
+
+YEAR_COLUMN = "leto"
+STATION_COLUMN = "station"
+DATE_COLUMNS = ("datum abs. min T", "datum max višine snega")
+
+# Bump when the parsing rules or the canonical filter change, so stale caches
+# built from the same source bytes are not reused.
+CACHE_VERSION = 1
+
+
+def column_dtypes() -> defaultdict:
+    # Every measurement column is numeric; only the year and date columns differ.
+    dtypes = defaultdict(lambda: "float64", {YEAR_COLUMN: "int64", STATION_COLUMN: "str"})
+    for col in DATE_COLUMNS:
+        dtypes[col] = "str"
+    return dtypes
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def canonical_filter(df: pd.DataFrame) -> pd.DataFrame:
+    # ARSO exports carry placeholder years with no measurements at all (1948 for
+    # Rateče); drop those and keep partially observed years for the caller.
+    values = df.drop(columns=[STATION_COLUMN, YEAR_COLUMN, *DATE_COLUMNS], errors="ignore")
+    df = df[values.notna().any(axis=1)]
+    keys = [c for c in (STATION_COLUMN, YEAR_COLUMN) if c in df.columns]
+    return df.sort_values(keys, kind="stable").reset_index(drop=True)
+
+
+def parse_clean(path: Path = DATA_PATH) -> pd.DataFrame:
+    with stage("parse_csv"):
+        df = pd.read_csv(path, dtype=column_dtypes())
+        return canonical_filter(df)
+
+
+def _cache_prefix(path: Path) -> str:
+    # Several stations share a file name, so the source location is part of the key.
+    location = hashlib.sha256(str(Path(path).resolve()).encode("utf-8")).hexdigest()
+    return f"{Path(path).stem}-{location[:8]}-v{CACHE_VERSION}"
+
+
+def _cache_path(path: Path, digest: str) -> Path:
+    return CACHE_DIR / f"{_cache_prefix(path)}-{digest[:16]}"
+
+
+def _write_cache(df: pd.DataFrame, target: Path, prefix: str) -> None:
+    # Per-process scratch name: parallel pipeline stages may build the same
+    # cache at once, and the last rename wins.
+    tmp = target.with_name(f"{target.name}.tmp{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col].to_numpy()
+        if values.dtype == object:
+            values = df[col].fillna("").to_numpy(dtype=str)
+        np.save(tmp / f"{i}.npy", values, allow_pickle=False)
+        columns.append(col)
+    (tmp / "columns.json").write_text(json.dumps(columns, ensure_ascii=False), encoding="utf-8")
+
+    # Drop caches of earlier revisions of the same source file.
+    for old in CACHE_DIR.glob(f"{prefix}-*"):
+        if not old.name.startswith(target.name):
+            shutil.rmtree(old, ignore_errors=True)
+    try:
+        tmp.rename(target)
+    except OSError:
+        if not (target / "columns.json").exists():
+            raise
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _read_cache(target: Path) -> pd.DataFrame:
+    columns = json.loads((target / "columns.json").read_text(encoding="utf-8"))
+    data = {}
+    for i, col in enumerate(columns):
+        values = np.load(target / f"{i}.npy", mmap_mode="r", allow_pickle=False)
+        if values.dtype.kind == "U":
+            data[col] = pd.Series(values, dtype="str").replace("", np.nan)
+        else:
+            data[col] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+def load_clean(path: Path = DATA_PATH, use_cache: bool = True) -> pd.DataFrame:
+    """Cleaned winter table with explicit dtypes and the canonical row filter.
+
+    The parsed table is cached as one memory-mapped ``.npy`` file per column,
+    keyed by the SHA-256 of the source CSV, so repeated runs on unchanged
+    inputs skip text parsing and dtype inference entirely.
+    """
+    if not use_cache:
+        return parse_clean(path)
+
+    target = _cache_path(path, file_hash(path))
+    if (target / "columns.json").exists():
+        with stage("read_cache"):
+            return _read_cache(target)
+
+    df = parse_clean(path)
+    try:
+        _write_cache(df, target, _cache_prefix(path))
+    except OSError:
+        # A read-only checkout still gets the parsed frame, just uncached.
+        pass
+    return df
+
+
+def iter_stations(df: pd.DataFrame):
+    """Yield ``(station, frame)`` pairs; a single-station table yields ``(None, df)``."""
+    if STATION_COLUMN not in df.columns:
+        yield None, df
+        return
+    for station, station_df in df.groupby(STATION_COLUMN, sort=True):
+        yield station, station_df.drop(columns=[STATION_COLUMN]).reset_index(drop=True)
+
+
+def load_stations(root: Path = PARTITION_DIR, use_cache: bool = True) -> pd.DataFrame:
+    """All ``station=<id>`` partitions written by ``clean_ratece.py`` in one frame."""
+    frames = []
+    for part in sorted(Path(root).glob("station=*/*.csv")):
+        df = load_clean(part, use_cache=use_cache)
+        df.insert(0, STATION_COLUMN, part.parent.name.split("=", 1)[1])
+        frames.append(df)
+    if not frames:
+        raise FileNotFoundError(f"No station partitions under {root}")
+    return canonical_filter(pd.concat(frames, ignore_index=True))
@@ -0,0 +1,126 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+
+LEVELS_DIR = Path("web/data/levels")
+# Points per series at each zoom level. The model artifact carries the first
+# level; finer ones are separate files the page fetches when a chart is wider
+# than the level it shows.
+LEVELS = (500, 2000, 8000)
+
+# Chart id in web/index.html -> (series drawn, series only read by tooltips).
+# Points are picked from the drawn series; every series is sliced alike so the
+# tooltips stay index-aligned.
+CHARTS = {
+    "tempChart": (["avgTemp"], []),
+    "snowChart": (["maxSnow", "snowDays"], ["avgTemp"]),
+    "extremesChart": (["minTemp"], ["avgTemp", "iceDays"]),
+    "snowComparisonChart": (["snowDays", "snowfallDays"], []),
+    "frostChart": (["frostDays", "iceDays"], []),
+    "tempComparisonChart": (["avgTemp", "avgMinTemp"], []),
+}
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of ``points`` samples of ``y``.
+
+    Missing values are skipped. The first and last observations are kept;
+    every bucket in between keeps the point spanning the largest triangle
+    with the point kept before it and the mean of the next bucket. One pass,
+    O(n).
+    """
+    idx = np.flatnonzero(~np.isnan(y))
+    if len(idx) <= max(points, 2):
+        return idx
+    x, y = np.asarray(x, dtype=float)[idx], np.asarray(y, dtype=float)[idx]
+    edges = np.linspace(1, len(idx) - 1, points - 1).astype(np.int64)
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, len(idx) - 1
+    a = 0
+    for b in range(points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        nxt = slice(hi, edges[b + 2]) if b + 2 < len(edges) else slice(len(idx) - 1, len(idx))
+        cx, cy = x[nxt].mean(), y[nxt].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return idx[keep]
+
+
+def level_index(years: np.ndarray, series: dict, keys: list[str], points: int) -> np.ndarray:
+    """Union of the LTTB picks of ``keys``: one shared x axis for a chart."""
+    picks = [lttb(years, np.asarray(series[k], dtype=float), points) for k in keys if k in series]
+    return np.unique(np.concatenate(picks)) if picks else np.arange(len(years))
+
+
+def _take(values: list, index: np.ndarray) -> list:
+    return [values[i] for i in index]
+
+
+def _values(artifact: dict, key: str) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in artifact["series"][key]["values"]])
+
+
+def coarsen(artifact: dict, points: int = LEVELS[0]) -> dict:
+    """The artifact with every per-year list cut to the coarse level.
+
+    Unchanged when no series is longer than ``points``."""
+    years = np.asarray(artifact["years"], dtype=float)
+    if len(years) <= points:
+        return artifact
+    series = {key: _values(artifact, key) for key in artifact["series"]}
+    index = level_index(years, series, list(series), points)
+    out = dict(artifact, years=_take(artifact["years"], index))
+    out["series"] = {}
+    for key, models in artifact["series"].items():
+        out["series"][key] = {
+            "values": _take(models["values"], index),
+            "linear": dict(models["linear"], fitted=_take(models["linear"]["fitted"], index)),
+            "holt": dict(models["holt"], fitted=_take(models["holt"]["fitted"], index)),
+        }
+    out["resolution"] = {"points": points, "total": len(years)}
+    return out
+
+
+def chart_levels(artifact: dict, levels=LEVELS) -> dict:
+    """``{chart: {points: level}}`` for the zoom levels finer than the coarse one.
+
+    A level holds the chart's years and, per series, values and Holt fits
+    sliced to the LTTB picks of the drawn series; a level at least as long
+    as the history is the full series and ends the list.
+    """
+    years = np.asarray(artifact["years"], dtype=float)
+    out = {}
+    for chart, (drawn, extra) in CHARTS.items():
+        keys = [k for k in drawn + extra if k in artifact["series"]]
+        series = {k: _values(artifact, k) for k in keys}
+        out[chart] = {}
+        for coarser, points in zip(levels, levels[1:]):
+            if len(years) <= coarser:
+                break
+            index = level_index(years, series, drawn, points)
+            out[chart][points] = {
+                "points": points,
+                "years": _take(artifact["years"], index),
+                "values": {k: _take(artifact["series"][k]["values"], index) for k in keys},
+                "holt": {k: _take(artifact["series"][k]["holt"]["fitted"], index) for k in keys},
+            }
+    return {chart: levels for chart, levels in out.items() if levels}
+
+
+def write_levels(artifact: dict, root: Path = LEVELS_DIR, levels=LEVELS) -> dict:
+    """Write the zoom levels to ``root/<chart>/<points>.json``; returns the
+    manifest ``{chart: [points, ...]}`` for the artifact."""
+    shutil.rmtree(root, ignore_errors=True)
+    manifest = {}
+    for chart, by_points in chart_levels(artifact, levels).items():
+        (root / chart).mkdir(parents=True, exist_ok=True)
+        for points, level in by_points.items():
+            (root / chart / f"{points}.json").write_text(
+                json.dumps(level, ensure_ascii=False, separators=(",", ":")) + "\n", encoding="utf-8"
+            )
+        manifest[chart] = sorted(by_points)
+    return manifest
@@ -1,9 +1,29 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+import instrument
+from backtest import (
+    HOLT_BACKENDS,
+    HoltForecast,
+    batch_holt_forecast,
+    batch_holt_predictions,
+    holt_cache_model,
+    holt_forecast,
+    holt_forecast_key,
+    rolling_backtest,
+)
+from dataset import iter_stations, load_clean, load_stations
+from holt import fit_holt_batch
+from instrument import stage
+from intervals import METHODS, PATHS, SEED, IntervalSpec, model_spec, simulate_intervals
+from model_cache import MAX_MB, ModelCache, Shard
+from model_zoo import BUDGET, MODELS, successive_halving
 
 
-DATA_PATH = "data/clean_ratece.csv"
 MODEL_SUMMARY_PATH = "analysis/forecast_model_summary.csv"
 FORECAST_PATH = "analysis/forecast_2026_2035.csv"
 
@@ -19,47 +39,47 @@ VARIABLES = {
 }
 
 
-def mae_rmse(y_true: np.ndarray, y_pred: np.ndarray) -> tuple[float, float]:
-    err = y_true - y_pred
-    mae = float(np.mean(np.abs(err)))
-    rmse = float(np.sqrt(np.mean(err**2)))
-    return mae, rmse
-
-
-def one_step_backtest(series: np.ndarray, years: np.ndarray, n_test: int = 15) -> dict:
-    start = len(series) - n_test
-    y_true = []
-    preds = {"naive": [], "linear": [], "holt": []}
-
-    for i in range(start, len(series)):
-        train = series[:i]
-        train_years = years[:i]
-        y_true.append(series[i])
+def one_step_backtest(
+    series: np.ndarray,
+    years: np.ndarray,
+    n_test: int = 15,
+    exact: bool = False,
+    backend: str = "statsmodels",
+    holt_predictions: list[float] | None = None,
+    cache: Shard | None = None,
+    warm_start: bool = False,
+) -> dict:
+    return rolling_backtest(
+        series,
+        years,
+        n_test=n_test,
+        exact=exact,
+        backend=backend,
+        holt_predictions=holt_predictions,
+        cache=cache,
+        warm_start=warm_start,
+    )
 
-        preds["naive"].append(float(train[-1]))
 
-        coeff = np.polyfit(train_years, train, 1)
-        preds["linear"].append(float(coeff[0] * years[i] + coeff[1]))
-
-        fit = ExponentialSmoothing(
-            train,
-            trend="add",
-            seasonal=None,
-            initialization_method="estimated",
-        ).fit(optimized=True)
-        preds["holt"].append(float(fit.forecast(1)[0]))
-
-    y_true_arr = np.array(y_true, dtype=float)
-    result = {"test_start_year": int(years[start]), "test_end_year": int(years[-1]), "metrics": {}}
-    for model_name, y_pred in preds.items():
-        y_pred_arr = np.array(y_pred, dtype=float)
-        mae, rmse = mae_rmse(y_true_arr, y_pred_arr)
-        result["metrics"][model_name] = {"mae": mae, "rmse": rmse}
-    return result
+def fit_and_forecast(
+    model_name: str,
+    series: np.ndarray,
+    years: np.ndarray,
+    horizon: int = 10,
+    backend: str = "statsmodels",
+    cache: Shard | None = None,
+) -> np.ndarray:
+    with stage("fit_and_forecast", model=model_name):
+        return _fit_and_forecast(model_name, series, years, horizon, backend, cache)
 
 
-def fit_and_forecast(
-    model_name: str, series: np.ndarray, years: np.ndarray, horizon: int = 10
+def _fit_and_forecast(
+    model_name: str,
+    series: np.ndarray,
+    years: np.ndarray,
+    horizon: int,
+    backend: str,
+    cache: Shard | None,
 ) -> np.ndarray:
     future_years = np.arange(int(years[-1]) + 1, int(years[-1]) + horizon + 1)
     if model_name == "naive":
@@ -68,69 +88,269 @@ def fit_and_forecast(
         coeff = np.polyfit(years, series, 1)
         fc = coeff[0] * future_years + coeff[1]
     elif model_name == "holt":
-        fit = ExponentialSmoothing(
-            series,
-            trend="add",
-            seasonal=None,
-            initialization_method="estimated",
-        ).fit(optimized=True)
-        fc = np.array(fit.forecast(horizon), dtype=float)
+        fc = holt_forecast(series, horizon, backend, years=years, cache=cache).forecast
     else:
         raise ValueError(f"Unknown model: {model_name}")
     return fc
 
 
-def main() -> None:
-    df = pd.read_csv(DATA_PATH)
-    df = df[df["leto"] >= 1949].copy().sort_values("leto")
-    years = df["leto"].to_numpy(dtype=float)
+def forecast_unit(
+    station: str | None,
+    key: str,
+    years: np.ndarray,
+    series: np.ndarray,
+    exact: bool,
+    backend: str = "statsmodels",
+    warm_start: bool = False,
+    holt: dict | None = None,
+    models: ModelCache | None = None,
+    zoo_budget: int | None = None,
+) -> tuple[list[dict], list[dict], IntervalSpec]:
+    # One (station, variable) work unit; runs unchanged in a worker process.
+    # ``holt`` carries backtest predictions and a forecast fit already made in
+    # a cross-unit batch (NumPy backend). Interval columns are filled in by run()
+    # from the returned spec, in one simulation over all units.
+    holt = holt or {}
+    observed = ~np.isnan(series)
+    years = years[observed]
+    series = series[observed]
+    prefix = {} if station is None else {"station": station}
+    if zoo_budget is not None:
+        return _zoo_unit(prefix, key, years, series, zoo_budget)
+    cache = None if models is None else models.shard(station, key, holt_cache_model(warm_start and not exact, backend))
+
+    bt = one_step_backtest(
+        series,
+        years,
+        n_test=15,
+        exact=exact,
+        backend=backend,
+        holt_predictions=holt.get("backtest"),
+        cache=cache,
+        warm_start=warm_start,
+    )
+    metrics = bt["metrics"]
+
+    best_model = min(metrics.keys(), key=lambda m: (metrics[m]["mae"], metrics[m]["rmse"]))
 
     model_rows = []
-    forecast_rows = []
-
-    for key, col in VARIABLES.items():
-        series = df[col].to_numpy(dtype=float)
-        bt = one_step_backtest(series, years, n_test=15)
-        metrics = bt["metrics"]
-
-        best_model = min(metrics.keys(), key=lambda m: (metrics[m]["mae"], metrics[m]["rmse"]))
-        best_rmse = metrics[best_model]["rmse"]
-
-        for model_name in ["naive", "linear", "holt"]:
-            model_rows.append(
-                {
-                    "variable": key,
-                    "model": model_name,
-                    "test_start_year": bt["test_start_year"],
-                    "test_end_year": bt["test_end_year"],
-                    "mae": round(metrics[model_name]["mae"], 3),
-                    "rmse": round(metrics[model_name]["rmse"], 3),
-                    "best_model": model_name == best_model,
-                }
-            )
-
-        fc = fit_and_forecast(best_model, series, years, horizon=10)
-        # Approximate 95% prediction interval from one-step RMSE, widened by sqrt(h).
-        # This is a practical approximation, not a full probabilistic model interval.
-        for h, value in enumerate(fc, start=1):
-            width = 1.96 * best_rmse * np.sqrt(h)
-            lo = float(value - width)
-            hi = float(value + width)
-            if any(token in key for token in ["days", "snow_cm"]):
-                lo = max(0.0, lo)
-                value = max(0.0, float(value))
-                hi = max(0.0, hi)
-
-            forecast_rows.append(
-                {
-                    "variable": key,
-                    "model": best_model,
-                    "year": int(years[-1]) + h,
-                    "forecast": round(float(value), 3),
-                    "pi95_low_approx": round(lo, 3),
-                    "pi95_high_approx": round(hi, 3),
-                }
-            )
+    for model_name in ["naive", "linear", "holt"]:
+        model_rows.append(
+            {
+                **prefix,
+                "variable": key,
+                "model": model_name,
+                "test_start_year": bt["test_start_year"],
+                "test_end_year": bt["test_end_year"],
+                "mae": round(metrics[model_name]["mae"], 3),
+                "rmse": round(metrics[model_name]["rmse"], 3),
+                "best_model": model_name == best_model,
+            }
+        )
+
+    # Holt intervals need the fit behind the forecast, not just its values.
+    fit = None
+    if best_model == "holt":
+        fit = holt.get("forecast")
+        if fit is None:
+            with stage("fit_and_forecast", model="holt"):
+                fit = holt_forecast(series, 10, backend, years=years, cache=cache)
+        fc = fit.forecast
+    else:
+        fc = fit_and_forecast(best_model, series, years, horizon=10, backend=backend, cache=cache)
+    if cache is not None:
+        cache.save()
+    floor = _floor(key)
+    forecast_rows = _forecast_rows(prefix, key, best_model, years, fc, floor)
+    return model_rows, forecast_rows, model_spec(best_model, series, years, fc, floor, fit)
+
+
+def _floor(key: str) -> float:
+    # Counts and snow depths cannot go below zero.
+    return 0.0 if any(token in key for token in ["days", "snow_cm"]) else -np.inf
+
+
+def _forecast_rows(prefix: dict, key: str, model: str, years: np.ndarray, fc: np.ndarray, floor: float) -> list[dict]:
+    return [
+        {
+            **prefix,
+            "variable": key,
+            "model": model,
+            "year": int(years[-1]) + h,
+            "forecast": round(max(floor, float(value)), 3),
+        }
+        for h, value in enumerate(fc, start=1)
+    ]
+
+
+def _zoo_unit(
+    prefix: dict, key: str, years: np.ndarray, series: np.ndarray, budget: int
+) -> tuple[list[dict], list[dict], IntervalSpec]:
+    # Every model_zoo candidate, selected by successive halving. Models dropped
+    # early report the metrics and years of the origins they were scored on,
+    # and ``origins`` tells them apart from the full backtests.
+    selection = successive_halving(series, years, budget=budget)
+    best_model = selection["best"]
+    model_rows = [
+        {
+            **prefix,
+            "variable": key,
+            "model": model_name,
+            "test_start_year": m["test_start_year"],
+            "test_end_year": m["test_end_year"],
+            "mae": round(m["mae"], 3),
+            "rmse": round(m["rmse"], 3),
+            "origins": m["origins"],
+            "best_model": model_name == best_model,
+        }
+        for model_name, m in selection["metrics"].items()
+    ]
+    fit = MODELS[best_model](years, series, 10)
+    floor = _floor(key)
+    spec = IntervalSpec(fit.forecast, fit.weights, fit.residuals - fit.residuals.mean(), floor)
+    return model_rows, _forecast_rows(prefix, key, best_model, years, fit.forecast, floor), spec
+
+
+def _holt_batches(units: list[tuple], models: ModelCache | None) -> list[dict]:
+    # All Holt fits of all units in two engine calls: the backtest origins and
+    # the full series for the final forecast. Cached fits are left out.
+    observed = [~np.isnan(unit[3]) for unit in units]
+    series = [unit[3][m] for unit, m in zip(units, observed)]
+    years = [unit[2][m] for unit, m in zip(units, observed)]
+    caches = None
+    if models is not None:
+        caches = [models.shard(unit[0], unit[1], holt_cache_model(False, "numpy")) for unit in units]
+    backtests = batch_holt_predictions(series, 15, years, caches)
+
+    forecasts = [None] * len(units)
+    keys = [None] * len(units)
+    if caches:
+        for j, (y, s, cache) in enumerate(zip(years, series, caches)):
+            keys[j] = holt_forecast_key(10, y, s)
+            hit = cache.get(keys[j])
+            forecasts[j] = None if hit is None else HoltForecast.from_entry(hit)
+    todo = [j for j, fc in enumerate(forecasts) if fc is None]
+    if todo:
+        width = max(len(series[j]) for j in todo)
+        padded = np.array([np.r_[series[j], np.zeros(width - len(series[j]))] for j in todo])
+        fitted = fit_holt_batch(padded, np.array([len(series[j]) for j in todo]))
+        for row, j in enumerate(todo):
+            forecasts[j] = batch_holt_forecast(fitted, row, series[j], 10)
+            if caches:
+                caches[j].put(keys[j], forecasts[j].entry())
+    for cache in caches or []:
+        cache.save()
+    return [{"backtest": bt, "forecast": fc} for bt, fc in zip(backtests, forecasts)]
+
+
+def _run_unit(args: tuple) -> tuple[list[dict], list[dict], IntervalSpec]:
+    station, key = args[0], args[1]
+    with stage("unit", **({} if station is None else {"station": station}), variable=key):
+        return forecast_unit(*args)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Backtest and forecast all winter variables.")
+    parser.add_argument("--stations-dir", type=Path, help="station=<id> partitions instead of the single table")
+    parser.add_argument(
+        "--exact-backtest",
+        action="store_true",
+        help="refit every backtest origin from scratch instead of updating incrementally",
+    )
+    parser.add_argument(
+        "--warm-start",
+        action="store_true",
+        help="start each backtest origin's Holt fit from the previous optimum: faster, but it can settle "
+        "in other local optima than the cold fits of the published table",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="worker processes for (station, variable) units; output does not depend on it",
+    )
+    parser.add_argument(
+        "--holt-backend",
+        choices=HOLT_BACKENDS,
+        default="statsmodels",
+        help="statsmodels ExponentialSmoothing, or the batched NumPy engine in holt.py",
+    )
+    parser.add_argument(
+        "--model-cache",
+        action="store_true",
+        help="reuse Holt fits of backtest origins whose training data is unchanged (data/.cache/models)",
+    )
+    parser.add_argument("--model-cache-mb", type=float, default=MAX_MB, help="size bound of the model cache")
+    parser.add_argument(
+        "--zoo",
+        action="store_true",
+        help=f"choose among all model_zoo candidates ({', '.join(MODELS)}) by successive halving",
+    )
+    parser.add_argument(
+        "--zoo-budget", type=int, default=BUDGET, help="one-step model fits allowed per variable with --zoo"
+    )
+    parser.add_argument(
+        "--interval-method",
+        choices=METHODS,
+        default="bootstrap",
+        help="draw future errors from the model's residuals, or from a normal with their spread",
+    )
+    parser.add_argument("--interval-paths", type=int, default=PATHS, help="simulated futures per forecast")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed of the interval simulation")
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with instrument.from_arguments(args):
+        run(args)
+
+
+def run(args: argparse.Namespace) -> None:
+    df = load_stations(args.stations_dir) if args.stations_dir else load_clean()
+
+    units = []
+    for station, station_df in iter_stations(df):
+        years = station_df["leto"].to_numpy(dtype=float)
+        for key, col in VARIABLES.items():
+            if col not in station_df.columns:
+                continue
+            series = station_df[col].to_numpy(dtype=float)
+            units.append((station, key, years, series, args.exact_backtest, args.holt_backend, args.warm_start))
+
+    models = ModelCache(max_mb=args.model_cache_mb) if args.model_cache else None
+    if args.zoo:
+        units = [(*unit, None, None, args.zoo_budget) for unit in units]
+    elif args.holt_backend == "numpy":
+        # Batched up front; the units then need no cache of their own.
+        units = [(*unit, holt, None) for unit, holt in zip(units, _holt_batches(units, models))]
+    else:
+        units = [(*unit, None, models) for unit in units]
+
+    # map() yields in submission order, so rows come back in the serial order
+    # whatever the worker count or completion order.
+    if args.jobs > 1 and len(units) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(_run_unit, units))
+    else:
+        results = [_run_unit(unit) for unit in units]
+
+    if models is not None:
+        models.evict()
+
+    # 95% intervals: empirical quantiles of simulated future paths.
+    bounds = simulate_intervals(
+        [spec for _, _, spec in results],
+        method=args.interval_method,
+        paths=args.interval_paths,
+        seed=args.seed,
+        jobs=args.jobs,
+    )
+    for (_, unit_rows, _), (low, high) in zip(results, bounds):
+        for row, lo, hi in zip(unit_rows, low, high):
+            row["pi95_low"] = round(float(lo), 3)
+            row["pi95_high"] = round(float(hi), 3)
+
+    model_rows = [row for unit_rows, _, _ in results for row in unit_rows]
+    forecast_rows = [row for _, unit_rows, _ in results for row in unit_rows]
 
     pd.DataFrame(model_rows).to_csv(MODEL_SUMMARY_PATH, index=False)
     pd.DataFrame(forecast_rows).to_csv(FORECAST_PATH, index=False)
@@ -0,0 +1,164 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from instrument import stage
+
+
+COARSE_STEPS = 15  # grid 0, 1/14, ..., 1 for alpha and beta / alpha
+REFINE_TOL = 1e-7
+MAX_REFINE = 100
+# statsmodels keeps alpha this far inside (0, 1) and beta in [0, alpha].
+ALPHA_EPS = np.sqrt(np.finfo(float).eps)
+STENCIL = np.stack([g.ravel() for g in np.meshgrid([-1.0, 0.0, 1.0], [-1.0, 0.0, 1.0], indexing="ij")], axis=1)
+
+
+class HoltFit(NamedTuple):
+    alpha: np.ndarray
+    beta: np.ndarray
+    initial_level: np.ndarray
+    initial_trend: np.ndarray
+    level: np.ndarray
+    trend: np.ndarray
+    sse: np.ndarray
+    fitted: np.ndarray
+
+    def forecast(self, horizon: int) -> np.ndarray:
+        steps = np.arange(1, horizon + 1)
+        return self.level[:, None] + self.trend[:, None] * steps
+
+
+def _profile(y: np.ndarray, lengths: np.ndarray, alpha: np.ndarray, beta: np.ndarray, keep: bool = False):
+    # y: (k, n); alpha, beta: (k, m) candidates per series. The one-step
+    # predictions are linear in the initial level and trend, so the states are
+    # run three times at once -- driven by the data from zero, and from a unit
+    # initial level / trend with no data -- and the best (l0, b0) for every
+    # candidate follows from a 2x2 least-squares solve on the accumulated sums.
+    k, n = y.shape
+    shape = alpha.shape
+    one_a, one_b = 1.0 - alpha, 1.0 - beta
+    level = np.zeros((3,) + shape)  # driven by [data, unit l0, unit b0]
+    trend = np.zeros((3,) + shape)
+    level[1] = 1.0
+    trend[2] = 1.0
+    sums = np.zeros((6,) + shape)  # uu, uv, vv, ur, vr, rr
+    final = np.zeros((3, 2) + shape)
+    preds = np.zeros((3, n) + shape) if keep else None
+    weight = (np.arange(n) < lengths[:, None]).astype(float)[:, :, None]
+    ends = set((lengths - 1).tolist())
+
+    for t in range(n):
+        w = weight[:, t]
+        pred = level + trend
+        r = (y[:, t : t + 1] - pred[0]) * w
+        u = pred[1] * w
+        v = pred[2] * w
+        sums += (u * u, u * v, v * v, u * r, v * r, r * r)
+        if keep:
+            preds[:, t] = pred
+
+        new_level = one_a * pred
+        new_level[0] += alpha * y[:, t : t + 1]
+        trend = beta * (new_level - level) + one_b * trend
+        level = new_level
+        if t in ends:
+            done = (t == lengths - 1)[:, None]
+            final = np.where(done, np.stack([level, trend], axis=1), final)
+
+    suu, suv, svv, sur, svr, srr = sums
+    det = suu * svv - suv * suv
+    with np.errstate(divide="ignore", invalid="ignore"):
+        l0 = (svv * sur - suv * svr) / det
+        b0 = (suu * svr - suv * sur) / det
+        sse = srr - l0 * sur - b0 * svr
+    sse = np.where(det > 1e-12 * suu * svv, sse, np.inf)
+    return sse, l0, b0, final, preds
+
+
+def _sse(y, lengths, z):
+    # z: (k, m, 2) candidates as (alpha, beta / alpha), the parametrisation
+    # statsmodels optimises in.
+    return _profile(y, lengths, z[..., 0], z[..., 0] * z[..., 1])[0]
+
+
+def _refine(y, lengths, best, f_best):
+    # Newton steps on the profiled SSE, with gradient and Hessian from a 3x3
+    # finite-difference stencil around the current centre. The best point so
+    # far is always re-evaluated alongside, so the SSE never goes up; where the
+    # local quadratic is not convex the centre moves to the best stencil point.
+    k = len(best)
+    lo, hi = np.array([ALPHA_EPS, 0.0]), np.array([1.0 - ALPHA_EPS, 1.0])
+    h = np.full(k, 0.5 / (COARSE_STEPS - 1))
+    center = best.copy()
+    rows = np.arange(k)
+    for _ in range(MAX_REFINE):
+        if (h <= REFINE_TOL).all():
+            break
+        c = np.clip(center, lo + h[:, None], hi - h[:, None])
+        cand = np.concatenate([best[:, None], c[:, None] + h[:, None, None] * STENCIL], axis=1)
+        sse = _sse(y, lengths, cand)
+        i = np.argmin(sse, axis=1)
+        improved = sse[rows, i] < f_best
+        best = np.where(improved[:, None], cand[rows, i], best)
+        f_best = np.minimum(sse[rows, i], f_best)
+
+        f = sse[:, 1:].reshape(k, 3, 3)
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            g = np.stack([f[:, 2, 1] - f[:, 0, 1], f[:, 1, 2] - f[:, 1, 0]], axis=1) / 2
+            haa = f[:, 2, 1] - 2 * f[:, 1, 1] + f[:, 0, 1]
+            hrr = f[:, 1, 2] - 2 * f[:, 1, 1] + f[:, 1, 0]
+            har = (f[:, 2, 2] - f[:, 2, 0] - f[:, 0, 2] + f[:, 0, 0]) / 4
+            det = haa * hrr - har * har
+            newton = -np.stack([hrr * g[:, 0] - har * g[:, 1], haa * g[:, 1] - har * g[:, 0]], axis=1) / det[:, None]
+        convex = (haa > 0) & (det > 0) & np.isfinite(newton).all(axis=1)
+        step = np.where(convex[:, None], newton, (best - c) / h[:, None])
+        norm = np.linalg.norm(step, axis=1)
+        step *= np.minimum(1.0, 2.0 / np.maximum(norm, 1e-300))[:, None]
+        target = np.clip(c + h[:, None] * step, lo, hi)
+        moved = np.linalg.norm(target - c, axis=1) / h
+        center = target
+        # The stencil follows the step length down; it shrinks anyway when a
+        # round brings no improvement.
+        h = np.where(convex, h * np.clip(moved / 2, 0.05, 1.0), h)
+        h = np.where(improved | convex, h, h / 3)
+    return best
+
+
+def fit_holt_batch(series: np.ndarray, lengths: np.ndarray | None = None) -> HoltFit:
+    """Additive-trend Holt fits for every row of ``series`` at once.
+
+    Like ``ExponentialSmoothing(trend="add", initialization_method="estimated")``,
+    alpha, beta and the initial level and trend minimise the one-step SSE with
+    0 < alpha < 1 and 0 <= beta <= alpha. The initial states are solved exactly
+    for each candidate (alpha, beta); those come from a coarse grid refined by
+    shrinking local grids. Rows may be padded: ``lengths`` gives each row's
+    length. Where statsmodels stops in a local minimum this search can reach
+    a different, lower-SSE optimum, so the fits need not agree.
+    """
+    with stage("holt_batch", series=len(np.atleast_2d(series))):
+        return _fit(series, lengths)
+
+
+def _fit(series, lengths) -> HoltFit:
+    y = np.atleast_2d(np.asarray(series, dtype=float))
+    k, n = y.shape
+    lengths = np.full(k, n) if lengths is None else np.asarray(lengths)
+    y = np.where(np.arange(n) < lengths[:, None], y, 0.0)
+
+    grid = np.linspace(0.0, 1.0, COARSE_STEPS)
+    coarse = np.stack([g.ravel() for g in np.meshgrid(grid, grid, indexing="ij")], axis=1)
+    coarse = np.clip(coarse, [ALPHA_EPS, 0.0], [1.0 - ALPHA_EPS, 1.0])
+    sse = _sse(y, lengths, np.broadcast_to(coarse, (k,) + coarse.shape))
+    i = np.argmin(sse, axis=1)
+    best = _refine(y, lengths, coarse[i], sse[np.arange(k), i])
+    best_a, best_r = best[:, 0], best[:, 1]
+
+    best_b = best_a * best_r
+    sse, l0, b0, final, preds = _profile(y, lengths, best_a[:, None], best_b[:, None], keep=True)
+    l0, b0 = l0[:, 0], b0[:, 0]
+    final = final[..., 0]
+    level = final[0, 0] + l0 * final[1, 0] + b0 * final[2, 0]
+    trend = final[0, 1] + l0 * final[1, 1] + b0 * final[2, 1]
+    fitted = preds[0, :, :, 0].T + l0[:, None] * preds[1, :, :, 0].T + b0[:, None] * preds[2, :, :, 0].T
+    fitted = np.where(np.arange(n) < lengths[:, None], fitted, np.nan)
+    return HoltFit(best_a, best_b, l0, b0, level, trend, sse[:, 0], fitted)
@@ -0,0 +1,165 @@
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+
+# Set by enable() so process-pool workers record into the same file.
+ENV_VAR = "VREME_TRACE"
+
+_NULL = contextlib.nullcontext()
+_recorder = None
+
+
+class _Recorder:
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = None
+        self.out = None
+        self.tags = {}
+
+    def emit(self, event: dict) -> None:
+        # Reopen after a fork: each process appends whole lines on its own handle.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.out = sys.stderr if self.path == "-" else open(self.path, "a", encoding="utf-8", buffering=1)
+        self.out.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+def enable(path: str | Path) -> None:
+    """Record stage events as JSON lines to ``path`` ("-" for stderr)."""
+    global _recorder
+    os.environ[ENV_VAR] = str(path)
+    _recorder = _Recorder(str(path))
+
+
+def disable() -> None:
+    global _recorder
+    os.environ.pop(ENV_VAR, None)
+    if _recorder is not None and _recorder.out not in (None, sys.stderr):
+        _recorder.out.close()
+    _recorder = None
+
+
+def enabled() -> bool:
+    return _recorder is not None
+
+
+def stage(name: str, **tags):
+    """Time a block (wall and CPU). ``tags`` such as station, variable or model
+    are inherited by nested stages. A shared no-op context when disabled."""
+    if _recorder is None:
+        return _NULL
+    return _timed(name, tags)
+
+
+@contextlib.contextmanager
+def _timed(name: str, tags: dict):
+    outer = _recorder.tags
+    _recorder.tags = {**outer, **tags}
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        event = {
+            "stage": name,
+            **_recorder.tags,
+            "wall_s": time.perf_counter() - wall,
+            "cpu_s": time.process_time() - cpu,
+            "pid": os.getpid(),
+        }
+        _recorder.tags = outer
+        _recorder.emit(event)
+
+
+def record(name: str, **fields) -> None:
+    if _recorder is not None:
+        _recorder.emit({"stage": name, **_recorder.tags, **fields, "pid": os.getpid()})
+
+
+def holt_convergence(fit) -> None:
+    if _recorder is None:
+        return
+    info = fit.mle_retvals
+    record(
+        "holt_convergence",
+        converged=bool(info.get("success", False)),
+        iterations=int(info.get("nit", -1)),
+        evaluations=int(info.get("nfev", -1)),
+        message=str(info.get("message", "")),
+        sse=float(fit.sse),
+    )
+
+
+def summarize(path: str | Path, top: int = 10) -> str:
+    """Summary table of a trace file: per stage totals, the slowest
+    (station, variable) units and any Holt fits that did not converge."""
+    events = [json.loads(line) for line in Path(path).read_text(encoding="utf-8").splitlines() if line]
+    per_stage = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+    per_unit = defaultdict(float)
+    failed = []
+    for e in events:
+        if e["stage"] == "holt_convergence":
+            if not e["converged"]:
+                failed.append(e)
+            continue
+        s = per_stage[e["stage"]]
+        s[0] += 1
+        s[1] += e["wall_s"]
+        s[2] += e["cpu_s"]
+        s[3] = max(s[3], e["wall_s"])
+        if e["stage"] == "unit":
+            per_unit[(e.get("station"), e.get("variable"))] += e["wall_s"]
+
+    lines = [f"{'stage':<24}{'calls':>8}{'wall_s':>10}{'cpu_s':>10}{'max_s':>10}"]
+    for name, (calls, wall, cpu, longest) in sorted(per_stage.items(), key=lambda kv: -kv[1][1]):
+        lines.append(f"{name:<24}{calls:>8}{wall:>10.3f}{cpu:>10.3f}{longest:>10.3f}")
+    if per_unit:
+        lines.append("\nslowest units (wall_s)")
+        for (station, variable), wall in sorted(per_unit.items(), key=lambda kv: -kv[1])[:top]:
+            label = variable if station is None else f"{station}/{variable}"
+            lines.append(f"  {label:<30}{wall:>8.3f}")
+    converged = sum(1 for e in events if e["stage"] == "holt_convergence")
+    lines.append(f"\nholt fits: {converged}, not converged: {len(failed)}")
+    for e in failed[:top]:
+        where = "/".join(str(e[k]) for k in ("station", "variable", "model") if e.get(k) is not None)
+        lines.append(f"  {where or '-'}: {e['message']} (nit={e['iterations']})")
+    return "\n".join(lines)
+
+
+def add_arguments(parser) -> None:
+    parser.add_argument("--trace", help="write per-stage timing and fit diagnostics as JSON lines ('-' for stderr)")
+    parser.add_argument("--trace-summary", action="store_true", help="print a timing summary table at the end")
+
+
+@contextlib.contextmanager
+def from_arguments(args):
+    """Enable tracing for the duration of a script's main() if asked to."""
+    if not args.trace and not args.trace_summary:
+        yield
+        return
+    path = args.trace
+    # The summary is built from a file, so a summary-only run traces to a scratch one.
+    scratch = args.trace_summary and path in (None, "-")
+    if scratch:
+        fd, path = tempfile.mkstemp(prefix="vreme-trace-", suffix=".jsonl")
+        os.close(fd)
+    elif path != "-":
+        Path(path).write_text("", encoding="utf-8")
+    enable(path)
+    try:
+        yield
+    finally:
+        disable()
+        if args.trace_summary:
+            print(summarize(path), file=sys.stderr)
+        if scratch:
+            Path(path).unlink(missing_ok=True)
+
+
+if os.environ.get(ENV_VAR):
+    _recorder = _Recorder(os.environ[ENV_VAR])
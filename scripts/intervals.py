@@ -0,0 +1,155 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from backtest import HOLT_BURN_IN, HoltForecast
+from instrument import stage
+
+
+PATHS = 10_000
+CHUNK = 2_500  # paths per task; a chunk's draws are its only large array
+BINS = 4096
+SEED = 2026
+LEVEL = 0.95
+METHODS = ("bootstrap", "normal")
+
+
+class IntervalSpec(NamedTuple):
+    """Future paths of one forecast: ``center + errors @ weights.T``.
+
+    ``weights[h, j]`` is the effect of the error in step ``j`` on step ``h``
+    (the psi weights of the model's error-correction form), ``residuals`` the
+    pool errors are drawn from, and paths below ``floor`` are clamped to it.
+    """
+
+    center: np.ndarray
+    weights: np.ndarray
+    residuals: np.ndarray
+    floor: float = -np.inf
+
+
+def psi_weights(alpha: float, beta: float, horizon: int) -> np.ndarray:
+    """Weights of additive Holt, ``1`` on the diagonal and ``alpha * (1 + beta * lag)``
+    below it (``beta`` as statsmodels' smoothing_trend). ``alpha=1, beta=0``
+    is the random walk of the naive model, ``alpha=0`` independent errors
+    around a fixed line."""
+    lag = np.arange(horizon)[:, None] - np.arange(horizon)[None, :]
+    return np.where(lag > 0, alpha * (1 + beta * lag), 0.0) + np.eye(horizon)
+
+
+def model_spec(
+    model_name: str,
+    series: np.ndarray,
+    years: np.ndarray,
+    center: np.ndarray,
+    floor: float,
+    holt: HoltForecast | None = None,
+) -> IntervalSpec:
+    """In-sample one-step errors and psi weights of ``model_name``.
+
+    Holt's parameters and errors come from ``holt``, the fit that produced
+    ``center``; the paths stay centred on the model's point forecast."""
+    horizon = len(center)
+    if model_name == "naive":
+        residuals, weights = np.diff(series), psi_weights(1.0, 0.0, horizon)
+    elif model_name == "linear":
+        coeff = np.polyfit(years, series, 1)
+        residuals, weights = series - np.polyval(coeff, years), psi_weights(0.0, 0.0, horizon)
+    elif model_name == "holt":
+        if holt is None:
+            raise ValueError("Holt intervals need the fit behind the forecast")
+        residuals = holt.residuals[HOLT_BURN_IN:]
+        weights = psi_weights(holt.alpha, holt.beta, horizon)
+    else:
+        raise ValueError(f"Unknown model: {model_name}")
+    residuals = residuals - residuals.mean()
+    return IntervalSpec(np.asarray(center, dtype=float), weights, residuals, floor)
+
+
+def _edges(spec: IntervalSpec, method: str) -> tuple[np.ndarray, np.ndarray]:
+    # Histogram range per step. Bootstrap paths cannot leave it; normal paths
+    # past eight standard deviations are counted in the edge bins.
+    if method == "bootstrap":
+        reach = np.abs(spec.residuals).max() * np.abs(spec.weights).sum(axis=1)
+    else:
+        reach = 8 * spec.residuals.std() * np.sqrt((spec.weights**2).sum(axis=1))
+    reach = np.maximum(reach, 1e-9)
+    lo = np.maximum(spec.center - reach, spec.floor)
+    hi = np.maximum(spec.center + reach, lo + 1e-9)
+    return lo, hi
+
+
+def simulate_chunk(spec: IntervalSpec, method: str, seed: int, key: tuple, paths: int) -> np.ndarray:
+    """Counts of ``paths`` simulated futures, shape ``(horizon, BINS + 1)``.
+
+    Column 0 counts paths clamped to the floor. The draws depend only on
+    ``seed`` and ``key``, so chunks can run in any process and order."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+    horizon = len(spec.center)
+    if method == "bootstrap":
+        errors = rng.choice(spec.residuals, size=(paths, horizon))
+    else:
+        errors = rng.normal(0.0, spec.residuals.std(), size=(paths, horizon))
+    sims = spec.center + errors @ spec.weights.T
+
+    lo, hi = _edges(spec, method)
+    scaled = (sims - lo) / (hi - lo) * BINS
+    bins = np.clip(scaled.astype(np.int64), 0, BINS - 1) + 1
+    bins = np.where(sims <= spec.floor, 0, bins)
+    flat = bins + np.arange(horizon) * (BINS + 1)
+    return np.bincount(flat.ravel(), minlength=horizon * (BINS + 1)).reshape(horizon, BINS + 1)
+
+
+def quantiles(spec: IntervalSpec, method: str, counts: np.ndarray, probs) -> np.ndarray:
+    """Quantiles per step from chunk counts, linear within a bin: ``(len(probs), horizon)``."""
+    lo, hi = _edges(spec, method)
+    total = counts.sum(axis=1, keepdims=True)
+    cum = np.cumsum(counts, axis=1)
+    out = []
+    for p in probs:
+        target = p * total
+        k = np.minimum((cum < target).sum(axis=1), BINS)
+        below = np.where(k > 0, np.take_along_axis(cum, np.maximum(k - 1, 0)[:, None], axis=1), 0)[:, 0]
+        inside = counts[np.arange(len(counts)), k]
+        frac = np.clip((target[:, 0] - below) / np.maximum(inside, 1), 0.0, 1.0)
+        value = lo + (k - 1 + frac) / BINS * (hi - lo)
+        out.append(np.where(k == 0, np.maximum(spec.floor, lo), value))
+    return np.array(out)
+
+
+def _chunk_task(args: tuple) -> np.ndarray:
+    return simulate_chunk(*args)
+
+
+def simulate_intervals(
+    specs: list[IntervalSpec],
+    level: float = LEVEL,
+    method: str = "bootstrap",
+    paths: int = PATHS,
+    chunk: int = CHUNK,
+    seed: int = SEED,
+    jobs: int = 1,
+) -> list[np.ndarray]:
+    """Central ``level`` simulation intervals, ``(2, horizon)`` per spec.
+
+    Paths are simulated in chunks of ``chunk`` and only their histograms are
+    kept, so memory stays at one chunk per process however many paths are
+    drawn. Chunk ``c`` of spec ``i`` always uses seed ``(seed, i, c)`` and
+    counts add exactly, so the result does not depend on ``jobs``.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown interval method: {method}")
+    sizes = [min(chunk, paths - start) for start in range(0, paths, chunk)]
+    tasks = [(spec, method, seed, (i, c), n) for i, spec in enumerate(specs) for c, n in enumerate(sizes)]
+    with stage("intervals", series=len(specs), paths=paths):
+        if jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                counts = list(pool.map(_chunk_task, tasks, chunksize=max(1, len(tasks) // (4 * jobs))))
+        else:
+            counts = [_chunk_task(task) for task in tasks]
+    out = []
+    for i, spec in enumerate(specs):
+        total = sum(counts[i * len(sizes) : (i + 1) * len(sizes)])
+        out.append(quantiles(spec, method, total, [(1 - level) / 2, (1 + level) / 2]))
+    return out
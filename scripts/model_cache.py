@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from dataset import CACHE_DIR
+
+
+MODEL_CACHE_DIR = CACHE_DIR / "models"
+MAX_MB = 64
+
+
+def prefix_keys(years: np.ndarray, series: np.ndarray, lengths) -> list[str]:
+    """SHA-256 of ``(years[:i], series[:i])`` for each ``i`` in ``lengths``
+    (ascending), hashed incrementally in one pass over the series."""
+    # (year, value) pairs row by row, so the digest does not depend on how
+    # the prefix was split into chunks.
+    pairs = np.column_stack([np.asarray(years, dtype=float), np.asarray(series, dtype=float)])
+    h = hashlib.sha256()
+    keys, done = [], 0
+    for i in lengths:
+        h.update(pairs[done:i].tobytes())
+        done = i
+        keys.append(h.copy().hexdigest())
+    return keys
+
+
+class Shard:
+    """Cached fits of one (station, variable, model), keyed by prefix hash.
+
+    Only keys looked up in this run survive ``save``: when a past value is
+    revised, every later prefix hashes differently, misses, is refitted, and
+    the stale entries are dropped.
+    """
+
+    def __init__(self, path: Path, ident: dict):
+        self.path = path
+        self.ident = ident
+        self.entries = {}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("ident") == ident:
+                    self.entries = data["entries"]
+            except (OSError, ValueError, KeyError):
+                pass
+        self.used = set()
+        self.dirty = False
+        self.hits = 0
+
+    def get(self, key: str) -> dict | None:
+        self.used.add(key)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        self.used.add(key)
+        self.entries[key] = entry
+        self.dirty = True
+
+    def save(self) -> None:
+        if self.dirty or set(self.entries) != self.used:
+            entries = {k: v for k, v in self.entries.items() if k in self.used}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.tmp{os.getpid()}")
+            tmp.write_text(json.dumps({"ident": self.ident, "entries": entries}), encoding="utf-8")
+            tmp.replace(self.path)
+        elif self.path.exists():
+            # Mark as recently used for eviction.
+            os.utime(self.path)
+
+
+class ModelCache:
+    def __init__(self, root: Path = MODEL_CACHE_DIR, max_mb: float = MAX_MB):
+        self.root = Path(root)
+        self.max_bytes = int(max_mb * 2**20)
+
+    def shard(self, station: str | None, variable: str, model: str) -> Shard:
+        ident = {"station": station, "variable": variable, "model": model}
+        name = hashlib.sha256(json.dumps(ident, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+        return Shard(self.root / f"{name}.json", ident)
+
+    def evict(self) -> int:
+        """Delete least recently used shards until the cache fits its size bound."""
+        files = sorted(self.root.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        removed = 0
+        for path in files:
+            if total <= self.max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
@@ -0,0 +1,201 @@
+import math
+import warnings
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from backtest import HOLT_BURN_IN, fit_holt, mae_rmse
+from instrument import stage
+from nonparametric import theil_sen
+
+
+N_TEST = 15
+# Successive halving: every model is scored on MIN_ORIGINS backtest origins,
+# the better 1/ETA (at least two) go on with ETA times as many, until the
+# survivors have the full backtest. BUDGET caps the one-step fits per variable.
+MIN_ORIGINS = 2
+ETA = 2
+BUDGET = 60
+
+
+class ZooFit(NamedTuple):
+    """A model fitted to one training series: the point forecast, in-sample
+    one-step errors and psi weights ``(horizon, horizon)`` as used by
+    ``intervals.IntervalSpec``."""
+
+    forecast: np.ndarray
+    residuals: np.ndarray
+    weights: np.ndarray
+
+
+def _weights(psi: np.ndarray) -> np.ndarray:
+    # weights[h, j] = psi[h - j] below the diagonal, 1 on it.
+    horizon = len(psi)
+    lag = np.arange(horizon)[:, None] - np.arange(horizon)[None, :]
+    return np.where(lag >= 0, psi[np.clip(lag, 0, None)], 0.0)
+
+
+def _independent(horizon: int) -> np.ndarray:
+    return np.r_[1.0, np.zeros(horizon - 1)]
+
+
+def naive(years, series, horizon) -> ZooFit:
+    return ZooFit(np.full(horizon, series[-1]), np.diff(series), _weights(np.ones(horizon)))
+
+
+def linear(years, series, horizon) -> ZooFit:
+    coeff = np.polyfit(years, series, 1)
+    future = years[-1] + np.arange(1, horizon + 1)
+    return ZooFit(np.polyval(coeff, future), series - np.polyval(coeff, years), _weights(_independent(horizon)))
+
+
+def theil_sen_line(years, series, horizon) -> ZooFit:
+    sen = theil_sen(series, years)
+    future = years[-1] + np.arange(1, horizon + 1)
+    resid = series - (sen.intercept + sen.slope * years)
+    return ZooFit(sen.intercept + sen.slope * future, resid, _weights(_independent(horizon)))
+
+
+def climatology(window: int) -> Callable:
+    def fit(years, series, horizon) -> ZooFit:
+        recent = series[-window:]
+        mean = recent.mean()
+        return ZooFit(np.full(horizon, mean), recent - mean, _weights(_independent(horizon)))
+
+    return fit
+
+
+def holt(damped: bool) -> Callable:
+    def fit(years, series, horizon) -> ZooFit:
+        if damped:
+            from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+            with stage("holt_fit", model="holt_damped"), warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                model = ExponentialSmoothing(
+                    series, trend="add", damped_trend=True, initialization_method="estimated"
+                ).fit(optimized=True)
+            phi = model.params["damping_trend"]
+        else:
+            model = fit_holt(series)
+            phi = 1.0
+        alpha, beta = model.params["smoothing_level"], model.params["smoothing_trend"]
+        psi = alpha * (1 + beta * np.cumsum(phi ** np.arange(1, horizon)))
+        residuals = np.asarray(model.resid, dtype=float)[HOLT_BURN_IN:]
+        return ZooFit(np.asarray(model.forecast(horizon), dtype=float), residuals, _weights(np.r_[1.0, psi]))
+
+    return fit
+
+
+def arima(order: tuple[int, int, int], trend: str) -> Callable:
+    def fit(years, series, horizon) -> ZooFit:
+        from statsmodels.tsa.arima.model import ARIMA
+        from statsmodels.tsa.arima_process import arma2ma
+
+        with stage("arima_fit", model=f"arima{order}"), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = ARIMA(series, order=order, trend=trend).fit()
+        ar = np.r_[1.0, -model.arparams]
+        for _ in range(order[1]):
+            ar = np.convolve(ar, [1.0, -1.0])
+        psi = arma2ma(ar, np.r_[1.0, model.maparams], lags=horizon)
+        resid = np.asarray(model.resid)[order[1]:]
+        return ZooFit(np.asarray(model.forecast(horizon), dtype=float), resid, _weights(psi))
+
+    return fit
+
+
+# Candidate name -> fit(years, series, horizon). The first three are the
+# models of the default backtest.
+MODELS = {
+    "naive": naive,
+    "linear": linear,
+    "holt": holt(damped=False),
+    "holt_damped": holt(damped=True),
+    "arima_100_ct": arima((1, 0, 0), "ct"),
+    "arima_011_t": arima((0, 1, 1), "t"),
+    "theil_sen": theil_sen_line,
+    "climatology_10": climatology(10),
+    "climatology_30": climatology(30),
+}
+
+
+def origin_order(n_test: int) -> list[int]:
+    """Backtest origins (offsets into the test window) in the order rungs add
+    them: the latest first, then always the one farthest from those taken, so
+    every prefix is spread over the whole window."""
+    order = [n_test - 1]
+    while len(order) < n_test:
+        rest = [i for i in range(n_test) if i not in order]
+        order.append(max(rest, key=lambda i: (min(abs(i - j) for j in order), i)))
+    return order
+
+
+def successive_halving(
+    series: np.ndarray,
+    years: np.ndarray,
+    models: dict = MODELS,
+    n_test: int = N_TEST,
+    budget: int = BUDGET,
+    min_origins: int = MIN_ORIGINS,
+    eta: int = ETA,
+) -> dict:
+    """Pick the best of ``models`` by one-step MAE (then RMSE) with a fraction
+    of a full backtest for each.
+
+    One-step predictions are kept across rungs, so a survivor only fits its
+    new origins. A rung that would exceed ``budget`` fits is not started; the
+    best survivor on the origins scored so far wins. Returns ``metrics`` per
+    model (``mae``, ``rmse`` and the first and last year of the origins it
+    was scored on), ``best`` and ``fits``.
+    """
+    series = np.asarray(series, dtype=float)
+    years = np.asarray(years, dtype=float)
+    start = len(series) - n_test
+    order = origin_order(n_test)
+    preds = {name: {} for name in models}
+    fits = 0
+
+    def score(name: str) -> tuple[float, float]:
+        done = sorted(preds[name])
+        y_pred = np.array([preds[name][i] for i in done])
+        return mae_rmse(series[[start + i for i in done]], y_pred)
+
+    survivors, k = list(models), min(min_origins, n_test)
+    while True:
+        todo = [(name, i) for name in survivors for i in order[:k] if i not in preds[name]]
+        if fits and fits + len(todo) > budget:
+            break
+        for name, i in todo:
+            with stage("zoo_origin", model=name):
+                try:
+                    pred = models[name](years[: start + i], series[: start + i], 1).forecast[0]
+                except (ValueError, np.linalg.LinAlgError):
+                    pred = np.nan
+            preds[name][i] = pred if np.isfinite(pred) else np.inf
+            fits += 1
+        if k >= n_test or len(survivors) <= 1:
+            break
+        ranked = sorted(survivors, key=score)
+        survivors = ranked[: max(2, math.ceil(len(survivors) / eta))]
+        k = min(n_test, k * eta)
+
+    metrics = {}
+    for name in models:
+        if not preds[name]:
+            continue
+        mae, rmse = score(name)
+        metrics[name] = {
+            "mae": mae,
+            "rmse": rmse,
+            "test_start_year": int(years[start + min(preds[name])]),
+            "test_end_year": int(years[start + max(preds[name])]),
+            "origins": len(preds[name]),
+        }
+    # Only models scored on the most origins are comparable.
+    most = max(metrics[name]["origins"] for name in survivors)
+    best = min(
+        (name for name in survivors if metrics[name]["origins"] == most),
+        key=lambda name: (metrics[name]["mae"], metrics[name]["rmse"]),
+    )
+    return {"metrics": metrics, "best": best, "fits": fits}
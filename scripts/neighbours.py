@@ -0,0 +1,260 @@
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset import CACHE_DIR, PARTITION_DIR, STATION_COLUMN, YEAR_COLUMN, iter_stations, load_stations
+from forecast_all_variables import VARIABLES
+from instrument import stage
+
+
+NEIGHBOURS_PATH = Path("analysis/station_neighbours.csv")
+INDEX_PATH = CACHE_DIR / "neighbours" / "index.npz"
+TOP = 5
+MIN_OVERLAP = 20  # common winters for a correlation to count
+BLOCK = 256  # stations per batch of correlation rows
+
+
+def pairwise_corr(a: np.ndarray, b: np.ndarray, min_overlap: int = MIN_OVERLAP) -> tuple[np.ndarray, np.ndarray]:
+    """Pearson ``r`` and overlap of every column of ``a`` with every column of
+    ``b``, each pair over the years both observe.
+
+    ``a`` and ``b`` are ``(variables, years, stations)`` with NaN for missing
+    years. The masked sums of all pairs are six matrix products per variable;
+    columns are centred first so they do not cancel. Pairs with fewer than
+    ``min_overlap`` common years or no variance get NaN. Returns ``r`` and the
+    overlap, ``(variables, a stations, b stations)``.
+    """
+    ma, mb = ~np.isnan(a), ~np.isnan(b)
+    with np.errstate(invalid="ignore"):
+        xa = np.where(ma, a - np.nanmean(np.where(ma, a, np.nan), axis=1, keepdims=True), 0.0)
+        xb = np.where(mb, b - np.nanmean(np.where(mb, b, np.nan), axis=1, keepdims=True), 0.0)
+    ma, mb = ma.astype(float).transpose(0, 2, 1), mb.astype(float)
+    xat = xa.transpose(0, 2, 1)
+    n = ma @ mb
+    sa, sb = xat @ mb, ma @ xb
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = xat @ xb - sa * sb / n
+        va = (xat * xat) @ mb - sa * sa / n
+        vb = ma @ (xb * xb) - sb * sb / n
+        r = cov / np.sqrt(va * vb)
+    # Constant overlaps leave rounding noise in the variances.
+    r = np.where((n >= max(min_overlap, 2)) & (va > 1e-12) & (vb > 1e-12), np.clip(r, -1.0, 1.0), np.nan)
+    return r, n.astype(np.int64)
+
+
+def _ranked(neighbour: np.ndarray, r: np.ndarray, overlap: np.ndarray, top: int) -> tuple:
+    # The ``top`` best candidates along the last axis: highest r first, ties
+    # by station position, missing correlations last. Fewer candidates than
+    # ``top`` are padded as missing, the fill of a new row.
+    if r.shape[-1] < top:
+        pad = [(0, 0)] * (r.ndim - 1) + [(0, top - r.shape[-1])]
+        neighbour = np.pad(neighbour, pad, constant_values=-1)
+        r = np.pad(r, pad, constant_values=np.nan)
+        overlap = np.pad(overlap, pad)
+    order = np.lexsort((neighbour, np.where(np.isnan(r), np.inf, -r)), axis=-1)[..., :top]
+    neighbour, r, overlap = (np.take_along_axis(x, order, axis=-1) for x in (neighbour, r, overlap))
+    return np.where(np.isnan(r), -1, neighbour), r, overlap
+
+
+def _digest(years: np.ndarray, values: np.ndarray) -> str:
+    h = hashlib.sha256(np.asarray(years, dtype=np.int64).tobytes())
+    h.update(np.asarray(values, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+def station_series(df: pd.DataFrame, keys: list[str]) -> dict:
+    """``{station: (years, values)}`` with ``values`` shaped ``(years, keys)``."""
+    return {
+        station: (
+            station_df[YEAR_COLUMN].to_numpy(dtype=np.int64),
+            station_df[[VARIABLES[key] for key in keys]].to_numpy(dtype=float),
+        )
+        for station, station_df in iter_stations(df)
+    }
+
+
+class NeighbourIndex:
+    """The ``top`` most correlated stations of every station, per variable.
+
+    Keeps every station's values, so a station added later is correlated
+    against the others in one batched row and merged into their lists;
+    only stations whose list lost a member (a station removed or revised)
+    get their whole row recomputed.
+    """
+
+    def __init__(self, keys: list[str], top: int = TOP, min_overlap: int = MIN_OVERLAP):
+        self.keys = list(keys)
+        self.top = top
+        self.min_overlap = min_overlap
+        self.stations = []
+        self.digests = []
+        self.years = np.empty(0, dtype=np.int64)
+        self.values = np.empty((len(self.keys), 0, 0))
+        shape = (len(self.keys), 0, top)
+        self.neighbour = np.empty(shape, dtype=np.int64)
+        self.r = np.empty(shape)
+        self.overlap = np.empty(shape, dtype=np.int64)
+
+    def ident(self) -> dict:
+        return {"keys": self.keys, "top": self.top, "min_overlap": self.min_overlap}
+
+    @classmethod
+    def load(cls, path: Path, keys: list[str], top: int = TOP, min_overlap: int = MIN_OVERLAP) -> "NeighbourIndex":
+        """The index saved at ``path``, or an empty one when it is missing or
+        was built with other settings."""
+        index = cls(keys, top, min_overlap)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if json.loads(str(data["ident"])) != index.ident():
+                    return index
+                index.stations = data["stations"].tolist()
+                index.digests = data["digests"].tolist()
+                for name in ("years", "values", "neighbour", "r", "overlap"):
+                    setattr(index, name, data[name])
+        except (OSError, ValueError, KeyError):
+            pass
+        return index
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.stem}.tmp{os.getpid()}.npz")
+        np.savez(
+            tmp,
+            ident=json.dumps(self.ident()),
+            stations=np.array(self.stations, dtype=str),
+            digests=np.array(self.digests, dtype=str),
+            years=self.years,
+            values=self.values,
+            neighbour=self.neighbour,
+            r=self.r,
+            overlap=self.overlap,
+        )
+        tmp.replace(path)
+
+    def _drop(self, gone: list[int]) -> np.ndarray:
+        # Remove stations by position; returns the rows whose lists lost one.
+        keep = np.setdiff1d(np.arange(len(self.stations)), gone)
+        remap = np.full(len(self.stations) + 1, -1)
+        remap[keep] = np.arange(len(keep))
+        lost = np.isin(self.neighbour, gone).any(axis=(0, 2))[keep]
+        self.stations = [self.stations[i] for i in keep]
+        self.digests = [self.digests[i] for i in keep]
+        self.values = self.values[:, :, keep]
+        self.neighbour = remap[self.neighbour[:, keep]]
+        self.r, self.overlap = self.r[:, keep], self.overlap[:, keep]
+        return np.flatnonzero(lost)
+
+    def _append(self, series: dict) -> None:
+        years = np.union1d(self.years, np.concatenate([y for y, _ in series.values()]))
+        values = np.full((len(self.keys), len(years), len(self.stations) + len(series)), np.nan)
+        values[:, np.searchsorted(years, self.years), : len(self.stations)] = self.values
+        for j, (station, (y, v)) in enumerate(series.items(), start=len(self.stations)):
+            values[:, np.searchsorted(years, y), j] = v.T
+            self.stations.append(station)
+            self.digests.append(_digest(y, v))
+        self.years, self.values = years, values
+
+    def sync(self, series: dict) -> dict:
+        """Bring the index up to ``series`` (as from ``station_series``).
+
+        New and revised stations are (re)appended; their rows are computed
+        against all stations, and each other row merges them in as
+        candidates. Rows that lost a neighbour are recomputed in full.
+        Returns how many stations were added, revised and removed.
+        """
+        position = {station: i for i, station in enumerate(self.stations)}
+        revised = [s for s in series if s in position and _digest(*series[s]) != self.digests[position[s]]]
+        removed = [s for s in self.stations if s not in series]
+        fresh = {s: series[s] for s in series if s not in position or s in revised}
+        counts = {"added": len(fresh) - len(revised), "revised": len(revised), "removed": len(removed)}
+        if not fresh and not removed:
+            return counts
+
+        stale = self._drop([position[s] for s in removed + revised])
+        old = len(self.stations)
+        if fresh:
+            self._append(fresh)
+        total = len(self.stations)
+        shape = (len(self.keys), total, self.top)
+        neighbour = np.full(shape, -1, dtype=np.int64)
+        r = np.full(shape, np.nan)
+        overlap = np.zeros(shape, dtype=np.int64)
+        neighbour[:, :old], r[:, :old], overlap[:, :old] = self.neighbour, self.r, self.overlap
+        self.neighbour, self.r, self.overlap = neighbour, r, overlap
+
+        rows = np.union1d(stale, np.arange(old, total)).astype(np.int64)
+        merge = np.setdiff1d(np.arange(old), rows)
+        everyone = np.broadcast_to(np.arange(total), (len(self.keys), 1, total))
+        with stage("neighbour_rows", rows=len(rows), stations=total):
+            for start in range(0, len(rows), BLOCK):
+                block = rows[start : start + BLOCK]
+                corr, n = pairwise_corr(self.values[:, :, block], self.values, self.min_overlap)
+                corr[:, np.arange(len(block)), block] = np.nan  # not its own neighbour
+                cand = np.broadcast_to(everyone, corr.shape)
+                self.neighbour[:, block], self.r[:, block], self.overlap[:, block] = _ranked(
+                    cand, corr, n, self.top
+                )
+                # New stations in the block are candidates for the kept rows.
+                new = block >= old
+                if not new.any() or not len(merge):
+                    continue
+                cand_r = corr[:, new][:, :, merge].transpose(0, 2, 1)
+                cand_n = n[:, new][:, :, merge].transpose(0, 2, 1)
+                cand = np.broadcast_to(block[new], cand_r.shape)
+                self.neighbour[:, merge], self.r[:, merge], self.overlap[:, merge] = _ranked(
+                    np.concatenate([self.neighbour[:, merge], cand], axis=-1),
+                    np.concatenate([self.r[:, merge], cand_r], axis=-1),
+                    np.concatenate([self.overlap[:, merge], cand_n], axis=-1),
+                    self.top,
+                )
+        return counts
+
+    def table(self) -> pd.DataFrame:
+        """One row per station, variable and neighbour rank."""
+        v, s, k = np.indices(self.neighbour.shape)
+        found = self.neighbour >= 0
+        stations = np.array(self.stations, dtype=object)
+        return pd.DataFrame(
+            {
+                STATION_COLUMN: stations[s[found]],
+                "variable": np.array(self.keys)[v[found]],
+                "rank": k[found] + 1,
+                "neighbour": stations[self.neighbour[found]],
+                "r": self.r[found],
+                "overlap": self.overlap[found],
+            }
+        ).sort_values([STATION_COLUMN, "variable", "rank"], kind="stable", ignore_index=True)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Most correlated neighbour stations of every station and variable.")
+    parser.add_argument("--stations-dir", type=Path, default=PARTITION_DIR)
+    parser.add_argument("--top", type=int, default=TOP, help="neighbours kept per station and variable")
+    parser.add_argument("--min-overlap", type=int, default=MIN_OVERLAP, help="common winters for a correlation")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH, help="cached index, updated in place")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the cached index")
+    parser.add_argument("--output", type=Path, default=NEIGHBOURS_PATH)
+    args = parser.parse_args(argv)
+
+    df = load_stations(args.stations_dir)
+    keys = [key for key, col in VARIABLES.items() if col in df.columns]
+    if args.rebuild:
+        index = NeighbourIndex(keys, args.top, args.min_overlap)
+    else:
+        index = NeighbourIndex.load(args.index, keys, args.top, args.min_overlap)
+    counts = index.sync(station_series(df, keys))
+    index.save(args.index)
+    print(", ".join(f"{n} {what}" for what, n in counts.items()) + f"; {len(index.stations)} stations")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    index.table().round(4).to_csv(args.output, index=False)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
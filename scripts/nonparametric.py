@@ -0,0 +1,308 @@
+from typing import NamedTuple
+
+import numpy as np
+from scipy import stats
+
+
+class TheilSen(NamedTuple):
+    slope: float
+    intercept: float
+    low_slope: float
+    high_slope: float
+
+
+def dense_ranks(values: np.ndarray) -> np.ndarray:
+    return np.unique(values, return_inverse=True)[1].astype(np.int64)
+
+
+def _merge_levels(ranks: np.ndarray, emit: bool):
+    # Bottom-up merge sort done level by level on whole arrays: at each level
+    # every right block is matched against its sorted left neighbour with one
+    # ``searchsorted`` and the blocks are merged with one stable sort. Blocks
+    # are kept apart by adding ``block_index * (max_rank + 1)`` to the ranks.
+    a = np.asarray(ranks, dtype=np.int64)
+    n = len(a)
+    total = 0
+    pairs_i, pairs_j = [], []
+    if n < 2:
+        return total, pairs_i, pairs_j
+    span = int(a.max()) + 1
+    idx = np.arange(n)
+    pos = np.arange(n)
+    width = 1
+    while width < n:
+        group = idx // (2 * width)
+        offset = group * span
+        key = a + offset
+        is_left = (idx // width) % 2 == 0
+        left = key[is_left]
+        right = key[~is_left]
+        not_greater = np.searchsorted(left, right, side="right")
+        group_end = np.searchsorted(left, (group[~is_left] + 1) * span, side="left")
+        counts = group_end - not_greater
+        total += int(counts.sum())
+        if emit and counts.any():
+            # Left elements greater than a right element form a contiguous run.
+            left_pos = pos[is_left]
+            run_start = np.repeat(not_greater - np.cumsum(counts) + counts, counts)
+            pairs_i.append(left_pos[run_start + np.arange(counts.sum())])
+            pairs_j.append(np.repeat(pos[~is_left], counts))
+        order = np.argsort(key, kind="stable")
+        a = key[order] - offset
+        pos = pos[order]
+        width *= 2
+    return total, pairs_i, pairs_j
+
+
+def count_inversions(ranks: np.ndarray) -> int:
+    """Number of pairs ``i < j`` with ``ranks[i] > ranks[j]``, in O(n log^2 n) array ops."""
+    return _merge_levels(ranks, emit=False)[0]
+
+
+def inversion_pairs(ranks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Positions ``(i, j)`` with ``i < j`` and ``ranks[i] > ranks[j]``."""
+    _, pairs_i, pairs_j = _merge_levels(ranks, emit=True)
+    if not pairs_i:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
+
+
+def _tie_counts(sorted_values: np.ndarray) -> np.ndarray:
+    if len(sorted_values) == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1], True])
+    return np.diff(starts)
+
+
+def _pairs(counts: np.ndarray) -> int:
+    return int((counts * (counts - 1) // 2).sum())
+
+
+def mann_kendall(x: np.ndarray, y: np.ndarray) -> dict:
+    """Kendall's tau-b and the Mann-Kendall S test in O(n log n) (Knight 1966).
+
+    The variance of S carries the usual tie corrections for both variables and
+    the p-value is the two-sided normal approximation, which is what
+    ``scipy.stats.kendalltau`` reports for tied or longer series.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    order = np.lexsort((y, x))
+    xs, ys = x[order], y[order]
+
+    x_ties = _tie_counts(xs)
+    y_ties = _tie_counts(np.sort(ys))
+    joint = np.flatnonzero(np.r_[True, (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1]), True])
+    joint_ties = np.diff(joint)
+
+    n0 = n * (n - 1) // 2
+    n1, n2, n3 = _pairs(x_ties), _pairs(y_ties), _pairs(joint_ties)
+    discordant = count_inversions(dense_ranks(ys))
+    s = n0 - n1 - n2 + n3 - 2 * discordant
+
+    xt = x_ties.astype(float)
+    yt = y_ties.astype(float)
+    m = n * (n - 1.0)
+    var_s = (
+        (m * (2 * n + 5) - (xt * (xt - 1) * (2 * xt + 5)).sum() - (yt * (yt - 1) * (2 * yt + 5)).sum()) / 18
+        + 2.0 * n1 * n2 / m
+        + (xt * (xt - 1) * (xt - 2)).sum() * (yt * (yt - 1) * (yt - 2)).sum() / (9 * m * (n - 2))
+    )
+    tau = s / np.sqrt(float(n0 - n1) * float(n0 - n2))
+    z = s / np.sqrt(var_s)
+    return {"tau": float(tau), "s": int(s), "var_s": float(var_s), "z": float(z), "p": float(2 * stats.norm.sf(abs(z)))}
+
+
+def _exact(values: np.ndarray) -> tuple[np.ndarray, int]:
+    # Floats as exact Python ints times 2**exp, so differences and products
+    # of the data never round.
+    mantissa, exponent = np.frexp(np.asarray(values, dtype=float))
+    digits = (mantissa * 2.0**53).astype(np.int64)
+    low = int(exponent.min())
+    ints = [int(d) << int(e - low) for d, e in zip(digits.tolist(), exponent.tolist())]
+    return np.array(ints, dtype=object), low - 53
+
+
+class _Slopes:
+    """Pairwise slopes of ``(x, y)`` compared exactly.
+
+    A threshold is a slope ``p / q`` with ``q >= 0`` in the integer units of
+    ``_exact``; ``(-1, 0)`` and ``(1, 0)`` stand for minus and plus infinity.
+    Pair ``(i, j)`` with ``x_i < x_j`` has a slope below ``p / q`` exactly when
+    ``z = Y * q - X * p`` is lower at ``j`` than at ``i``, so counting slopes
+    is counting inversions of the integer ``z``.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray):
+        self.x, self.y = x, y
+        self.X, x_exp = _exact(x)
+        self.Y, y_exp = _exact(y)
+        # The same integers as floats (a power-of-two scaling, so exact).
+        self.Xf, self.Yf = x * 2.0**-x_exp, y * 2.0**-y_exp
+        self.n_pairs = len(x) * (len(x) - 1) // 2 - _pairs(_tie_counts(np.sort(x)))
+
+    def pair(self, i: int, j: int) -> tuple[int, int]:
+        # Sampled pairs have x_i < x_j.
+        return self.Y[j] - self.Y[i], self.X[j] - self.X[i]
+
+    def _ranks(self, t: tuple[int, int]) -> np.ndarray:
+        # Dense ranks of z. Sorted in floats first; only runs of values that
+        # lie within their rounding error of each other are ranked in exact
+        # integers.
+        p, q = t
+        a, b = self.Yf * float(q), self.Xf * float(p)
+        zf = a - b
+        err = 4 * np.finfo(float).eps * (np.abs(a) + np.abs(b))
+        order = np.argsort(zf, kind="stable")
+        zs, es = zf[order], err[order]
+        cut = np.maximum.accumulate(zs + es)[:-1] < np.minimum.accumulate((zs - es)[::-1])[::-1][1:]
+        group = np.r_[0, np.cumsum(cut)]
+        sub = np.zeros(len(zs), dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, cut])
+        loose = (np.diff(np.r_[starts, len(zs)]) > 1)[group]
+        if loose.any():
+            # Exact ranks of all loose values at once, made relative to the
+            # first of each run; runs are ordered among themselves already.
+            idx = order[loose]
+            exact = dense_ranks(self.Y[idx] * q - self.X[idx] * p)
+            first = np.full(len(starts), np.iinfo(np.int64).max)
+            np.minimum.at(first, group[loose], exact)
+            sub[loose] = exact - first[group[loose]]
+        width = np.zeros(len(starts), dtype=np.int64)
+        np.maximum.at(width, group, sub + 1)
+        ranks = np.empty(len(zs), dtype=np.int64)
+        ranks[order] = np.r_[0, np.cumsum(width)[:-1]][group] + sub
+        return ranks
+
+    def counts(self, t: tuple[int, int]) -> tuple[int, int]:
+        """Slopes below ``t`` and slopes not above it."""
+        ranks = self._ranks(t)
+        order = np.lexsort((ranks, self.x))
+        below = count_inversions(ranks[order])
+        order = np.lexsort((-ranks, self.x))
+        above = count_inversions(ranks.max() - ranks[order])
+        return below, self.n_pairs - above
+
+    def between(self, lo: tuple[int, int], hi: tuple[int, int]) -> np.ndarray:
+        """The slopes in ``(lo, hi]``, sorted."""
+        # Such a pair is ordered one way by the ``lo`` ranks and the other way
+        # (or tied) by the ``hi`` ranks. Along the ``lo`` order, ties in ``hi``
+        # are ranked so the earlier one counts as greater, and the inversions
+        # are those pairs plus a few exactly on ``lo``, dropped below.
+        r_lo, r_hi = self._ranks(lo), self._ranks(hi)
+        order = np.lexsort((r_hi, r_lo))
+        seq = r_hi[order]
+        ordinal = np.empty(len(seq), dtype=np.int64)
+        ordinal[np.lexsort((-np.arange(len(seq)), seq))] = np.arange(len(seq))
+        i, j = inversion_pairs(ordinal)
+        i, j = order[i], order[j]
+        keep = self.x[i] != self.x[j]
+        i, j = np.where(self.x[i] < self.x[j], i, j)[keep], np.where(self.x[i] < self.x[j], j, i)[keep]
+        p, q = self.Y[j] - self.Y[i], self.X[j] - self.X[i]
+        (p_lo, q_lo), (p_hi, q_hi) = lo, hi
+        inside = ((p * q_lo > p_lo * q) & (p * q_hi <= p_hi * q)).astype(bool)
+        return np.sort(self.slope(i[inside], j[inside]))
+
+    def slope(self, i, j):
+        # As scipy computes them, for the values returned.
+        return (self.y[j] - self.y[i]) / (self.x[j] - self.x[i])
+
+
+def _sample_pairs(x, size, rng):
+    i = rng.integers(0, len(x), size=size)
+    j = rng.integers(0, len(x), size=size)
+    valid = x[i] < x[j]
+    return i[valid], j[valid]
+
+
+def select_slope(slopes: _Slopes, k: int, rng: np.random.Generator) -> float:
+    """The ``k``-th smallest (0-based) pairwise slope without building all pairs.
+
+    Random pair slopes narrow a bracket ``(lo, hi]`` around rank ``k``; each
+    candidate end is itself a pair slope, checked with exact O(n log^2 n)
+    inversion counts, and returned at once when rank ``k`` falls on it. Once
+    at most a few times ``n`` slopes remain inside, they are enumerated as
+    inversions and the answer is picked directly. Memory stays O(n) plus the
+    enumerated bracket.
+    """
+    x, y = slopes.x, slopes.y
+    n, n_pairs = len(x), slopes.n_pairs
+    budget = max(4 * n, 1024)
+    draws = 16 * n
+    lo, hi, c_lo, c_hi = (-1, 0), (1, 0), 0, n_pairs
+    lo_v, hi_v = -np.inf, np.inf
+
+    for _ in range(64):
+        if c_hi - c_lo <= budget:
+            break
+        share = (c_hi - c_lo) / n_pairs
+        i, j = _sample_pairs(x, int(min(draws, 4 * n / share)), rng)
+        # Rounded slopes only choose the candidates; their counts are exact.
+        approx = slopes.slope(i, j)
+        inside = (approx > lo_v) & (approx <= hi_v)
+        i, j, approx = i[inside], j[inside], approx[inside]
+        if not len(approx):
+            continue
+        order = np.argsort(approx, kind="stable")
+        q = (k - c_lo + 0.5) / (c_hi - c_lo)
+        delta = 3.0 / np.sqrt(len(approx)) if len(approx) >= 16 else 0.0
+        for f in (max(q - delta, 0.0), min(q + delta, 1.0)):
+            pick = order[int(f * (len(order) - 1))]
+            t = slopes.pair(int(i[pick]), int(j[pick]))
+            below, not_above = slopes.counts(t)
+            if below <= k < not_above:
+                return float(approx[pick])
+            if c_lo < not_above <= k:
+                lo, lo_v, c_lo = t, approx[pick], not_above
+            elif k < below and not_above < c_hi:
+                hi, hi_v, c_hi = t, approx[pick], not_above
+
+    return float(slopes.between(lo, hi)[k - c_lo])
+
+
+def theil_sen(y: np.ndarray, x: np.ndarray, alpha: float = 0.95, seed: int = 0) -> TheilSen:
+    """Theil-Sen slope with Sen (1968) confidence bounds, as ``scipy.stats.theilslopes``.
+
+    The median and the confidence-bound order statistics are found by
+    selection over the implicit set of pairwise slopes, so memory is O(n)
+    instead of the O(n^2) slope array scipy sorts.
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.asarray(x, dtype=float)
+    n = len(y)
+    rng = np.random.default_rng(seed)
+
+    x_ties = _tie_counts(np.sort(x))
+    y_ties = _tie_counts(np.sort(y))
+    slopes = _Slopes(x, y)
+    n_pairs = slopes.n_pairs
+    if n_pairs == 0:
+        return TheilSen(np.nan, np.nan, np.nan, np.nan)
+
+    cache = {}
+
+    def kth(k: int) -> float:
+        if k not in cache:
+            cache[k] = select_slope(slopes, k, rng)
+        return cache[k]
+
+    if n_pairs % 2:
+        slope = kth(n_pairs // 2)
+    else:
+        slope = 0.5 * (kth(n_pairs // 2 - 1) + kth(n_pairs // 2))
+    intercept = float(np.median(y) - slope * np.median(x))
+
+    if alpha > 0.5:
+        alpha = 1.0 - alpha
+    z = stats.norm.ppf(alpha / 2.0)
+    xt = x_ties.astype(float)
+    yt = y_ties.astype(float)
+    sigsq = (n * (n - 1) * (2 * n + 5) - (xt * (xt - 1) * (2 * xt + 5)).sum() - (yt * (yt - 1) * (2 * yt + 5)).sum()) / 18.0
+    if not sigsq >= 0:
+        # Ties in both x and y can leave no variance, as in scipy.
+        return TheilSen(float(slope), intercept, np.nan, np.nan)
+    sigma = np.sqrt(sigsq)
+    upper = min(int(np.round((n_pairs - z * sigma) / 2.0)), n_pairs - 1)
+    lower = max(int(np.round((n_pairs + z * sigma) / 2.0)) - 1, 0)
+    return TheilSen(float(slope), intercept, kth(lower), kth(upper))
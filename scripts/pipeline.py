@@ -0,0 +1,257 @@
+import argparse
+import ast
+import fnmatch
+import glob
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from dataset import CACHE_DIR, file_hash
+
+
+STATE_PATH = CACHE_DIR / "pipeline" / "state.json"
+LOG_DIR = CACHE_DIR / "pipeline" / "logs"
+
+# Stages in the order they are run by hand. Scripts that only print get their
+# stdout saved as a log, which also serves as the stage output for skipping.
+# Inputs list data only: the modules a script imports from scripts/ are found
+# by local_imports and hashed with it.
+STAGES = {
+    "clean": {
+        "script": "scripts/clean_ratece.py",
+        "inputs": ["data/raw/*"],
+        "outputs": ["data/clean_ratece.csv"],
+    },
+    "trends": {
+        "script": "scripts/analyze_trends.py",
+        "inputs": ["data/clean_ratece.csv"],
+        "outputs": [],
+    },
+    "trend_analysis": {
+        "script": "scripts/trend_analysis.py",
+        "inputs": ["data/clean_ratece.csv"],
+        "outputs": [],
+    },
+    "validate": {
+        "script": "scripts/validate_claims.py",
+        "inputs": ["data/clean_ratece.csv"],
+        "outputs": [],
+    },
+    "forecast": {
+        "script": "scripts/forecast_all_variables.py",
+        "inputs": ["data/clean_ratece.csv"],
+        "outputs": ["analysis/forecast_model_summary.csv", "analysis/forecast_2026_2035.csv"],
+    },
+    "normals": {
+        "script": "scripts/windows.py",
+        "inputs": ["data/clean_ratece.csv"],
+        "outputs": ["analysis/climate_normals.csv"],
+    },
+    "changepoints": {
+        "script": "scripts/changepoints.py",
+        "inputs": ["data/clean_ratece.csv"],
+        "outputs": ["analysis/changepoints.csv"],
+    },
+    "resampling": {
+        "script": "scripts/resampling.py",
+        "inputs": ["data/clean_ratece.csv"],
+        "outputs": ["analysis/trend_resampling.csv"],
+    },
+    "web": {
+        "script": "scripts/build_web_artifact.py",
+        "inputs": ["data/clean_ratece.csv"],
+        "outputs": ["web/data/model_artifact.json", "web/data/levels/*/*.json"],
+    },
+    "qa": {
+        "script": "scripts/verify_qa.py",
+        "inputs": ["data/clean_ratece.csv", "data/claims.json"],
+        "outputs": [],
+    },
+}
+
+
+class Hashes:
+    """SHA-256 of files, reusing the stored digest while size and mtime match."""
+
+    def __init__(self, known: dict):
+        self.known = known
+
+    def __call__(self, path: Path) -> str:
+        key = path.as_posix()
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return "missing"
+        stamp = [st.st_mtime_ns, st.st_size]
+        entry = self.known.get(key)
+        if entry is None or entry[:2] != stamp:
+            entry = [*stamp, file_hash(path)]
+            self.known[key] = entry
+        return entry[2]
+
+
+def expand(patterns: list[str]) -> list[Path]:
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        paths.update(matches if matches else [pattern])
+    return sorted(Path(p) for p in paths)
+
+
+def upstream(stages: dict) -> dict[str, set]:
+    # A stage depends on every stage producing a file one of its input patterns matches.
+    deps = {}
+    for name, stage in stages.items():
+        deps[name] = {
+            other
+            for other, producer in stages.items()
+            if other != name
+            and any(fnmatch.fnmatch(out, pat) for out in producer["outputs"] for pat in stage["inputs"])
+        }
+    return deps
+
+
+def local_imports(script: Path) -> list[Path]:
+    """Modules of the script's directory it imports, directly or through each
+    other, including imports inside functions."""
+    root = Path(script).parent
+    seen, todo = set(), [Path(script)]
+    while todo:
+        tree = ast.parse(todo.pop().read_text(encoding="utf-8"))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                path = root / f"{name.split('.')[0]}.py"
+                if path.exists() and path not in seen and path != Path(script):
+                    seen.add(path)
+                    todo.append(path)
+    return sorted(seen)
+
+
+def stage_key(name: str, stage: dict, hashes: Hashes) -> str:
+    h = hashlib.sha256(json.dumps([name, stage["script"], stage["inputs"]]).encode("utf-8"))
+    script = Path(stage["script"])
+    for path in [*expand([stage["script"], *stage["inputs"]]), *local_imports(script)]:
+        h.update(f"{path.as_posix()}={hashes(path)}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def output_hashes(stage: dict, hashes: Hashes) -> dict:
+    return {path.as_posix(): hashes(path) for path in expand(stage["outputs"])}
+
+
+def run_stage(name: str, stage: dict) -> tuple[int, float]:
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with open(LOG_DIR / f"{name}.log", "w", encoding="utf-8") as log:
+        proc = subprocess.run([sys.executable, stage["script"]], stdout=log, stderr=subprocess.STDOUT)
+    return proc.returncode, time.perf_counter() - start
+
+
+def load_state() -> dict:
+    if STATE_PATH.exists():
+        return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    return {"files": {}, "stages": {}}
+
+
+def save_state(state: dict) -> None:
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=1), encoding="utf-8")
+    tmp.replace(STATE_PATH)
+
+
+def run_pipeline(selected: list[str], jobs: int = 2, force: bool = False, dry_run: bool = False) -> dict:
+    """Run ``selected`` stages and their upstream stages; returns ``{stage: status}``.
+
+    A stage is skipped when the hashes of its script and inputs match the last
+    successful run and its outputs are still what that run wrote. Because
+    downstream stages compare content, a re-run that rewrites identical
+    outputs does not cascade. Independent stages run concurrently.
+    """
+    deps = upstream(STAGES)
+    wanted, todo = set(), list(selected)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(deps[name])
+
+    state = load_state()
+    hashes = Hashes(state["files"])
+    status = {}
+    running = {}
+    launched = set()
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        while len(status) < len(wanted):
+            for name in [n for n in STAGES if n in wanted and n not in status and n not in launched]:
+                if any(status.get(d) in ("failed", "blocked") for d in deps[name]):
+                    status[name] = "blocked"
+                    print(f"{name:<16} blocked by a failed stage")
+                    continue
+                if not all(d in status for d in deps[name] if d in wanted):
+                    continue
+                stage = STAGES[name]
+                key = stage_key(name, stage, hashes)
+                last = state["stages"].get(name, {})
+                if not force and last.get("key") == key and last.get("outputs") == output_hashes(stage, hashes):
+                    status[name] = "up to date"
+                elif dry_run:
+                    status[name] = "would run"
+                else:
+                    running[pool.submit(run_stage, name, stage)] = (name, key)
+                    launched.add(name)
+                print(f"{name:<16} {status.get(name, 'running')}")
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key = running.pop(future)
+                code, seconds = future.result()
+                if code == 0:
+                    status[name] = "ran"
+                    state["stages"][name] = {
+                        "key": key,
+                        "outputs": output_hashes(STAGES[name], hashes),
+                    }
+                    save_state(state)
+                    print(f"{name:<16} ran in {seconds:.1f}s")
+                else:
+                    status[name] = "failed"
+                    state["stages"].pop(name, None)
+                    save_state(state)
+                    print(f"{name:<16} failed (exit {code}), see {LOG_DIR / (name + '.log')}")
+
+    if not dry_run:
+        save_state(state)
+    return status
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the analysis stages whose inputs changed.")
+    parser.add_argument("stages", nargs="*", help=f"stages to bring up to date (default: all of {', '.join(STAGES)})")
+    parser.add_argument("--jobs", type=int, default=2, help="stages run at the same time")
+    parser.add_argument("--force", action="store_true", help="re-run stages even when up to date")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    args = parser.parse_args(argv)
+    unknown = [s for s in args.stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    status = run_pipeline(args.stages or list(STAGES), jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    return 1 if any(s in ("failed", "blocked") for s in status.values()) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,199 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset import STATION_COLUMN, YEAR_COLUMN, iter_stations, load_clean, load_stations
+from forecast_all_variables import VARIABLES
+from instrument import stage
+from trends import batch_trends
+
+
+RESAMPLING_PATH = Path("analysis/trend_resampling.csv")
+RESAMPLES = 10_000
+CHUNK = 1_000  # resamples per task
+SEED = 2026
+LEVEL = 0.95
+
+
+def block_length(n: int) -> int:
+    # The usual n^(1/3) rule: 5 years for 77 winters.
+    return max(1, int(np.ceil(n ** (1 / 3))))
+
+
+def bootstrap_indices(n: int, block: int, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Moving-block bootstrap: ``size`` rows of ``n`` positions, each row made
+    of blocks of ``block`` consecutive positions starting anywhere."""
+    starts = rng.integers(0, n - block + 1, size=(size, -(-n // block)))
+    return (starts[:, :, None] + np.arange(block)).reshape(size, -1)[:, :n]
+
+
+def permutation_indices(n: int, block: int, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Block permutation: the consecutive blocks of ``block`` positions (the
+    last one shorter) in a random order per row."""
+    n_blocks = -(-n // block)
+    blocks = np.arange(n_blocks * block).reshape(n_blocks, block)
+    order = np.argsort(rng.random((size, n_blocks)), axis=1)
+    idx = blocks[order].reshape(size, -1)
+    return idx[idx < n].reshape(size, n)
+
+
+def resample_counts(idx: np.ndarray) -> np.ndarray:
+    """``C[b, s]``: how often row ``b`` of ``idx`` takes position ``s``, so a sum
+    over any resample is ``C @ values``."""
+    size, n = idx.shape
+    flat = (idx + np.arange(size)[:, None] * n).ravel()
+    return np.bincount(flat, minlength=size * n).reshape(size, n).astype(float)
+
+
+def resampled_slopes(idx: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """OLS slopes of the (year, value) pairs ``x[idx], y[idx]`` of every row and
+    column, ``(rows, columns)``, from five sums that are all matrix products."""
+    n = idx.shape[1]
+    c = resample_counts(idx)
+    sx, sxx = c @ x, c @ (x * x)
+    return (c @ (x[:, None] * y) - (sx / n)[:, None] * (c @ y)) / (sxx - sx * sx / n)[:, None]
+
+
+def slope_weights(idx: np.ndarray, xc: np.ndarray) -> np.ndarray:
+    """``W`` with ``W @ y == xc @ y[idx].T`` for every row of ``idx``: the
+    resampled slopes of all columns become one matrix product."""
+    size, n = idx.shape
+    flat = (idx + np.arange(size)[:, None] * n).ravel()
+    return np.bincount(flat, weights=np.tile(xc, size), minlength=size * n).reshape(size, n)
+
+
+def _chunk_task(args: tuple) -> tuple[np.ndarray, np.ndarray]:
+    # Bootstrap slope deviations (size, k) and permutation exceedance counts (k,).
+    x, y, slope, block, size, seed, key = args
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+    xc = x - x.mean()
+    sxx = xc @ xc
+    deviations = resampled_slopes(bootstrap_indices(len(x), block, size, rng), xc, y) - slope
+    permuted = slope_weights(permutation_indices(len(x), block, size, rng), xc) @ y / sxx
+    return deviations, (np.abs(permuted) >= np.abs(slope) - 1e-12).sum(axis=0)
+
+
+def block_trend_tests(
+    years: np.ndarray,
+    values: np.ndarray,
+    resamples: int = RESAMPLES,
+    block: int | None = None,
+    level: float = LEVEL,
+    seed: int = SEED,
+    jobs: int = 1,
+    chunk: int = CHUNK,
+) -> dict:
+    """Resampling p-values and slope intervals for every column at once.
+
+    ``values`` is shaped like ``batch_trends`` input. The moving-block
+    bootstrap resamples (year, value) pairs: the resampled slopes give the
+    percentile interval, and centred on zero the null distribution for
+    ``p_boot``. ``p_perm`` permutes blocks of the data. Blocks keep the
+    year-to-year autocorrelation that OLS and Kendall p-values ignore.
+    (Resampling OLS residuals instead rejects too often: detrended residuals
+    have less block-scale variance than the errors.)
+
+    Columns sharing the same missing years share index matrices; chunk ``c``
+    of group ``g`` is seeded with ``(seed, g, c)``, so results do not depend
+    on ``jobs``. Returns ``slope_per_decade``, ``ci_low``/``ci_high`` (per
+    decade), ``p_boot``, ``p_perm`` and ``block``, shaped like
+    ``values.shape[1:]``.
+    """
+    years = np.asarray(years, dtype=float)
+    values = np.asarray(values, dtype=float)
+    shape = values.shape[1:]
+    y = values.reshape(len(years), -1)
+    k = y.shape[1]
+    ols = batch_trends(years, y)
+
+    observed = ~np.isnan(y)
+    groups = {}
+    for j in range(k):
+        if observed[:, j].sum() >= 3:
+            groups.setdefault(observed[:, j].tobytes(), []).append(j)
+
+    sizes = [min(chunk, resamples - start) for start in range(0, resamples, chunk)]
+    tasks, owners = [], []
+    blocks = np.full(k, np.nan)
+    for g, cols in enumerate(groups.values()):
+        rows = observed[:, cols[0]]
+        n = int(rows.sum())
+        b = min(block or block_length(n), n)
+        blocks[cols] = b
+        for c, size in enumerate(sizes):
+            tasks.append((years[rows], y[rows][:, cols], ols["slope"][cols], b, size, seed, (g, c)))
+            owners.append(cols)
+
+    with stage("block_bootstrap", columns=k, resamples=resamples):
+        if jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(_chunk_task, tasks))
+        else:
+            results = [_chunk_task(task) for task in tasks]
+
+    deviations = {j: [] for cols in groups.values() for j in cols}
+    exceed = np.zeros(k)
+    for cols, (dev, count) in zip(owners, results):
+        for i, j in enumerate(cols):
+            deviations[j].append(dev[:, i])
+        exceed[cols] += count
+
+    out = {key: np.full(k, np.nan) for key in ("ci_low", "ci_high", "p_boot", "p_perm")}
+    tail = (1 - level) / 2
+    for j, parts in deviations.items():
+        dev = np.concatenate(parts)
+        slope = ols["slope"][j]
+        low, high = np.quantile(dev, [tail, 1 - tail])
+        out["ci_low"][j], out["ci_high"][j] = (slope + low) * 10, (slope + high) * 10
+        out["p_boot"][j] = (1 + (np.abs(dev) >= abs(slope)).sum()) / (resamples + 1)
+        out["p_perm"][j] = (1 + exceed[j]) / (resamples + 1)
+
+    result = {key: value.reshape(shape) for key, value in out.items()}
+    result["slope_per_decade"] = ols["slope_per_decade"].reshape(shape)
+    result["p_hac"] = ols["p_hac"].reshape(shape)
+    result["block"] = blocks.reshape(shape)
+    return result
+
+
+def resampling_table(df: pd.DataFrame, **options) -> pd.DataFrame:
+    """``block_trend_tests`` of every VARIABLES series of every station, one row each."""
+    parts = list(iter_stations(df))
+    keys = [key for key, col in VARIABLES.items() if col in df.columns]
+    years = np.unique(df[YEAR_COLUMN].to_numpy(dtype=np.int64))
+    values = np.full((len(years), len(parts), len(keys)), np.nan)
+    for s, (_, station_df) in enumerate(parts):
+        rows = np.searchsorted(years, station_df[YEAR_COLUMN].to_numpy(dtype=np.int64))
+        values[rows, s] = station_df[[VARIABLES[key] for key in keys]].to_numpy(dtype=float)
+
+    tests = block_trend_tests(years, values, **options)
+    columns = ("slope_per_decade", "ci_low", "ci_high", "p_hac", "p_boot", "p_perm", "block")
+    out = pd.DataFrame({"variable": np.tile(keys, len(parts)), **{name: tests[name].ravel() for name in columns}})
+    out = out.rename(columns={"ci_low": "ci95_low_per_decade", "ci_high": "ci95_high_per_decade"})
+    out["block"] = out["block"].astype("Int64")
+    if len(parts) > 1 or parts[0][0] is not None:
+        out.insert(0, STATION_COLUMN, np.repeat([station for station, _ in parts], len(keys)))
+    return out
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Block-bootstrap and block-permutation trend tests of all variables.")
+    parser.add_argument("--resamples", type=int, default=RESAMPLES)
+    parser.add_argument("--block", type=int, help="block length in years (default: n^(1/3))")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes; output does not depend on it")
+    parser.add_argument("--stations-dir", type=Path, help="station=<id> partitions instead of the single table")
+    parser.add_argument("--output", type=Path, default=RESAMPLING_PATH)
+    args = parser.parse_args(argv)
+
+    df = load_stations(args.stations_dir) if args.stations_dir else load_clean()
+    table = resampling_table(df, resamples=args.resamples, block=args.block, seed=args.seed, jobs=args.jobs)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    table.round(4).to_csv(args.output, index=False)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
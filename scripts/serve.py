@@ -0,0 +1,386 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from dataset import DATA_PATH, STATION_COLUMN, YEAR_COLUMN, iter_stations, load_clean, load_stations
+from forecast_all_variables import FORECAST_PATH, MODEL_SUMMARY_PATH, VARIABLES
+from trends import batch_trends
+from windows import NORMAL_YEARS, PERIODS, WindowIndex, parse_periods
+
+
+HOST = "127.0.0.1"
+PORT = 8765
+CACHE_ENTRIES = 1024
+POLL_S = 1.0
+IDLE_TIMEOUT_S = 30.0
+# Name of the only station of a single-station table (data/clean_ratece.csv).
+SINGLE_STATION = "ratece"
+VARIABLES_BY_COLUMN = {column: key for key, column in VARIABLES.items()}
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+def _stamp(paths: list[Path]) -> tuple:
+    stamp = []
+    for path in paths:
+        try:
+            st = path.stat()
+            stamp.append((str(path), st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append((str(path), None, None))
+    return tuple(stamp)
+
+
+def _clean(value):
+    # JSON has no NaN; numpy scalars are not serialisable as such.
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_clean(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class Snapshot:
+    """The cleaned table and forecast outputs indexed by station, loaded once."""
+
+    def __init__(self, data: Path, stations_dir: Path | None, forecast: Path, summary: Path):
+        df = load_stations(stations_dir) if stations_dir else load_clean(data)
+        self.stations = {}
+        for station, station_df in iter_stations(df):
+            name = SINGLE_STATION if station is None else str(station)
+            # Variables by their forecast key where they have one, else by column.
+            columns = {VARIABLES_BY_COLUMN.get(c, c): c for c in station_df.columns if c != YEAR_COLUMN}
+            numeric = [k for k, c in columns.items() if pd.api.types.is_numeric_dtype(station_df[c])]
+            windows = WindowIndex(
+                station_df[YEAR_COLUMN].to_numpy(), station_df[[columns[k] for k in numeric]].to_numpy(dtype=float)
+            )
+            self.stations[name] = {"frame": station_df, "columns": columns, "numeric": numeric, "windows": windows}
+        self.forecast = self._by_station(forecast)
+        self.summary = self._by_station(summary)
+
+    def _by_station(self, path: Path) -> dict:
+        if not path.exists():
+            return {}
+        df = pd.read_csv(path)
+        out = {}
+        if STATION_COLUMN not in df.columns:
+            groups = [(SINGLE_STATION, df)]
+        else:
+            groups = [(str(s), g.drop(columns=[STATION_COLUMN])) for s, g in df.groupby(STATION_COLUMN, sort=True)]
+        for station, group in groups:
+            for variable, rows in group.groupby("variable", sort=False):
+                out[(station, variable)] = rows.to_dict(orient="records")
+        return out
+
+
+class Service:
+    """Routes GET requests to JSON computed from the current snapshot.
+
+    Responses are cached per (path, query) in an LRU cache together with
+    their ETag (SHA-256 of the body); a request whose ``If-None-Match``
+    matches gets 304 without a body. ``reload()`` swaps in a new snapshot
+    and empties the cache when the data or the analysis outputs changed.
+    """
+
+    def __init__(
+        self,
+        data: Path = DATA_PATH,
+        stations_dir: Path | None = None,
+        forecast: Path = Path(FORECAST_PATH),
+        summary: Path = Path(MODEL_SUMMARY_PATH),
+        cache_entries: int = CACHE_ENTRIES,
+    ):
+        self.args = (Path(data), Path(stations_dir) if stations_dir else None, Path(forecast), Path(summary))
+        self.cache = LRUCache(cache_entries)
+        self.stamp = None
+        self.snapshot = None
+        self.reload()
+
+    def watched(self) -> list[Path]:
+        data, stations_dir, forecast, summary = self.args
+        sources = sorted(stations_dir.glob("station=*/*.csv")) if stations_dir else [data]
+        return [*sources, forecast, summary]
+
+    def changed(self) -> tuple | None:
+        stamp = _stamp(self.watched())
+        return None if stamp == self.stamp else stamp
+
+    def swap(self, snapshot: Snapshot, stamp: tuple) -> None:
+        self.snapshot, self.stamp = snapshot, stamp
+        self.cache.clear()
+
+    def reload(self) -> bool:
+        stamp = self.changed()
+        if stamp is None:
+            return False
+        self.swap(Snapshot(*self.args), stamp)
+        return True
+
+    def respond(self, method: str, target: str, headers: dict | None = None) -> tuple[int, dict, bytes]:
+        headers = headers or {}
+        try:
+            if method not in ("GET", "HEAD"):
+                raise HTTPError(405, f"{method} not supported")
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            key = (url.path, tuple(sorted(query.items())))
+            entry = self.cache.get(key)
+            if entry is None:
+                route = ROUTES.get(url.path.rstrip("/") or "/")
+                if route is None:
+                    raise HTTPError(404, f"no endpoint {url.path}")
+                body = json.dumps(_clean(route(self.snapshot, query)), ensure_ascii=False).encode("utf-8")
+                entry = (body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+                self.cache.put(key, entry)
+        except HTTPError as exc:
+            body = json.dumps({"error": str(exc)}).encode("utf-8")
+            return exc.status, {"Content-Type": "application/json"}, body
+
+        body, etag = entry
+        out = {"ETag": etag, "Cache-Control": "no-cache", "Content-Type": "application/json; charset=utf-8"}
+        match = headers.get("if-none-match", "")
+        if etag in [tag.strip().removeprefix("W/") for tag in match.split(",")] or match.strip() == "*":
+            return 304, out, b""
+        return 200, out, body
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # HTTP/1.1 with keep-alive; GET and HEAD only, so request bodies are not read.
+        try:
+            while True:
+                line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT_S)
+                if not line:
+                    break
+                parts = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    raw = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT_S)
+                    if raw in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = raw.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    status, out, body = 400, {"Content-Type": "application/json"}, b'{"error": "bad request line"}'
+                else:
+                    status, out, body = self.respond(parts[0], parts[1], headers)
+                close = headers.get("connection", "").lower() == "close" or parts[-1:] == ["HTTP/1.0"]
+                head = [f"HTTP/1.1 {status} {REASONS[status]}", f"Content-Length: {len(body)}"]
+                head += [f"{k}: {v}" for k, v in out.items()]
+                head += ["Access-Control-Allow-Origin: *", f"Connection: {'close' if close else 'keep-alive'}"]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+                if parts[:1] != ["HEAD"]:
+                    writer.write(body)
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def _station(snapshot: Snapshot, query: dict) -> tuple[str, dict]:
+    name = query.get("station", SINGLE_STATION if len(snapshot.stations) == 1 else None)
+    if name is None:
+        raise HTTPError(400, "station is required")
+    if name not in snapshot.stations:
+        raise HTTPError(404, f"unknown station {name!r}")
+    return name, snapshot.stations[name]
+
+
+def _variables(station: dict, query: dict) -> list[str]:
+    if "variable" not in query:
+        return list(station["columns"])
+    if query["variable"] not in station["columns"]:
+        raise HTTPError(404, f"unknown variable {query['variable']!r}")
+    return [query["variable"]]
+
+
+def stations_view(snapshot: Snapshot, query: dict) -> dict:
+    return {
+        name: {
+            "years": [int(s["frame"][YEAR_COLUMN].min()), int(s["frame"][YEAR_COLUMN].max())],
+            "variables": list(s["columns"]),
+        }
+        for name, s in snapshot.stations.items()
+    }
+
+
+def series_view(snapshot: Snapshot, query: dict) -> dict:
+    name, station = _station(snapshot, query)
+    frame = station["frame"]
+    out = {"station": name, "years": frame[YEAR_COLUMN].tolist(), "series": {}}
+    for key in _variables(station, query):
+        out["series"][key] = frame[station["columns"][key]].tolist()
+    return out
+
+
+def trends_view(snapshot: Snapshot, query: dict) -> dict:
+    name, station = _station(snapshot, query)
+    frame = station["frame"]
+    keys = [k for k in _variables(station, query) if pd.api.types.is_numeric_dtype(frame[station["columns"][k]])]
+    values = frame[[station["columns"][k] for k in keys]].to_numpy(dtype=float)
+    fit = batch_trends(frame[YEAR_COLUMN].to_numpy(dtype=float), values)
+    trends = {}
+    for j, key in enumerate(keys):
+        trends[key] = {
+            field: float(fit[field][j]) for field in ("slope_per_decade", "intercept", "r2", "p_ols", "p_hac")
+        }
+        trends[key]["n"] = int(np.count_nonzero(~np.isnan(values[:, j])))
+    return {"station": name, "trends": trends}
+
+
+def periods_view(snapshot: Snapshot, query: dict) -> dict:
+    name, station = _station(snapshot, query)
+    periods = PERIODS
+    if "periods" in query:
+        try:
+            periods = parse_periods(query["periods"])
+        except ValueError:
+            raise HTTPError(400, "periods must look like 1949-1979,1980-2004")
+    starts, ends = np.array(periods, dtype=np.int64).reshape(-1, 2).T
+    keys = [k for k in _variables(station, query) if k in station["numeric"]]
+    cols = [station["numeric"].index(k) for k in keys]
+    means = station["windows"].mean(starts, ends)[:, cols]
+    counts = station["windows"].count(starts, ends)
+    out = {}
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        out[f"{start}-{end}"] = {
+            "years": int(counts[i].max(initial=0)),
+            "means": dict(zip(keys, means[i].tolist())),
+        }
+    return {"station": name, "periods": out}
+
+
+def normals_view(snapshot: Snapshot, query: dict) -> dict:
+    name, station = _station(snapshot, query)
+    try:
+        length = int(query.get("length", NORMAL_YEARS))
+    except ValueError:
+        raise HTTPError(400, "length must be a number of years")
+    if length < 1:
+        raise HTTPError(400, "length must be at least 1")
+    keys = [k for k in _variables(station, query) if k in station["numeric"]]
+    starts, means, _ = station["windows"].sliding(length)
+    cols = [station["numeric"].index(k) for k in keys]
+    return {
+        "station": name,
+        "length": length,
+        "starts": starts.tolist(),
+        "normals": {k: means[:, j].tolist() for k, j in zip(keys, cols)},
+    }
+
+
+def forecast_view(snapshot: Snapshot, query: dict) -> dict:
+    name, station = _station(snapshot, query)
+    keys = [k for k in _variables(station, query) if (name, k) in snapshot.forecast]
+    if "variable" in query and not keys:
+        raise HTTPError(404, f"no forecast for {query['variable']!r}")
+    return {
+        "station": name,
+        "forecast": {k: snapshot.forecast[(name, k)] for k in keys},
+        "backtest": {k: snapshot.summary.get((name, k), []) for k in keys},
+    }
+
+
+ROUTES = {
+    "/stations": stations_view,
+    "/series": series_view,
+    "/trends": trends_view,
+    "/periods": periods_view,
+    "/normals": normals_view,
+    "/forecast": forecast_view,
+}
+
+
+async def watch(service: Service, poll_s: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(poll_s)
+        stamp = service.changed()
+        if stamp is None:
+            continue
+        # Loading runs off the event loop; requests keep using the old snapshot
+        # until the new one is swapped in here, on the loop.
+        try:
+            snapshot = await loop.run_in_executor(None, Snapshot, *service.args)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"Reload failed, keeping the previous data: {exc}", flush=True)
+            continue
+        service.swap(snapshot, stamp)
+        print("Reloaded changed data", flush=True)
+
+
+async def serve(service: Service, host: str = HOST, port: int = PORT, poll_s: float = POLL_S) -> None:
+    server = await asyncio.start_server(service.handle, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving {', '.join(ROUTES)} on http://{address[0]}:{address[1]}", flush=True)
+    watcher = asyncio.create_task(watch(service, poll_s)) if poll_s > 0 else None
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve series, trends, period means and forecasts as JSON.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="cleaned single-station table")
+    parser.add_argument("--stations-dir", type=Path, help="station=<id> partitions instead of --data")
+    parser.add_argument("--cache-entries", type=int, default=CACHE_ENTRIES, help="size of the response LRU cache")
+    parser.add_argument("--poll", type=float, default=POLL_S, help="seconds between change checks; 0 disables reload")
+    args = parser.parse_args(argv)
+
+    service = Service(args.data, args.stations_dir, cache_entries=args.cache_entries)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.poll))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
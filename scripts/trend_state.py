@@ -0,0 +1,278 @@
+import random
+from collections import Counter
+
+import numpy as np
+from scipy import stats
+
+from nonparametric import theil_sen
+
+
+def _tie_term(t: int) -> int:
+    return t * (t - 1) * (2 * t + 5)
+
+
+class _Node:
+    __slots__ = ("key", "count", "size", "priority", "left", "right")
+
+    def __init__(self, key: float, priority: float) -> None:
+        self.key = key
+        self.count = self.size = 1
+        self.priority = priority
+        self.left = self.right = None
+
+
+def _size(node: _Node | None) -> int:
+    return node.size if node else 0
+
+
+def _split(node: _Node | None, key: float, strict: bool) -> tuple:
+    # (keys below ``key``, the rest); with ``strict=False`` the cut is after ``key``.
+    if node is None:
+        return None, None
+    if node.key < key or (not strict and node.key == key):
+        node.right, rest = _split(node.right, key, strict)
+        node.size = _size(node.left) + node.count + _size(node.right)
+        return node, rest
+    below, node.left = _split(node.left, key, strict)
+    node.size = _size(node.left) + node.count + _size(node.right)
+    return below, node
+
+
+def _merge(a: _Node | None, b: _Node | None) -> _Node | None:
+    # Every key of ``a`` is below every key of ``b``.
+    if a is None or b is None:
+        return a or b
+    if a.priority > b.priority:
+        a.right = _merge(a.right, b)
+        a.size = _size(a.left) + a.count + _size(a.right)
+        return a
+    b.left = _merge(a, b.left)
+    b.size = _size(b.left) + b.count + _size(b.right)
+    return b
+
+
+class _Multiset:
+    """Sorted multiset of floats (a treap with subtree counts): ``add``,
+    ``discard`` and ``rank`` in O(log n) expected time."""
+
+    def __init__(self, seed: int = 0) -> None:
+        self.root = None
+        self.random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return _size(self.root)
+
+    def add(self, key: float) -> None:
+        below, rest = _split(self.root, key, strict=True)
+        same, above = _split(rest, key, strict=False)
+        if same is None:
+            same = _Node(key, self.random.random())
+        else:
+            same.count += 1
+            same.size += 1
+        self.root = _merge(_merge(below, same), above)
+
+    def discard(self, key: float) -> None:
+        below, rest = _split(self.root, key, strict=True)
+        same, above = _split(rest, key, strict=False)
+        if same is not None and same.count > 1:
+            same.count -= 1
+            same.size -= 1
+        else:
+            same = None
+        self.root = _merge(_merge(below, same), above)
+
+    def rank(self, key: float) -> tuple[int, int]:
+        """Elements below ``key`` and above it."""
+        below = above = 0
+        node = self.root
+        while node is not None:
+            if key < node.key:
+                above += node.count + _size(node.right)
+                node = node.left
+            elif key > node.key:
+                below += node.count + _size(node.left)
+                node = node.right
+            else:
+                below += _size(node.left)
+                above += _size(node.right)
+                break
+        return below, above
+
+    def first(self) -> float:
+        node = self.root
+        while node.left is not None:
+            node = node.left
+        return node.key
+
+    def last(self) -> float:
+        node = self.root
+        while node.right is not None:
+            node = node.right
+        return node.key
+
+    def __iter__(self):
+        stack, node = [], self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            for _ in range(node.count):
+                yield node.key
+            node = node.right
+
+
+class _Column:
+    # Running OLS sums, Mann-Kendall S and value ties of one variable over its
+    # observed years. Years are shifted by the state's first year.
+    def __init__(self) -> None:
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.sxy = self.syy = 0.0
+        self.years = _Multiset()  # observed years
+        self.values = {}  # year -> value
+        self.sorted = _Multiset()  # observed values
+        self.ties = Counter()
+        self.tie_pairs = 0  # sum of t * (t - 1) / 2 over tied values
+        self.tie_var = 0  # sum of t * (t - 1) * (2t + 5) over tied values
+        self.s = 0
+
+    def _concordance(self, x: float, y: float) -> int:
+        # sum_i sign(x - x_i) * sign(y - y_i) over the observed points. A point
+        # after (or before) all others only needs its value's rank, O(log n).
+        # Inserting or removing inside the series needs a two-dimensional
+        # count; that is rarer and done directly in O(n).
+        below, above = self.sorted.rank(y)
+        if not self.values or x >= self.years.last():
+            return below - above
+        if x <= self.years.first():
+            return above - below
+        xs = np.fromiter(self.values.keys(), dtype=float, count=len(self.values))
+        ys = np.fromiter(self.values.values(), dtype=float, count=len(self.values))
+        return int((np.sign(x - xs) * np.sign(y - ys)).sum())
+
+    def add(self, x: float, y: float) -> None:
+        self.s += self._concordance(x, y)
+        self.years.add(x)
+        self.sorted.add(y)
+        self.values[x] = y
+        self._update(x, y, 1)
+        t = self.ties[y]
+        self.tie_pairs += t
+        self.tie_var += _tie_term(t + 1) - _tie_term(t)
+        self.ties[y] = t + 1
+
+    def remove(self, x: float) -> None:
+        y = self.values.pop(x)
+        self.years.discard(x)
+        self.sorted.discard(y)
+        self.s -= self._concordance(x, y)
+        self._update(x, y, -1)
+        t = self.ties[y]
+        self.tie_pairs -= t - 1
+        self.tie_var -= _tie_term(t) - _tie_term(t - 1)
+        if t == 1:
+            del self.ties[y]
+        else:
+            self.ties[y] = t - 1
+
+    def _update(self, x: float, y: float, sign: int) -> None:
+        self.n += sign
+        self.sx += sign * x
+        self.sy += sign * y
+        self.sxx += sign * x * x
+        self.sxy += sign * x * y
+        self.syy += sign * y * y
+
+    def figures(self, x0: float, sen: bool) -> dict:
+        n = self.n
+        out = dict.fromkeys(
+            ("slope_per_decade", "slope", "intercept", "r2", "p_ols", "tau", "p_mk", "sen_slope_per_decade"), np.nan
+        )
+        out.update(n=n, s=self.s)
+        if n < 3:
+            return out
+
+        sxx = self.sxx - self.sx**2 / n
+        sxy = self.sxy - self.sx * self.sy / n
+        syy = self.syy - self.sy**2 / n
+        slope = sxy / sxx
+        ssr = max(syy - slope * sxy, 0.0)
+        se = np.sqrt(ssr / (n - 2) / sxx)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["r2"] = 1.0 - ssr / syy if syy > 0 else np.nan
+            out["p_ols"] = float(2.0 * stats.t.sf(abs(slope / se), n - 2))
+        out["slope"] = slope
+        out["slope_per_decade"] = slope * 10
+        out["intercept"] = (self.sy - slope * self.sx) / n - slope * x0
+
+        # Mann-Kendall as in nonparametric.mann_kendall; years never tie.
+        n0 = n * (n - 1) // 2
+        var_s = (n * (n - 1) * (2 * n + 5) - self.tie_var) / 18
+        if n0 > self.tie_pairs:
+            out["tau"] = self.s / np.sqrt(float(n0) * float(n0 - self.tie_pairs))
+            out["p_mk"] = float(2 * stats.norm.sf(abs(self.s / np.sqrt(var_s))))
+        if sen:
+            years = np.array(list(self.years))
+            values = np.array([self.values[x] for x in years])
+            out["sen_slope_per_decade"] = theil_sen(values, years + x0, 0.95).slope * 10
+        return out
+
+
+class TrendState:
+    """Trend statistics of several variables kept up to date one year at a time.
+
+    ``append(year, values)`` and ``remove(year)`` adjust running sums for the
+    OLS slope, R² and p-value and the Mann-Kendall S and its tie corrections;
+    appending a year after (or removing one at either end of) the observed
+    years costs O(log n) per variable, a rank in a sorted multiset; a year
+    inserted or removed inside the series costs one O(n) count. ``figures()`` returns the
+    current trend figures; the Theil-Sen slope is the only one computed from
+    the stored values (``nonparametric.theil_sen``). Missing values (NaN) are
+    left out of their variable only.
+    """
+
+    def __init__(self, columns: list[str]):
+        self.columns = list(columns)
+        self.rows = {}
+        self.x0 = None
+        self._state = [_Column() for _ in self.columns]
+
+    @classmethod
+    def from_arrays(cls, years: np.ndarray, values: np.ndarray, columns: list[str]) -> "TrendState":
+        state = cls(columns)
+        for year, row in zip(years, np.asarray(values, dtype=float)):
+            state.append(year, row)
+        return state
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, year) -> bool:
+        return float(year) in self.rows
+
+    def append(self, year, values) -> None:
+        year = float(year)
+        row = np.asarray(values, dtype=float).reshape(len(self.columns))
+        if year in self.rows:
+            raise ValueError(f"Year {year:g} is already in the trend state; remove it first")
+        if self.x0 is None:
+            self.x0 = year
+        self.rows[year] = row
+        for column, value in zip(self._state, row):
+            if not np.isnan(value):
+                column.add(year - self.x0, float(value))
+
+    def remove(self, year) -> np.ndarray:
+        year = float(year)
+        row = self.rows.pop(year)
+        for column, value in zip(self._state, row):
+            if not np.isnan(value):
+                column.remove(year - self.x0)
+        return row
+
+    def figures(self, sen: bool = True) -> dict[str, dict]:
+        """Per variable: ``n``, ``slope``, ``slope_per_decade``, ``intercept``,
+        ``r2``, ``p_ols``, ``s``, ``tau``, ``p_mk`` and ``sen_slope_per_decade``
+        (NaN unless ``sen``)."""
+        return {name: column.figures(self.x0, sen) for name, column in zip(self.columns, self._state)}
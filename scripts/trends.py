@@ -0,0 +1,87 @@
+import numpy as np
+from scipy import stats
+
+
+HAC_MAXLAGS = 3
+
+
+def _ols_block(x: np.ndarray, y: np.ndarray, maxlags: int) -> dict:
+    # x: (n,), y: (n, k) with no missing values. Regressing on the centred year
+    # leaves the slope and its (HAC) variance unchanged and keeps X'X diagonal,
+    # so every column shares the same tiny normal-equation solve.
+    n = len(x)
+    xc = x - x.mean()
+    sxx = xc @ xc
+    yc = y - y.mean(axis=0)
+
+    slope = xc @ yc / sxx
+    resid = yc - np.outer(xc, slope)
+    ssr = np.einsum("ij,ij->j", resid, resid)
+    sst = np.einsum("ij,ij->j", yc, yc)
+    df_resid = n - 2
+
+    se_ols = np.sqrt(ssr / df_resid / sxx)
+
+    # Newey-West with Bartlett weights and no small-sample correction, as in
+    # statsmodels' get_robustcov_results(cov_type="HAC", maxlags=...).
+    v = resid * xc[:, None]
+    s11 = np.einsum("ij,ij->j", v, v)
+    for lag in range(1, maxlags + 1):
+        weight = 1.0 - lag / (maxlags + 1)
+        s11 += 2.0 * weight * np.einsum("ij,ij->j", v[lag:], v[:-lag])
+    se_hac = np.sqrt(s11) / sxx
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = 1.0 - ssr / sst
+        p_ols = 2.0 * stats.t.sf(np.abs(slope / se_ols), df_resid)
+        p_hac = 2.0 * stats.t.sf(np.abs(slope / se_hac), df_resid)
+
+    return {
+        "slope": slope,
+        "intercept": y.mean(axis=0) - slope * x.mean(),
+        "r2": r2,
+        "p_ols": p_ols,
+        "p_hac": p_hac,
+        "resid": resid,
+    }
+
+
+def batch_trends(years: np.ndarray, values: np.ndarray, maxlags: int = HAC_MAXLAGS) -> dict:
+    """Linear trend statistics for every column of ``values`` at once.
+
+    ``values`` has years along the first axis and any trailing shape, e.g.
+    ``(years, variables)`` or ``(years, stations, variables)``. Returns arrays of
+    that trailing shape for ``slope_per_decade``, ``slope``, ``intercept``,
+    ``r2``, ``p_ols`` and ``p_hac``, plus ``resid`` with the input's shape.
+    Columns with missing years are fitted on their observed years only.
+    """
+    years = np.asarray(years, dtype=float)
+    values = np.asarray(values, dtype=float)
+    shape = values.shape[1:]
+    y = values.reshape(len(years), -1)
+    k = y.shape[1]
+
+    out = {key: np.full(k, np.nan) for key in ("slope", "intercept", "r2", "p_ols", "p_hac")}
+    resid = np.full(y.shape, np.nan)
+
+    complete = ~np.isnan(y).any(axis=0)
+    if complete.any():
+        block = _ols_block(years, y[:, complete], maxlags)
+        for key in out:
+            out[key][complete] = block[key]
+        resid[:, complete] = block["resid"]
+
+    # Gappy columns are rare; each is compressed to its observed years.
+    for j in np.flatnonzero(~complete):
+        observed = ~np.isnan(y[:, j])
+        if observed.sum() < 3:
+            continue
+        block = _ols_block(years[observed], y[observed, j : j + 1], maxlags)
+        for key in out:
+            out[key][j] = block[key][0]
+        resid[observed, j] = block["resid"][:, 0]
+
+    result = {key: value.reshape(shape) for key, value in out.items()}
+    result["slope_per_decade"] = result["slope"] * 10
+    result["resid"] = resid.reshape(values.shape)
+    return result
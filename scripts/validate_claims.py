@@ -1,75 +1,86 @@
+import argparse
+
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
 from scipy import stats
-from statsmodels.stats.diagnostic import acorr_ljungbox
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
 
+import instrument
+from backtest import fit_holt, rolling_backtest
+from dataset import load_clean
+from instrument import stage
+from nonparametric import mann_kendall, theil_sen
+from trends import batch_trends
+
+
+def trend_table(year: np.ndarray, values: np.ndarray, nonparametric: str = "scipy") -> list[dict]:
+    from statsmodels.stats.diagnostic import acorr_ljungbox
+
+    # OLS and HAC figures for all columns come from one batched fit.
+    with stage("ols_hac", columns=values.shape[1]):
+        ols = batch_trends(year, values)
+    rows = []
+    for j in range(values.shape[1]):
+        column = values[:, j]
+        with stage("nonparametric", column=j, method=nonparametric):
+            if nonparametric == "fast":
+                # O(n log n) time and O(n) memory, for daily or monthly series.
+                mk = mann_kendall(year, column)
+                tau, p_mk = mk["tau"], mk["p"]
+                sen = theil_sen(column, year, 0.95)
+            else:
+                tau, p_mk = stats.kendalltau(year, column)
+                sen = stats.theilslopes(column, year, 0.95)
+        resid = ols["resid"][:, j]
+        with stage("ljungbox", column=j):
+            lb = acorr_ljungbox(resid[~np.isnan(resid)], lags=[5], return_df=True)
+
+        rows.append(
+            {
+                "slope_per_decade": float(ols["slope_per_decade"][j]),
+                "r2": float(ols["r2"][j]),
+                "p_ols": float(ols["p_ols"][j]),
+                "p_hac": float(ols["p_hac"][j]),
+                "tau": float(tau),
+                "p_mk": float(p_mk),
+                "sen_slope_per_decade": float(sen.slope * 10),
+                "lb_pvalue_lag5": float(lb["lb_pvalue"].iloc[0]),
+            }
+        )
+    return rows
 
-DATA_PATH = "data/clean_ratece.csv"
 
+def trend_stats(year: np.ndarray, values: np.ndarray, nonparametric: str = "scipy") -> dict:
+    return trend_table(year, np.asarray(values, dtype=float)[:, None], nonparametric)[0]
 
-def trend_stats(year: np.ndarray, values: np.ndarray) -> dict:
-    x = sm.add_constant(year)
-    model = sm.OLS(values, x).fit()
-    hac = model.get_robustcov_results(cov_type="HAC", maxlags=3)
-    tau, p_mk = stats.kendalltau(year, values)
-    sen = stats.theilslopes(values, year, 0.95)
-    lb = acorr_ljungbox(model.resid, lags=[5], return_df=True)
 
+def rolling_forecast_metrics(
+    series: np.ndarray, years: np.ndarray, n_test: int = 15, exact: bool = False
+) -> dict:
+    bt = rolling_backtest(series, years, n_test=n_test, exact=exact)
     return {
-        "slope_per_decade": float(model.params[1] * 10),
-        "r2": float(model.rsquared),
-        "p_ols": float(model.pvalues[1]),
-        "p_hac": float(hac.pvalues[1]),
-        "tau": float(tau),
-        "p_mk": float(p_mk),
-        "sen_slope_per_decade": float(sen.slope * 10),
-        "lb_pvalue_lag5": float(lb["lb_pvalue"].iloc[0]),
+        "test_start_year": bt["test_start_year"],
+        "test_end_year": bt["test_end_year"],
+        **bt["metrics"],
     }
 
 
-def rolling_forecast_metrics(series: np.ndarray, years: np.ndarray, n_test: int = 15) -> dict:
-    start = len(series) - n_test
-    y_true, y_naive, y_linear, y_holt = [], [], [], []
-
-    for i in range(start, len(series)):
-        train = series[:i]
-        train_years = years[:i]
-        y_true.append(series[i])
-
-        y_naive.append(train[-1])
-
-        coeff = np.polyfit(train_years, train, 1)
-        y_linear.append(coeff[0] * years[i] + coeff[1])
-
-        fit = ExponentialSmoothing(
-            train,
-            trend="add",
-            seasonal=None,
-            initialization_method="estimated",
-        ).fit(optimized=True)
-        y_holt.append(float(fit.forecast(1)[0]))
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Re-derive the trend and forecast claims.")
+    parser.add_argument(
+        "--nonparametric",
+        choices=["scipy", "fast"],
+        default="scipy",
+        help="Kendall/Theil-Sen implementation used for the trend table",
+    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
 
-    def mae_rmse(pred):
-        err = np.array(y_true) - np.array(pred)
-        return float(np.mean(np.abs(err))), float(np.sqrt(np.mean(err**2)))
+    with instrument.from_arguments(args):
+        run(args)
 
-    m_naive = mae_rmse(y_naive)
-    m_linear = mae_rmse(y_linear)
-    m_holt = mae_rmse(y_holt)
-    return {
-        "test_start_year": int(years[start]),
-        "test_end_year": int(years[-1]),
-        "naive": {"mae": m_naive[0], "rmse": m_naive[1]},
-        "linear": {"mae": m_linear[0], "rmse": m_linear[1]},
-        "holt": {"mae": m_holt[0], "rmse": m_holt[1]},
-    }
 
-
-def main() -> None:
-    df = pd.read_csv(DATA_PATH)
-    df = df[df["leto"] >= 1949].copy().sort_values("leto")
+def run(args: argparse.Namespace) -> None:
+    df = load_clean()
     years = df["leto"].to_numpy()
 
     series_map = {
@@ -84,11 +95,13 @@ def main() -> None:
 
     print("TREND VALIDATION (1949-2025)")
     print("metric,slope/decade,r2,p_ols,p_hac,p_mk,sen/decade,lb_p(5)")
-    trend_rows = {}
-    for key, col in series_map.items():
-        values = df[col].to_numpy()
-        out = trend_stats(years, values)
-        trend_rows[key] = out
+    table = trend_table(
+        years,
+        df[list(series_map.values())].to_numpy(dtype=float),
+        nonparametric=args.nonparametric,
+    )
+    trend_rows = dict(zip(series_map, table))
+    for key, out in trend_rows.items():
         print(
             f"{key},{out['slope_per_decade']:+.3f},{out['r2']:.3f},"
             f"{out['p_ols']:.4g},{out['p_hac']:.4g},{out['p_mk']:.4g},"
@@ -110,12 +123,7 @@ def main() -> None:
             f"{model},MAE={fc[model]['mae']:.3f},RMSE={fc[model]['rmse']:.3f}"
         )
 
-    fit = ExponentialSmoothing(
-        df["povp. T [°C]"].to_numpy(),
-        trend="add",
-        seasonal=None,
-        initialization_method="estimated",
-    ).fit(optimized=True)
+    fit = fit_holt(df["povp. T [°C]"].to_numpy())
     preds = fit.forecast(5)
     print("\nHOLT POINT FORECASTS")
     for i, value in enumerate(preds, start=1):
@@ -0,0 +1,105 @@
+import argparse
+import importlib
+import sys
+import time
+
+
+# Subcommand -> (modules whose main(argv) it runs, description). Modules are
+# imported only when their subcommand runs, so a clean or qa run never loads
+# scipy or statsmodels.
+COMMANDS = {
+    "clean": (["clean_ratece"], "clean raw ARSO winter exports"),
+    "trends": (["analyze_trends", "trend_analysis"], "print the trend reports"),
+    "validate": (["validate_claims"], "re-derive the trend and forecast claims"),
+    "forecast": (["forecast_all_variables"], "backtest and forecast all winter variables"),
+    "qa": (["verify_qa"], "check the numbers quoted on the site against the data"),
+}
+HEAVY = ("numpy", "pandas", "scipy", "statsmodels")
+SEPARATOR = "+"
+
+
+def split_commands(argv: list[str]) -> list[tuple[str, list[str]]]:
+    """``clean + forecast --jobs 4 + qa`` -> [(clean, []), (forecast, [--jobs, 4]), (qa, [])]."""
+    groups = [[]]
+    for arg in argv:
+        if arg == SEPARATOR:
+            groups.append([])
+        else:
+            groups[-1].append(arg)
+    commands = []
+    for group in groups:
+        if not group:
+            raise ValueError(f"empty command around '{SEPARATOR}'")
+        if group[0] not in COMMANDS:
+            raise ValueError(f"unknown command {group[0]!r}; choose from {', '.join(COMMANDS)}")
+        commands.append((group[0], group[1:]))
+    return commands
+
+
+def run_command(name: str, argv: list[str]) -> dict:
+    modules, _ = COMMANDS[name]
+    before = set(sys.modules)
+    start = time.perf_counter()
+    mains = [importlib.import_module(module).main for module in modules]
+    imported = time.perf_counter()
+    code = 0
+    prog, sys.argv[0] = sys.argv[0], f"vreme {name}"  # for the command's usage and errors
+    try:
+        for main in mains:
+            try:
+                code = main(argv) or 0
+            except SystemExit as exc:
+                code = exc.code if isinstance(exc.code, int) else 1
+            if code:
+                break
+    finally:
+        sys.argv[0] = prog
+    return {
+        "command": name,
+        "import_s": imported - start,
+        "run_s": time.perf_counter() - imported,
+        "loaded": [lib for lib in HEAVY if lib in sys.modules and lib not in before],
+        "code": code,
+    }
+
+
+def report(timings: list[dict]) -> str:
+    lines = [f"{'command':<12}{'import_s':>10}{'run_s':>10}  newly imported"]
+    for t in timings:
+        lines.append(f"{t['command']:<12}{t['import_s']:>10.3f}{t['run_s']:>10.3f}  {', '.join(t['loaded']) or '-'}")
+    total_import = sum(t["import_s"] for t in timings)
+    total_run = sum(t["run_s"] for t in timings)
+    lines.append(f"{'total':<12}{total_import:>10.3f}{total_run:>10.3f}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="vreme",
+        description="Run one or more pipeline steps in one process, joined by '+', "
+        "e.g. 'vreme clean + forecast --jobs 4 + qa'. Libraries are imported once, "
+        "by the first step that needs them.",
+        epilog="commands: " + "; ".join(f"{name}: {desc}" for name, (_, desc) in COMMANDS.items()),
+    )
+    parser.add_argument("--timing", action="store_true", help="report import and run time per command on stderr")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments of the command, further '+ command ...'")
+    args = parser.parse_args(argv)
+    try:
+        commands = split_commands([args.command, *args.args])
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    timings = []
+    for name, command_argv in commands:
+        timings.append(run_command(name, command_argv))
+        if timings[-1]["code"]:
+            print(f"vreme: {name} failed with exit code {timings[-1]['code']}", file=sys.stderr)
+            break
+    if args.timing:
+        print(report(timings), file=sys.stderr)
+    return timings[-1]["code"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,152 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset import STATION_COLUMN, YEAR_COLUMN, iter_stations, load_clean, load_stations
+
+
+# Periods the site compares.
+PERIODS = ((1949, 1979), (1980, 2004), (2005, 2025))
+NORMAL_YEARS = 30
+NORMALS_PATH = Path("analysis/climate_normals.csv")
+
+
+class WindowIndex:
+    """NaN-aware prefix sums and counts over a contiguous year axis.
+
+    ``values`` has years along the first axis and any trailing shape, e.g.
+    ``(years, variables)`` or ``(years, stations, variables)``. Missing years
+    count as missing values. ``sum``, ``count`` and ``mean`` over
+    ``[start, end]`` (inclusive, clipped to the data) cost two lookups per
+    column whatever the window length; ``start`` and ``end`` may be arrays
+    of windows, which add a leading axis to the result.
+    """
+
+    def __init__(self, years: np.ndarray, values: np.ndarray):
+        years = np.asarray(years, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+        if len(np.unique(years)) != len(years):
+            raise ValueError("years must be unique")
+        self.first = int(years.min())
+        self.last = int(years.max())
+        grid = np.full((self.last - self.first + 1,) + values.shape[1:], np.nan)
+        grid[years - self.first] = values
+        observed = ~np.isnan(grid)
+        zero = np.zeros((1,) + grid.shape[1:])
+        self.sums = np.concatenate([zero, np.cumsum(np.where(observed, grid, 0.0), axis=0)])
+        self.counts = np.concatenate([zero.astype(np.int64), np.cumsum(observed, axis=0)])
+
+    def _bounds(self, start, end) -> tuple[np.ndarray, np.ndarray]:
+        lo = np.clip(np.asarray(start, dtype=np.int64), self.first, self.last + 1) - self.first
+        hi = np.clip(np.asarray(end, dtype=np.int64), self.first - 1, self.last) - self.first + 1
+        return lo, np.maximum(hi, lo)
+
+    def sum(self, start, end) -> np.ndarray:
+        lo, hi = self._bounds(start, end)
+        return self.sums[hi] - self.sums[lo]
+
+    def count(self, start, end) -> np.ndarray:
+        lo, hi = self._bounds(start, end)
+        return self.counts[hi] - self.counts[lo]
+
+    def mean(self, start, end) -> np.ndarray:
+        lo, hi = self._bounds(start, end)
+        n = self.counts[hi] - self.counts[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(n > 0, (self.sums[hi] - self.sums[lo]) / n, np.nan)
+
+    def sliding(self, length: int = NORMAL_YEARS, min_count: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every ``length``-year window inside the data: ``(starts, means, counts)``.
+        Means of windows with fewer than ``min_count`` observed years are NaN."""
+        starts = np.arange(self.first, self.last - length + 2)
+        means = self.mean(starts, starts + length - 1)
+        counts = self.count(starts, starts + length - 1)
+        return starts, np.where(counts >= max(min_count, 1), means, np.nan), counts
+
+
+def _station_index(df: pd.DataFrame, columns: list[str] | None) -> tuple[list, list[str], WindowIndex]:
+    # All stations on one year axis: values of shape (years, stations, columns).
+    parts = list(iter_stations(df))
+    if columns is None:
+        columns = [
+            c for c in parts[0][1].columns if c != YEAR_COLUMN and pd.api.types.is_numeric_dtype(parts[0][1][c])
+        ]
+    years = np.unique(df[YEAR_COLUMN].to_numpy(dtype=np.int64))
+    values = np.full((len(years), len(parts), len(columns)), np.nan)
+    for s, (_, station_df) in enumerate(parts):
+        rows = np.searchsorted(years, station_df[YEAR_COLUMN].to_numpy(dtype=np.int64))
+        present = [c for c in columns if c in station_df.columns]
+        values[rows[:, None], s, [columns.index(c) for c in present]] = station_df[present].to_numpy(dtype=float)
+    return [station for station, _ in parts], columns, WindowIndex(years, values)
+
+
+def _frame(stations: list, columns: list[str], starts, ends, means: np.ndarray, counts: np.ndarray) -> pd.DataFrame:
+    # means, counts: (windows, stations, columns) -> one row per (station, window).
+    n_windows, n_stations = means.shape[:2]
+    out = pd.DataFrame(
+        {
+            "start": np.tile(np.asarray(starts), n_stations),
+            "end": np.tile(np.asarray(ends), n_stations),
+            "years": counts.max(axis=2).T.ravel(),
+        }
+    )
+    for j, column in enumerate(columns):
+        out[column] = means[:, :, j].T.ravel()
+    if stations != [None]:
+        out.insert(0, STATION_COLUMN, np.repeat(stations, n_windows))
+    return out
+
+
+def period_means(
+    df: pd.DataFrame, periods=PERIODS, columns: list[str] | None = None
+) -> pd.DataFrame:
+    """Mean of every column over each ``(start, end)`` period, per station.
+
+    ``years`` is the number of years with data in the period (the most of
+    any column)."""
+    stations, columns, index = _station_index(df, columns)
+    starts, ends = np.array(periods, dtype=np.int64).reshape(-1, 2).T
+    return _frame(stations, columns, starts, ends, index.mean(starts, ends), index.count(starts, ends))
+
+
+def normals(
+    df: pd.DataFrame, length: int = NORMAL_YEARS, min_count: int = 0, columns: list[str] | None = None
+) -> pd.DataFrame:
+    """Sliding ``length``-year climate normals of every column and station."""
+    stations, columns, index = _station_index(df, columns)
+    starts, means, counts = index.sliding(length, min_count)
+    return _frame(stations, columns, starts, starts + length - 1, means, counts)
+
+
+def parse_periods(text: str) -> list[tuple[int, int]]:
+    periods = []
+    for part in text.split(","):
+        start, end = (int(y) for y in part.split("-"))
+        periods.append((start, end))
+    return periods
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Sliding climate normals and period means of all variables.")
+    parser.add_argument("--length", type=int, default=NORMAL_YEARS, help="years per normal")
+    parser.add_argument(
+        "--min-count", type=int, default=0, help="observed years a normal needs; fewer leaves it empty"
+    )
+    parser.add_argument("--periods", type=parse_periods, help="also print means over e.g. 1949-1979,1980-2004")
+    parser.add_argument("--stations-dir", type=Path, help="station=<id> partitions instead of the single table")
+    parser.add_argument("--output", type=Path, default=NORMALS_PATH)
+    args = parser.parse_args(argv)
+
+    df = load_stations(args.stations_dir) if args.stations_dir else load_clean()
+    table = normals(df, args.length, args.min_count)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    table.round(3).to_csv(args.output, index=False)
+    print(f"Wrote {args.output} ({len(table)} normals)")
+    if args.periods:
+        print(period_means(df, args.periods).round(2).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -32,34 +32,21 @@ function formatSl(value, decimals = 0) {
     return (slNumberFormatters[decimals] || slNumberFormatters[0]).format(num);
 }
 
-async function loadCSV() {
+let modelArtifact = null;
+
+async function loadData() {
     try {
-        const response = await fetch('../data/clean_ratece.csv');
-        const csvText = await response.text();
-        const lines = csvText.split('\n');
-        
-        // Skip header and ignore placeholder/incomplete rows
-        for (let i = 1; i < lines.length; i++) {
-            const line = lines[i].trim();
-            if (!line) continue;
-            
-            const cols = line.split(',');
-            if (cols.length < 10) continue;
-            const year = parseInt(cols[0]);
-            if (isNaN(year)) continue;
-            if (!cols[1] || isNaN(parseFloat(cols[1]))) continue;
-            
-            data.years.push(year);
-            data.avgTemp.push(parseFloat(cols[1]) || 0);
-            data.avgMinTemp.push(parseFloat(cols[2]) || 0);
-            data.minTemp.push(parseFloat(cols[3]) || 0);
-            data.maxSnow.push(parseFloat(cols[4]) || 0);
-            data.frostDays.push(parseFloat(cols[5]) || 0);
-            data.iceDays.push(parseFloat(cols[6]) || 0);
-            data.coldDays.push(parseFloat(cols[7]) || 0);
-            data.snowfallDays.push(parseFloat(cols[8]) || 0);
-            data.snowDays.push(parseFloat(cols[9]) || 0);
-        }
+        // Series, trend lines, Holt fits and projections are precomputed by
+        // scripts/build_web_artifact.py; the page only renders them.
+        const response = await fetch('data/model_artifact.json');
+        modelArtifact = await response.json();
+
+        data.years = modelArtifact.years;
+        Object.keys(data).forEach((key) => {
+            if (key !== 'years' && modelArtifact.series[key]) {
+                data[key] = modelArtifact.series[key].values;
+            }
+        });
         
         // Calculate projection data
         calculateProjections();
@@ -69,63 +56,19 @@ async function loadCSV() {
         
         // Initialize charts after data is loaded
         initCharts();
+        if (modelArtifact.resolution) {
+            tempChartInstance.$view = artifactView();
+            updateTemperatureChartModel();
+        }
+        refineCharts();
     } catch (error) {
-        console.error('Error loading CSV:', error);
+        console.error('Error loading model artifact:', error);
     }
 }
 
-// General linear regression function
-function linearRegression(xValues, yValues) {
-    const n = xValues.length;
-    const sumX = xValues.reduce((a, b) => a + b, 0);
-    const sumY = yValues.reduce((a, b) => a + b, 0);
-    const sumXY = xValues.reduce((sum, x, i) => sum + x * yValues[i], 0);
-    const sumX2 = xValues.reduce((sum, x) => sum + x * x, 0);
-    
-    const slope = (n * sumXY - sumX * sumY) / (n * sumX2 - sumX * sumX);
-    const intercept = (sumY - slope * sumX) / n;
-    
-    return { slope, intercept };
-}
-
-// Calculate trend line values for given years
-function calculateTrendLine(xValues, yValues) {
-    const { slope, intercept } = linearRegression(xValues, yValues);
-    return xValues.map(x => slope * x + intercept);
-}
-
-function holtBestFit(values) {
-    if (values.length < 2) {
-        return { fitted: values.slice(), level: values[values.length - 1] || 0, trend: 0 };
-    }
-
-    let best = null;
-    for (let alpha = 0.1; alpha <= 0.9; alpha += 0.1) {
-        for (let beta = 0.1; beta <= 0.9; beta += 0.1) {
-            let level = values[0];
-            let trend = values[1] - values[0];
-            const fitted = [values[0]];
-            let sse = 0;
-
-            for (let t = 1; t < values.length; t++) {
-                const pred = level + trend;
-                fitted.push(pred);
-                const err = values[t] - pred;
-                sse += err * err;
-
-                const newLevel = alpha * values[t] + (1 - alpha) * (level + trend);
-                const newTrend = beta * (newLevel - level) + (1 - beta) * trend;
-                level = newLevel;
-                trend = newTrend;
-            }
-
-            if (!best || sse < best.sse) {
-                best = { sse, fitted, level, trend };
-            }
-        }
-    }
-
-    return best;
+// Precomputed linear trend line for a series, aligned with data.years
+function trendLine(key) {
+    return modelArtifact.series[key].linear.fitted;
 }
 
 function initTempModelControl() {
@@ -246,10 +189,10 @@ function getTemperatureModelSeries() {
     const endYear = data.years[historyCount - 1];
 
     if (tempModel === 'holt') {
-        const holt = holtBestFit(data.avgTemp);
+        const holt = modelArtifact.series.avgTemp.holt;
         const trendData = holt.fitted;
         const yearsAhead = projectionData.trend_years.length - historyCount;
-        const future = Array.from({ length: yearsAhead }, (_, i) => holt.level + (i + 1) * holt.trend);
+        const future = holt.projection.slice(0, yearsAhead);
         const projectionLine = Array(historyCount - 1).fill(null).concat([holt.fitted[holt.fitted.length - 1], ...future]);
         return {
             trendLabel: 'Holt trend (' + startYear + '–' + endYear + ')',
@@ -265,17 +208,130 @@ function getTemperatureModelSeries() {
     };
 }
 
+// Temperature chart on a downsampled level: history at the level's years,
+// projection over the years after it.
+function temperatureLevelData(view) {
+    const { slope, intercept } = modelArtifact.series.avgTemp.linear;
+    const future = modelArtifact.projection_years;
+    const n = view.years.length;
+    let trendData, projectionLine;
+    if (tempModel === 'holt') {
+        trendData = view.holt.avgTemp;
+        const projection = modelArtifact.series.avgTemp.holt.projection;
+        projectionLine = Array(n - 1).fill(null).concat([trendData[n - 1], ...projection]);
+    } else {
+        trendData = view.years.map((year) => slope * year + intercept);
+        projectionLine = Array(n - 1).fill(null).concat([trendData[n - 1], ...future.map((year) => slope * year + intercept)]);
+    }
+    return {
+        labels: view.years.concat(future),
+        measured: view.avgTemp.concat(Array(future.length).fill(null)),
+        trendData,
+        projectionLine
+    };
+}
+
 function updateTemperatureChartModel() {
     if (!tempChartInstance) return;
     const modeled = getTemperatureModelSeries();
     tempChartInstance.data.datasets[1].label = modeled.trendLabel;
-    tempChartInstance.data.datasets[1].data = modeled.trendData;
-    tempChartInstance.data.datasets[2].data = modeled.projectionLine;
+    if (tempChartInstance.$view) {
+        const level = temperatureLevelData(tempChartInstance.$view);
+        tempChartInstance.data.labels = level.labels;
+        tempChartInstance.data.datasets[0].data = level.measured;
+        tempChartInstance.data.datasets[1].data = level.trendData;
+        tempChartInstance.data.datasets[2].data = level.projectionLine;
+    } else {
+        tempChartInstance.data.datasets[1].data = modeled.trendData;
+        tempChartInstance.data.datasets[2].data = modeled.projectionLine;
+    }
     tempChartInstance.update();
 }
 
+// Long histories: model_artifact.json holds a coarse LTTB level of every
+// series (scripts/downsample.py) and data/levels/<chart>/<points>.json finer
+// ones. A chart shows the coarse level first and fetches the first finer
+// level with at least one point per pixel of its width.
+const levelRequests = {};
+
+function chartView(chart) {
+    return chart.$view || data;
+}
+
+function artifactView() {
+    const view = { years: data.years, holt: {} };
+    Object.keys(modelArtifact.series).forEach((key) => {
+        view[key] = modelArtifact.series[key].values;
+        view.holt[key] = modelArtifact.series[key].holt.fitted;
+    });
+    return view;
+}
+
+function fetchLevel(chartId, points) {
+    const url = modelArtifact.levels.path + '/' + chartId + '/' + points + '.json';
+    if (!levelRequests[url]) {
+        levelRequests[url] = fetch(url).then((response) => response.json()).then((level) => {
+            const view = { years: level.years, holt: level.holt };
+            Object.keys(level.values).forEach((key) => {
+                view[key] = level.values[key];
+            });
+            return view;
+        });
+    }
+    return levelRequests[url];
+}
+
+async function refineChart(chart) {
+    const levels = modelArtifact.levels && modelArtifact.levels.charts[chart.canvas.id];
+    if (!levels) return;
+    const coarse = modelArtifact.resolution.points;
+    const wanted = [coarse, ...levels].find((points) => points >= chart.width) || levels[levels.length - 1];
+    const shown = chart.$points || coarse;
+    if (wanted <= shown) return;
+    chart.$points = wanted;
+
+    // Remember which series each dataset draws before its data is swapped.
+    chart.data.datasets.forEach((dataset) => {
+        Object.keys(modelArtifact.series).forEach((key) => {
+            if (dataset.data === data[key]) dataset.seriesKey = key;
+            if (dataset.data === trendLine(key)) dataset.trendKey = key;
+        });
+    });
+    let view;
+    try {
+        view = await fetchLevel(chart.canvas.id, wanted);
+    } catch (error) {
+        console.error('Error loading chart level:', error);
+        chart.$points = shown;
+        return;
+    }
+    if (chart.$points !== wanted) return;
+    chart.$view = view;
+    if (chart === tempChartInstance) {
+        updateTemperatureChartModel();
+        return;
+    }
+    chart.data.labels = view.years;
+    chart.data.datasets.forEach((dataset) => {
+        if (dataset.seriesKey) {
+            dataset.data = view[dataset.seriesKey];
+        } else if (dataset.trendKey) {
+            const { slope, intercept } = modelArtifact.series[dataset.trendKey].linear;
+            dataset.data = view.years.map((year) => slope * year + intercept);
+        }
+    });
+    chart.update('none');
+}
+
+function refineCharts() {
+    if (!modelArtifact || !modelArtifact.levels || !Chart.instances) return;
+    Object.values(Chart.instances).forEach((chart) => {
+        refineChart(chart);
+    });
+}
+
 function calculateProjections() {
-    const { slope, intercept } = linearRegression(data.years, data.avgTemp);
+    const { slope, intercept } = modelArtifact.series.avgTemp.linear;
     const startYear = data.years[0];
     const endYear = data.years[data.years.length - 1];
     const projectionEndYear = endYear + 10;
@@ -439,7 +495,7 @@ function initCharts() {
 
 // Snow Chart
 const snowCtx = document.getElementById('snowChart').getContext('2d');
-const snowDaysTrend = calculateTrendLine(data.years, data.snowDays);
+const snowDaysTrend = trendLine('snowDays');
 new Chart(snowCtx, {
     type: 'bar',
     data: {
@@ -541,7 +597,7 @@ new Chart(snowCtx, {
                     },
                     footer: function(context) {
                         const idx = context[0].dataIndex;
-                        return 'Povp. temp: ' + formatSl(data.avgTemp[idx], 1) + ' °C';
+                        return 'Povp. temp: ' + formatSl(chartView(context[0].chart).avgTemp[idx], 1) + ' °C';
                     }
                 }
             }
@@ -593,7 +649,7 @@ new Chart(snowCtx, {
 
 // Extremes Chart
 const extremesCtx = document.getElementById('extremesChart').getContext('2d');
-const extremesTrend = calculateTrendLine(data.years, data.minTemp);
+const extremesTrend = trendLine('minTemp');
 new Chart(extremesCtx, {
     type: 'line',
     data: {
@@ -666,9 +722,10 @@ new Chart(extremesCtx, {
                             return null;
                         }
                         const idx = context.dataIndex;
+                        const view = chartView(context.chart);
                         return [
-                            'Povp. temp: ' + formatSl(data.avgTemp[idx], 1) + ' °C',
-                            'Ledenih dni: ' + formatSl(data.iceDays[idx], 0)
+                            'Povp. temp: ' + formatSl(view.avgTemp[idx], 1) + ' °C',
+                            'Ledenih dni: ' + formatSl(view.iceDays[idx], 0)
                         ];
                     }
                 }
@@ -707,8 +764,8 @@ new Chart(extremesCtx, {
 
 // Snow Comparison Chart (snowfall vs snow cover)
 const snowComparisonCtx = document.getElementById('snowComparisonChart').getContext('2d');
-const snowCoverTrend = calculateTrendLine(data.years, data.snowDays);
-const snowfallTrend = calculateTrendLine(data.years, data.snowfallDays);
+const snowCoverTrend = trendLine('snowDays');
+const snowfallTrend = trendLine('snowfallDays');
 new Chart(snowComparisonCtx, {
     type: 'line',
     data: {
@@ -825,7 +882,8 @@ new Chart(snowComparisonCtx, {
                             return null;
                         }
                         const idx = context.dataIndex;
-                        const diff = data.snowDays[idx] - data.snowfallDays[idx];
+                        const view = chartView(context.chart);
+                        const diff = view.snowDays[idx] - view.snowfallDays[idx];
                         return 'Razlika: ' + formatSl(diff, 0) + ' dni';
                     }
                 }
@@ -865,8 +923,8 @@ new Chart(snowComparisonCtx, {
 
 // Frost vs Ice Days Chart
 const frostCtx = document.getElementById('frostChart').getContext('2d');
-const frostTrend = calculateTrendLine(data.years, data.frostDays);
-const iceTrend = calculateTrendLine(data.years, data.iceDays);
+const frostTrend = trendLine('frostDays');
+const iceTrend = trendLine('iceDays');
 new Chart(frostCtx, {
     type: 'line',
     data: {
@@ -1016,8 +1074,8 @@ new Chart(frostCtx, {
 const tempComparisonEl = document.getElementById('tempComparisonChart');
 if (tempComparisonEl) {
 const tempComparisonCtx = tempComparisonEl.getContext('2d');
-const avgTempTrend = calculateTrendLine(data.years, data.avgTemp);
-const avgMinTempTrend = calculateTrendLine(data.years, data.avgMinTemp);
+const avgTempTrend = trendLine('avgTemp');
+const avgMinTempTrend = trendLine('avgMinTemp');
 new Chart(tempComparisonCtx, {
     type: 'line',
     data: {
@@ -1295,13 +1353,16 @@ function resizeAllCharts() {
     });
 }
 
-// Load CSV data and initialize charts
+// Load precomputed model artifact and initialize charts
 updateLastUpdatedLabel();
 clampPeriodTooltipBubble();
 clampAllTooltips();
+let refineTimer = null;
 window.addEventListener('resize', () => {
     clampPeriodTooltipBubble();
     clampAllTooltips();
+    clearTimeout(refineTimer);
+    refineTimer = setTimeout(refineCharts, 250);
 });
 const periodTooltipIcon = document.querySelector('.period-summary-text .tooltip-icon');
 if (periodTooltipIcon) {
@@ -1310,4 +1371,4 @@ if (periodTooltipIcon) {
 }
 initPeriodTooltipToggle();
 initTooltipHandlers();
-loadCSV();
+loadData();